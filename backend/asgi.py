@@ -0,0 +1,172 @@
+from asgiref.wsgi import WsgiToAsgi
+from urllib.parse import parse_qs
+from werkzeug.http import parse_etags
+from sqlalchemy import text
+from main import app
+from db import init_async_db, warmup_count
+from middleware.authenticate_user import verify_token
+from middleware.compress import choose_encoding, compress_body, MIN_SIZE
+from middleware.conditional import DEFAULT_CACHE_CONTROL, scoped_etag
+from middleware.logger import REQUEST_LATENCY, REQUEST_COUNT, REQUESTS_IN_FLIGHT
+from controllers.message_controller import get_messages_async, wait_for_messages_async, messages_version_async
+from controllers.conversation_controller import get_conversations_async, conversations_version_async
+from controllers.property_controller import get_properties_for_tenants_async
+from realtime import gateway, chat_socket
+import db as database
+import hashlib
+import os
+import re
+import time
+
+# Every blueprint keeps working through the WSGI bridge (on a thread pool),
+# while the hot polling and search reads below run natively on the event loop,
+# next to the chat WebSocket gateway at /ws/chat (realtime.py)
+wsgi_app = WsgiToAsgi(app)
+
+# (pattern, endpoint, allowed roles, handler, version) for GET routes served by async handlers. Cache-Control
+# comes from the endpoint's cache_policy and version mirrors its version function, so both paths send the same headers
+async_routes = [
+    (re.compile(r"^/api/messages/conversation/(\d+)/?$"), "message_routes.get_messages", ["tenant", "landlord"],
+        lambda user, match, args: get_messages_async(user, int(match.group(1)), args),
+        lambda user, match, args: messages_version_async(user, int(match.group(1)), args)),
+    (re.compile(r"^/api/messages/conversation/(\d+)/wait/?$"), "message_routes.wait_for_messages", ["tenant", "landlord"],
+        lambda user, match, args: wait_for_messages_async(user, int(match.group(1)), args),
+        None),
+    (re.compile(r"^/api/conversations/(\d+)/?$"), "conversation_routes.get_conversations", ["tenant", "landlord"],
+        lambda user, match, args: get_conversations_async(user, int(match.group(1))),
+        lambda user, match, args: conversations_version_async(user, int(match.group(1)))),
+    (re.compile(r"^/api/properties/search/?$"), "property_routes.get_properties_for_tenants", ["tenant", "landlord"],
+        lambda user, match, args: get_properties_for_tenants_async(user, args),
+        None),
+]
+
+async def send_json(send, body, status, request_headers, cache_control=DEFAULT_CACHE_CONTROL, etag=None):
+    """Send a JSON response; etag is a version ETag already checked against If-None-Match, else the body is hashed"""
+    payload = app.json.dumps(body).encode("utf-8") if status != 304 else b""
+    headers = [
+        (b"content-type", b"application/json"),
+        (b"access-control-allow-origin", b"*"),
+        (b"vary", b"Accept-Encoding"),
+        (b"cache-control", cache_control.encode()),
+    ]
+
+    if status == 304:
+        headers.append((b"etag", f'"{etag}"'.encode()))
+    elif status == 200:
+        if etag is None:
+            etag = hashlib.sha1(payload).hexdigest()
+            if_none_match = request_headers.get(b"if-none-match", b"").decode("latin-1")
+            if parse_etags(if_none_match).contains_weak(etag):
+                status, payload = 304, b""
+
+        encoding = choose_encoding(request_headers.get(b"accept-encoding", b"").decode("latin-1"))
+        if status == 200 and encoding and len(payload) >= MIN_SIZE:
+            payload = compress_body(payload, encoding)
+            headers.append((b"content-encoding", encoding.encode()))
+            headers.append((b"etag", f'W/"{etag}"'.encode()))
+        else:
+            headers.append((b"etag", f'"{etag}"'.encode()))
+
+    headers.append((b"content-length", str(len(payload)).encode()))
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": headers,
+    })
+    await send({"type": "http.response.body", "body": payload})
+    return status
+
+async def warm_async_pool():
+    connections = []
+    try:
+        for _ in range(warmup_count(database.async_engine.pool)):
+            conn = await database.async_engine.connect()
+            await conn.execute(text("SELECT 1"))
+            connections.append(conn)
+    finally:
+        for conn in connections:
+            await conn.close()
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            init_async_db()
+            await warm_async_pool()
+            gateway.start()
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await gateway.stop()
+            if database.async_engine is not None:
+                await database.async_engine.dispose()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+async def application(scope, receive, send):
+    if scope["type"] == "lifespan":
+        return await lifespan(receive, send)
+
+    if scope["type"] == "websocket":
+        if scope["path"].rstrip("/") == "/ws/chat":
+            return await chat_socket(scope, receive, send)
+        await send({"type": "websocket.close", "code": 4404})
+        return
+
+    if scope["type"] == "http" and scope["method"] == "GET":
+        for pattern, endpoint, allowed_roles, handler, version in async_routes:
+            match = pattern.match(scope["path"])
+            if not match:
+                continue
+
+            labels = {"method": "GET", "blueprint": endpoint.split(".")[0], "endpoint": endpoint}
+            start_time = time.perf_counter()
+            REQUESTS_IN_FLIGHT.inc(blueprint=labels["blueprint"])
+            status = 500
+            cache_control = getattr(app.view_functions.get(endpoint), "cache_control", DEFAULT_CACHE_CONTROL)
+            try:
+                headers = dict(scope["headers"])
+                auth_header = headers.get(b"authorization", b"").decode("latin-1")
+                user, error, status = verify_token(auth_header, allowed_roles)
+                if error:
+                    return await send_json(send, error, status, headers, cache_control)
+
+                query = parse_qs(scope["query_string"].decode("utf-8"))
+                args = {key: values[0] for key, values in query.items()}
+
+                # Answer with 304 before running the handler's queries, like cache_policy
+                etag = None
+                token = await version(user, match, args) if version else None
+                if token is not None:
+                    full_path = f"{scope['path']}?{scope['query_string'].decode('latin-1')}"
+                    etag = scoped_etag(user.get("userId"), full_path, token)
+                    if parse_etags(headers.get(b"if-none-match", b"").decode("latin-1")).contains_weak(etag):
+                        status = await send_json(send, None, 304, headers, cache_control, etag)
+                        return
+
+                body, status = await handler(user, match, args)
+                status = await send_json(send, body, status, headers, cache_control, etag)
+                return
+            finally:
+                REQUESTS_IN_FLIGHT.dec(blueprint=labels["blueprint"])
+                REQUEST_LATENCY.observe(time.perf_counter() - start_time, **labels)
+                REQUEST_COUNT.inc(status=status, **labels)
+
+    await wsgi_app(scope, receive, send)
+
+if __name__ == "__main__":
+    import uvicorn
+
+    port = int(os.getenv("FLASK_PORT", 8080))
+    options = {}
+    if os.getenv("DEVELOPMENT", "true") != "true":
+        options["ssl_certfile"] = "./cert.crt"
+        options["ssl_keyfile"] = "./key.pem"
+
+    uvicorn.run(
+        "asgi:application",
+        host="0.0.0.0",
+        port=port,
+        workers=int(os.getenv("ASGI_WORKERS") or 1),
+        lifespan="on",
+        **options,
+    )
@@ -0,0 +1,54 @@
+"""Run every benchmark that checks behaviour, at sizes small enough for CI, and exit non-zero if any fails.
+
+Each check runs in its own process, since the benchmarks configure the app through the
+environment before importing it. The ones that only report timings or memory (index, json,
+text_search, property_memory, upload_memory) are left to be run by hand.
+
+Run from the backend directory: python -m benchmarks [name ...]
+Needs the dev requirements: pip install -r requirements-dev.txt
+"""
+import argparse
+import subprocess
+import sys
+import time
+
+CHECKS = {
+    "asgi_headers": [],
+    "chat_gateway": ["--sockets", "5", "--messages", "5"],
+    "facet": ["--size", "5000"],
+    "group_query": [],
+    "inbox": ["--conversations", "10", "100"],
+    "long_poll": [],
+    "message_poll": ["--sizes", "1000", "5000"],
+    "read_watermark": [],
+    "search_pagination": ["--sizes", "2000", "8000"],
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("names", nargs="*", metavar="name", help=f"checks to run (default: all of {', '.join(CHECKS)})")
+    parser.add_argument("-v", "--verbose", action="store_true", help="show each check's output even when it passes")
+    args = parser.parse_args()
+    unknown = [name for name in args.names if name not in CHECKS]
+    if unknown:
+        parser.error(f"unknown check(s): {', '.join(unknown)}")
+
+    failed = []
+    for name in args.names or CHECKS:
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable, "-m", f"benchmarks.{name}_benchmark", *CHECKS[name]],
+                                stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+        passed = result.returncode == 0
+        print(f"{name:<20} {'ok' if passed else 'FAILED'}  {time.perf_counter() - start:6.1f} s")
+        if args.verbose or not passed:
+            print(result.stdout)
+        if not passed:
+            failed.append(name)
+
+    print(f"{len(failed)} check(s) failed: {', '.join(failed)}" if failed else "All checks passed")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
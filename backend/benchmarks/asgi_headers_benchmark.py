@@ -0,0 +1,83 @@
+"""Check that the routes served natively by asgi.py send the same caching headers as the Flask views.
+
+Seeds a throwaway SQLite database, then requests every GET route in asgi.async_routes through
+the Flask test client and through the ASGI app, and compares the status, Cache-Control and ETag,
+then sends each ETag back and checks both paths answer 304. Exits non-zero on any difference.
+
+Run from the backend directory: python -m benchmarks.asgi_headers_benchmark
+Needs the dev requirements: pip install -r requirements-dev.txt
+"""
+import os
+import sys
+
+from benchmarks.fixtures import configure
+configure("asgi_headers_benchmark", async_db=True)
+
+from asgi import application
+from main import app
+from db import db, init_async_db
+from models import User, Group, Conversation, Participant, Message, ChatEvent, Property, ImageVariant
+from models.property import PropertyType
+from benchmarks.fixtures import create_tables, add_tenants, add_group_chat, auth_headers
+import asyncio
+import httpx
+
+
+def seed():
+    create_tables(User, Group, Conversation, Participant, Message, ChatEvent, Property, ImageVariant)
+    users = add_tenants(2)
+    group, conversation = add_group_chat(users)
+    db.session.add_all([Message(conversation_id=conversation.id, sender_id=users[i % 2].id, content=f"Message {i}")
+                        for i in range(20)])
+    db.session.add_all([Property(name=f"House {i}", address=f"{i} Main St", city="Springfield", property_description="",
+                                 bedrooms=3, price=1000 + i, property_type=PropertyType.House, landlord_id=users[0].id,
+                                 exterior_image=b"\xff\xd8\xff" + os.urandom(512))
+                        for i in range(5)])
+    db.session.commit()
+    return group.id, conversation.id, users[1].id
+
+
+async def compare(urls, headers):
+    ok = True
+    flask_client = app.test_client()
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=application), base_url="http://testserver") as client:
+        for url in urls:
+            expected = flask_client.get(url, headers=headers)
+            actual = await client.get(url, headers=headers)
+            seen = {name: (response.status_code, response.headers.get("Cache-Control"), response.headers.get("ETag"))
+                    for name, response in (("wsgi", expected), ("asgi", actual))}
+
+            etag = seen["wsgi"][2]
+            revalidated = {}
+            if etag:
+                conditional = {**headers, "If-None-Match": etag}
+                revalidated["wsgi"] = flask_client.get(url, headers=conditional).status_code
+                revalidated["asgi"] = (await client.get(url, headers=conditional)).status_code
+
+            same = seen["wsgi"] == seen["asgi"] and revalidated.get("wsgi") == revalidated.get("asgi")
+            print(f"{url:<52} {seen['wsgi'][0]} {seen['wsgi'][1]!s:<22} "
+                  f"revalidated {revalidated.get('wsgi', '-')}  {'same' if same else f'DIFFERENT: {seen} {revalidated}'}")
+            ok = ok and same
+    return ok
+
+
+def main():
+    with app.app_context():
+        group_id, conversation_id, user_id = seed()
+    init_async_db()
+    headers = auth_headers(user_id, **{"Accept-Encoding": "identity"})
+    urls = [
+        f"/api/messages/conversation/{conversation_id}",
+        f"/api/messages/conversation/{conversation_id}?limit=5",
+        f"/api/messages/conversation/{conversation_id}/wait?after=1&timeout=1",
+        f"/api/conversations/{group_id}",
+        "/api/properties/search?sort=price",
+    ]
+
+    ok = asyncio.run(compare(urls, headers))
+    print("Both paths send the same caching headers" if ok else "The ASGI path sends different caching headers")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
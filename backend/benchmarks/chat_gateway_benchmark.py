@@ -0,0 +1,236 @@
+"""Measure how quickly the chat gateway pushes messages, and the requests it saves over polling.
+
+Starts the ASGI app under uvicorn on a throwaway SQLite database, opens --sockets WebSocket
+connections subscribed to one conversation and sends --messages messages through
+POST /api/messages/send, timing each one from the POST to its arrival on every socket. Then
+commits messages from a separate connection (as another worker process would) to time the
+cross-process path, which is bounded by GATEWAY_POLL_SECONDS. Finally reconnects a socket with
+?since= while messages keep arriving, and checks the replay and the live tail hand it every
+missed and new event exactly once. Exits non-zero if a socket misses a message, gets one twice,
+an outsider is allowed to subscribe, the browser auth message fails or a token in the URL works.
+
+Run from the backend directory: python -m benchmarks.chat_gateway_benchmark [--sockets 50] [--messages 20]
+Needs the dev requirements: pip install -r requirements-dev.txt
+"""
+import argparse
+import os
+import sys
+
+from benchmarks.fixtures import configure
+configure("chat_gateway_benchmark", async_db=True)
+os.environ.setdefault("GATEWAY_POLL_SECONDS", "1")
+
+from asgi import application
+from main import app
+from db import db
+from models import User, Group, Conversation, Participant, Message, ChatEvent
+from benchmarks.fixtures import create_tables, add_tenants, add_group_chat, token, auth_headers
+from realtime import GATEWAY_POLL_SECONDS, publish, conversation_channel
+import asyncio
+import json
+import socket
+import statistics
+import time
+import httpx
+import uvicorn
+import websockets
+
+POLL_SECONDS = 5  # what the chat screens polled at before
+
+
+def seed():
+    create_tables(User, Group, Conversation, Participant, Message, ChatEvent)
+    users = add_tenants(3)
+    # The last user isn't in the conversation
+    _, conversation = add_group_chat(users[:2])
+    db.session.commit()
+    return conversation.id, [user.id for user in users]
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def subscribe(url, user_id, conversation_id):
+    connection = await websockets.connect(url, additional_headers=auth_headers(user_id))
+    await connection.send(json.dumps({"type": "subscribe", "conversations": [conversation_id]}))
+    reply = json.loads(await connection.recv())
+    return connection, reply
+
+
+async def receive_events(connection, count, arrivals):
+    while count:
+        frame = json.loads(await connection.recv())
+        if frame["type"] == "event" and frame["event"] == "message.created":
+            arrivals.setdefault(frame["data"]["content"], []).append(time.perf_counter())
+            count -= 1
+
+
+def commit_elsewhere(conversation_id, sender_id, content):
+    """Send a message without waking the gateway, like a request served by another process"""
+    with app.test_request_context():
+        message = Message(conversation_id=conversation_id, sender_id=sender_id, content=content)
+        db.session.add(message)
+        db.session.flush()
+        publish(db.session, conversation_channel(conversation_id), "message.created",
+                {"id": message.id, "content": content})
+        db.session.info.pop("chat_events")  # no in-process wake-up
+        db.session.commit()
+
+
+def newest_event_id():
+    with app.app_context():
+        return db.session.scalar(db.select(db.func.max(ChatEvent.id)))
+
+
+async def reconnect(url, conversation_id, user_ids, missed=5, arriving=20):
+    """Resubscribe with since while messages are committed, returning (events expected, event ids received)"""
+    since = newest_event_id()
+    for i in range(missed):
+        await asyncio.to_thread(commit_elsewhere, conversation_id, user_ids[1], f"Missed {i}")
+    # Let the tail move past the missed events, so the replay has to hand them over
+    await asyncio.sleep(GATEWAY_POLL_SECONDS * 2)
+
+    async def keep_sending():
+        for i in range(arriving):
+            await asyncio.to_thread(commit_elsewhere, conversation_id, user_ids[1], f"Arriving {i}")
+            await asyncio.sleep(0.02)
+
+    sending = asyncio.create_task(keep_sending())
+    connection = await websockets.connect(url, additional_headers=auth_headers(user_ids[0]))
+    await connection.send(json.dumps({"type": "subscribe", "conversations": [conversation_id], "since": since}))
+    received = []
+    deadline = time.perf_counter() + GATEWAY_POLL_SECONDS * 5 + 5
+    try:
+        while time.perf_counter() < deadline:
+            try:
+                frame = json.loads(await asyncio.wait_for(connection.recv(), deadline - time.perf_counter()))
+            except asyncio.TimeoutError:
+                break
+            if frame["type"] == "event" and frame["event"] == "message.created":
+                received.append(frame["id"])
+            if len(received) >= missed + arriving and sending.done():
+                # Anything after this would be a duplicate
+                deadline = min(deadline, time.perf_counter() + GATEWAY_POLL_SECONDS * 2)
+    finally:
+        await sending
+        await connection.close()
+    return missed + arriving, received
+
+
+def latencies(sent, arrivals):
+    return [(arrival - sent[content]) * 1000 for content in sent for arrival in arrivals.get(content, [])]
+
+
+async def run(args, port, conversation_id, user_ids):
+    url = f"ws://127.0.0.1:{port}/ws/chat"
+    ok = True
+
+    outsider, reply = await subscribe(url, user_ids[2], conversation_id)
+    if reply.get("conversations"):
+        print("An outsider was allowed to subscribe")
+        ok = False
+    await outsider.close()
+
+    # Browsers authenticate with a first message instead of a header; a token in the URL is never read
+    browser = await websockets.connect(url)
+    await browser.send(json.dumps({"type": "auth", "token": token(user_ids[0])}))
+    await browser.send(json.dumps({"type": "subscribe", "conversations": [conversation_id]}))
+    replies = [json.loads(await browser.recv()) for _ in range(2)]
+    await browser.close()
+    if [reply["type"] for reply in replies] != ["authenticated", "subscribed"] or not replies[1]["conversations"]:
+        print(f"Auth message didn't authenticate the socket: {replies}")
+        ok = False
+    leaky = await websockets.connect(f"{url}?token={token(user_ids[0])}")
+    await leaky.send(json.dumps({"type": "subscribe", "conversations": [conversation_id]}))
+    try:
+        await leaky.recv()
+        print("A token in the URL authenticated the socket")
+        ok = False
+    except websockets.ConnectionClosed as closed:
+        if closed.rcvd is None or closed.rcvd.code != 4401:
+            print(f"A token in the URL closed the socket with {closed.rcvd}")
+            ok = False
+
+    connections = [(await subscribe(url, user_ids[i % 2], conversation_id))[0] for i in range(args.sockets)]
+    expected = args.messages * 2
+    arrivals = {}
+    readers = [asyncio.create_task(receive_events(connection, expected, arrivals)) for connection in connections]
+
+    sent = {}
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}") as client:
+        for i in range(args.messages):
+            content = f"Pushed {i}"
+            sent[content] = time.perf_counter()
+            response = await client.post("/api/messages/send", json={"conversationId": conversation_id, "content": content},
+                                         headers=auth_headers(user_ids[0]))
+            assert response.status_code == 201, response.text[:500]
+            await asyncio.sleep(0.05)
+
+    pushed = latencies(sent, arrivals)
+    sent = {}
+    for i in range(args.messages):
+        content = f"Tailed {i}"
+        sent[content] = time.perf_counter()
+        await asyncio.to_thread(commit_elsewhere, conversation_id, user_ids[1], content)
+        await asyncio.sleep(0.05)
+
+    try:
+        await asyncio.wait_for(asyncio.gather(*readers), GATEWAY_POLL_SECONDS * 5 + 5)
+    except asyncio.TimeoutError:
+        print("Some sockets missed messages")
+        ok = False
+    tailed = latencies(sent, arrivals)
+
+    # One socket stays open so the gateway keeps tailing while the other reconnects
+    for connection in connections[1:]:
+        await connection.close()
+    expected_events, received = await reconnect(url, conversation_id, user_ids)
+    await connections[0].close()
+    replay_ok = len(received) == len(set(received)) == expected_events
+    print(f"reconnect with since: {len(set(received))}/{expected_events} events, "
+          f"{len(received) - len(set(received))} duplicate(s)  {'ok' if replay_ok else 'WRONG'}")
+    ok = ok and replay_ok
+
+    for label, values in (("same process (POST /api/messages/send)", pushed), ("other process (outbox tail)", tailed)):
+        if values:
+            values.sort()
+            print(f"{label:<40} {len(values):>5} deliveries  median {statistics.median(values):7.2f} ms  "
+                  f"p95 {values[int(len(values) * 0.95) - 1]:7.2f} ms")
+    idle_requests = args.sockets * 60 / POLL_SECONDS
+    print(f"{args.sockets} idle chat screens: {idle_requests:.0f} polling requests a minute before, "
+          f"0 requests and {60 / GATEWAY_POLL_SECONDS:.0f} tail queries a minute with the gateway")
+    return ok and len(pushed) == len(tailed) == args.messages * args.sockets
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sockets", type=int, default=50)
+    parser.add_argument("--messages", type=int, default=20)
+    args = parser.parse_args()
+
+    with app.app_context():
+        conversation_id, user_ids = seed()
+
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(application, host="127.0.0.1", port=port, lifespan="on", log_level="warning"))
+
+    async def serve_and_run():
+        serving = asyncio.create_task(server.serve())
+        while not server.started:
+            await asyncio.sleep(0.05)
+        try:
+            return await run(args, port, conversation_id, user_ids)
+        finally:
+            server.should_exit = True
+            await serving
+
+    ok = asyncio.run(serve_and_run())
+    print("Every socket got every message" if ok else "Delivery failed")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""Check the search facets against separate searches and time them cold and cached.
+
+Seeds a throwaway SQLite database with --size listings over a few dozen cities, then for a
+handful of filter combinations compares every count from GET /api/properties/search/facets
+with the number of rows a search with that option picked returns, and reports how many SQL
+statements and how long the facets took on a cold and on a warm cache. Exits non-zero if a
+count is wrong or the facets take more than one query.
+
+Run from the backend directory: python -m benchmarks.facet_benchmark [--size 100000]
+"""
+import argparse
+import os
+import random
+import sys
+
+from benchmarks.fixtures import configure
+configure("facet_benchmark")
+
+from main import app
+from db import db
+from models import User, Property
+from models.property import PropertyType
+from benchmarks.fixtures import create_tables, add_landlord, auth_headers
+from controllers.property_controller import apply_tenant_search_filters
+from facets import facet_cache
+from blob_store import store_blob
+from sqlalchemy import func, select
+from urllib.parse import urlencode
+import time
+
+CITIES = [f"City {i}" for i in range(40)]
+BATCH = 10000
+FILTERS = (
+    {},
+    {"maxPrice": "2000"},
+    {"bedrooms": "3", "propertyType": "Apartment"},
+    {"city": "city 1", "maxPrice": "3000", "bedrooms": "2"},
+    {"q": "garden", "propertyType": "House"},
+)
+
+
+def seed(size):
+    create_tables(User, Property)
+    landlord = add_landlord()
+    db.session.commit()
+    key, image_size, mime_type = store_blob(b"\xff\xd8\xff" + os.urandom(1024))
+
+    rng = random.Random(size)
+    types = list(PropertyType)
+    rows = []
+    for i in range(size):
+        rows.append({
+            "name": f"House {i}", "address": f"{i} Main St", "city": rng.choice(CITIES),
+            "property_description": rng.choice(("garden", "balcony", "garden and balcony", "")),
+            "bedrooms": rng.randint(1, 6), "price": rng.randint(400, 6000), "property_type": rng.choice(types),
+            "availability": i % 10 != 0, "landlord_id": landlord.id,
+            "exterior_image_hash": key, "exterior_image_size": image_size, "exterior_image_type": mime_type,
+        })
+        if len(rows) == BATCH:
+            db.session.execute(Property.__table__.insert(), rows)
+            rows = []
+    if rows:
+        db.session.execute(Property.__table__.insert(), rows)
+    db.session.commit()
+    db.session.execute(db.text("ANALYZE"))
+
+
+def search_count(args):
+    """Rows the tenant search would return for args, counted the slow way"""
+    from search import search_terms, apply_text_search
+    query = apply_tenant_search_filters(select(func.count()).select_from(Property), args)
+    terms = search_terms(args.get("q"))
+    if terms:
+        query = apply_text_search(query, terms, db.engine.dialect.name)[0]
+    return db.session.scalar(query)
+
+
+def expected_counts(args):
+    """Each facet option's count, from one search per option with that option swapped in"""
+    expected = {"total": search_count(args)}
+    for option in PropertyType:
+        expected[("propertyTypes", option.name)] = search_count(dict(args, propertyType=option.name))
+    for option in (1, 2, 3, 4, 5):
+        expected[("bedrooms", option)] = search_count(dict(args, bedrooms=str(option)))
+    for option in (500, 1000, 1500, 2000, 3000, 5000):
+        expected[("prices", option)] = search_count(dict(args, maxPrice=str(option)))
+    return expected
+
+
+def actual_counts(facets):
+    actual = {"total": facets["total"]}
+    actual.update({("propertyTypes", item["value"]): item["count"] for item in facets["propertyTypes"]})
+    actual.update({("bedrooms", item["min"]): item["count"] for item in facets["bedrooms"]})
+    actual.update({("prices", item["max"]): item["count"] for item in facets["prices"]})
+    return actual
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=100000)
+    args = parser.parse_args()
+
+    client = app.test_client()
+    headers = auth_headers(1)
+    ok = True
+
+    with app.app_context():
+        seed(args.size)
+
+    for filters in FILTERS:
+        facet_cache.clear()
+        url = f"/api/properties/search/facets?{urlencode(filters)}"
+        timings = []
+        for _ in ("cold", "cached"):
+            start = time.perf_counter()
+            response = client.get(url, headers=headers)
+            timings.append(((time.perf_counter() - start) * 1000, int(response.headers["X-Query-Count"])))
+            assert response.status_code == 200, response.get_data(as_text=True)[:500]
+        facets = response.get_json()["data"]
+
+        with app.app_context():
+            expected = expected_counts(filters)
+            city_counts = {city: search_count(dict(filters, city=city)) for city in CITIES}
+        actual = actual_counts(facets)
+        wrong = [key for key in expected if expected[key] != actual.get(key)]
+        # Cities are a substring filter, so check the listed ones against an exact city search
+        wrong += [item["value"] for item in facets["cities"] if city_counts[item["value"]] != item["count"]
+                  and not any(other != item["value"] and item["value"].lower() in other.lower() for other in CITIES)]
+
+        (cold_ms, cold_queries), (cached_ms, cached_queries) = timings
+        print(f"{urlencode(filters) or '(no filters)':<40} {facets['total']:>6} matches  "
+              f"cold {cold_ms:7.2f} ms / {cold_queries} query  cached {cached_ms:6.2f} ms / {cached_queries} queries  "
+              f"{'ok' if not wrong else 'WRONG: ' + ', '.join(map(str, wrong))}")
+        ok = ok and not wrong and cold_queries == 1 and cached_queries == 0
+
+    print("Facet counts match separate searches" if ok else "Facet counts are wrong or take more than one query")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Setup shared by the benchmarks: a throwaway database, the users and group chat they seed,
+and tokens to call the API with.
+
+main and asgi read the environment when they are imported, so a benchmark calls configure()
+first and imports the app after it:
+
+    from benchmarks.fixtures import configure
+    configure("inbox_benchmark")
+
+    from main import app
+"""
+import os
+import tempfile
+import time
+
+import jwt
+
+from db import db
+from models import User, Group, Conversation, Participant
+from models.user import UserRole
+
+JWT_SECRET = "benchmark-secret-key-for-signing-tokens"
+
+
+def configure(name, workdir=None, async_db=False):
+    """Point the app at a SQLite database and blob directory under workdir (a fresh temporary
+    directory by default) and turn on the query count headers. Returns workdir."""
+    workdir = workdir or tempfile.mkdtemp()
+    database_path = os.path.join(workdir, f"{name}.db")
+    os.environ["DB_URL"] = f"sqlite:///{database_path}"
+    if async_db:
+        os.environ["ASYNC_DB_URL"] = f"sqlite+aiosqlite:///{database_path}"
+    os.environ["BLOB_STORE_DIR"] = os.path.join(workdir, "blobs")
+    os.environ["JWT_SECRET"] = JWT_SECRET
+    os.environ["QUERY_DEBUG_HEADERS"] = "true"
+    return workdir
+
+
+def create_tables(*models):
+    """Drop and recreate the tables of models, so a benchmark can reseed for each size"""
+    tables = [model.__table__ for model in models]
+    db.metadata.drop_all(db.engine, tables=tables)
+    db.metadata.create_all(db.engine, tables=tables)
+
+
+def add_landlord():
+    landlord = User(firstName="Lee", lastName="Landlord", username="landlord", email="landlord@example.com",
+                    password="x", role=UserRole.landlord)
+    db.session.add(landlord)
+    db.session.flush()
+    return landlord
+
+
+def add_tenants(count):
+    tenants = [User(firstName="Tess", lastName=str(i), username=f"tenant{i}", email=f"tenant{i}@example.com",
+                    password="x", role=UserRole.tenant) for i in range(count)]
+    db.session.add_all(tenants)
+    db.session.flush()
+    return tenants
+
+
+def add_group_chat(users, name="House chat"):
+    """A group owned by the first user with one group conversation that every user is in"""
+    group = Group(name="House", landlord_id=users[0].id)
+    db.session.add(group)
+    db.session.flush()
+    conversation = Conversation(group_id=group.id, type="group", name=name)
+    db.session.add(conversation)
+    db.session.flush()
+    db.session.add_all([Participant(conversation_id=conversation.id, user_id=user.id) for user in users])
+    db.session.flush()
+    return group, conversation
+
+
+def token(user_id, role="tenant"):
+    return jwt.encode({"userId": user_id, "role": role, "exp": int(time.time()) + 3600}, JWT_SECRET, algorithm="HS256")
+
+
+def auth_headers(user_id, role="tenant", **extra):
+    return {"Authorization": f"Bearer {token(user_id, role)}", **extra}
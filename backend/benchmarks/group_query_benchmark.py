@@ -0,0 +1,73 @@
+"""Check that the group listings run the same number of SQL statements however many groups there are.
+
+Seeds a throwaway SQLite database with growing numbers of groups and reads X-Query-Count
+from GET /api/groups/landlord and /api/groups/tenant. Exits non-zero if the count grows.
+
+Run from the backend directory: python -m benchmarks.group_query_benchmark
+"""
+import sys
+
+from benchmarks.fixtures import configure
+configure("group_query_benchmark")
+
+from main import app
+from db import db
+from models import User, Property, Group, GroupParticipant, ImageVariant
+from models.property import PropertyType
+from benchmarks.fixtures import create_tables, add_landlord, add_tenants, auth_headers
+import os
+import time
+
+SIZES = (10, 50, 200)
+TENANTS_PER_GROUP = 4
+
+
+def seed(groups):
+    """Reset the tables and give one landlord `groups` groups, each with its own property and tenants"""
+    create_tables(User, Property, Group, GroupParticipant, ImageVariant)
+    landlord = add_landlord()
+    tenants = add_tenants(TENANTS_PER_GROUP)
+
+    for i in range(groups):
+        property_item = Property(name=f"House {i}", address=f"{i} Main St", city="Springfield", property_description="",
+                                 bedrooms=3, price=1000, property_type=PropertyType.House, landlord_id=landlord.id,
+                                 exterior_image=b"\xff\xd8" + os.urandom(2048))
+        db.session.add(property_item)
+        db.session.flush()
+        group = Group(name=f"Group {i}", landlord_id=landlord.id, property_id=property_item.id)
+        db.session.add(group)
+        db.session.flush()
+        db.session.add_all([GroupParticipant(group_id=group.id, tenant_id=tenant.id) for tenant in tenants])
+
+    db.session.commit()
+    return landlord.id, tenants[0].id
+
+
+def fetch(client, path, user_id, role):
+    start = time.perf_counter()
+    response = client.get(path, headers=auth_headers(user_id, role))
+    elapsed = (time.perf_counter() - start) * 1000
+    assert response.status_code == 200, response.get_data(as_text=True)
+    return int(response.headers["X-Query-Count"]), elapsed
+
+
+def main():
+    counts = {"landlord": set(), "tenant": set()}
+    client = app.test_client()
+
+    for groups in SIZES:
+        with app.app_context():
+            landlord_id, tenant_id = seed(groups)
+
+        for role, user_id in (("landlord", landlord_id), ("tenant", tenant_id)):
+            queries, elapsed = fetch(client, f"/api/groups/{role}", user_id, role)
+            counts[role].add(queries)
+            print(f"{groups:>4} groups  GET /api/groups/{role:<9} {queries:>3} queries  {elapsed:8.2f} ms")
+
+    flat = all(len(seen) == 1 for seen in counts.values())
+    print("Query count is flat" if flat else "Query count grows with the number of groups")
+    sys.exit(0 if flat else 1)
+
+
+if __name__ == "__main__":
+    main()
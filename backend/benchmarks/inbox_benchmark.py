@@ -0,0 +1,130 @@
+"""Check the inbox against a brute-force count and show its query count doesn't grow with the conversations.
+
+Seeds a throwaway SQLite database where one user takes part in --conversations conversations
+spread over a few groups, each with a random history and a random read watermark, then for
+each size compares every conversation's last message and unread count from
+GET /api/conversations/inbox with one computed message by message, and reports the queries and
+time of a cold request and of an idle poll sending the ETag back. Exits non-zero if a count is
+wrong, the query count grows, or the idle poll isn't a 304.
+
+Run from the backend directory: python -m benchmarks.inbox_benchmark [--conversations 10 100 1000]
+"""
+import argparse
+import random
+import sys
+
+from benchmarks.fixtures import configure
+configure("inbox_benchmark")
+
+from main import app
+from db import db
+from models import User, Group, Conversation, Participant, Message
+from benchmarks.fixtures import create_tables, add_tenants, auth_headers
+from datetime import datetime, timedelta
+import time
+
+GROUPS = 5
+MEMBERS = 4
+MAX_MESSAGES = 60
+BATCH = 10000
+
+
+def seed(conversations):
+    create_tables(User, Group, Conversation, Participant, Message)
+    users = add_tenants(MEMBERS)
+    groups = [Group(name=f"House {i}", landlord_id=users[1].id) for i in range(GROUPS)]
+    db.session.add_all(groups)
+    db.session.flush()
+    chats = [Conversation(group_id=groups[i % GROUPS].id, type="group", name=f"Chat {i}") for i in range(conversations)]
+    # One conversation the user isn't in
+    chats.append(Conversation(group_id=groups[0].id, type="dm", name="Someone else's DM"))
+    db.session.add_all(chats)
+    db.session.flush()
+
+    rng = random.Random(conversations)
+    start = datetime(2025, 1, 1)
+    rows = []
+    for chat in chats:
+        for i in range(rng.randint(0, MAX_MESSAGES)):
+            rows.append({"conversation_id": chat.id, "sender_id": users[rng.randrange(MEMBERS)].id,
+                         "content": f"Message {i} in {chat.name} " * 8, "created_at": start + timedelta(seconds=len(rows)),
+                         "updated_at": start + timedelta(seconds=len(rows))})
+    # Interleave conversations so each history is spread over the id range
+    rng.shuffle(rows)
+    for i in range(0, len(rows), BATCH):
+        db.session.execute(Message.__table__.insert(), rows[i:i + BATCH])
+    db.session.flush()
+
+    message_ids = {}
+    for conversation_id, message_id in db.session.execute(db.select(Message.conversation_id, Message.id)):
+        message_ids.setdefault(conversation_id, []).append(message_id)
+    for chat in chats[:-1]:
+        ids = sorted(message_ids.get(chat.id, []))
+        for user in users:
+            watermark = rng.choice(ids + [None]) if ids else None
+            db.session.add(Participant(conversation_id=chat.id, user_id=user.id, last_read_message_id=watermark))
+    db.session.add(Participant(conversation_id=chats[-1].id, user_id=users[1].id))
+    db.session.commit()
+    db.session.execute(db.text("ANALYZE"))
+    return users[0].id
+
+
+def expected_inbox(user_id):
+    """{conversation id: (last message id, unread count)}, message by message"""
+    expected = {}
+    for participant in Participant.query.filter_by(user_id=user_id):
+        messages = Message.query.filter_by(conversation_id=participant.conversation_id).all()
+        last = max((message.id for message in messages), default=None)
+        watermark = participant.last_read_message_id or 0
+        unread = sum(1 for message in messages if message.id > watermark and message.sender_id != user_id)
+        expected[participant.conversation_id] = (last, unread)
+    return expected
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--conversations", type=int, nargs="+", default=[10, 100, 1000])
+    args = parser.parse_args()
+
+    client = app.test_client()
+    ok = True
+    query_counts = set()
+
+    for size in args.conversations:
+        with app.app_context():
+            user_id = seed(size)
+            expected = expected_inbox(user_id)
+        headers = auth_headers(user_id)
+
+        start = time.perf_counter()
+        response = client.get("/api/conversations/inbox", headers=headers)
+        cold_ms = (time.perf_counter() - start) * 1000
+        assert response.status_code == 200, response.get_data(as_text=True)[:500]
+        cold_queries = int(response.headers["X-Query-Count"])
+        inbox = response.get_json()["data"]
+
+        actual = {item["id"]: (item["lastMessage"]["id"] if item["lastMessage"] else None, item["unreadCount"]) for item in inbox}
+        wrong = [conversation_id for conversation_id in expected if expected[conversation_id] != actual.get(conversation_id)]
+        wrong += [conversation_id for conversation_id in actual if conversation_id not in expected]
+        ordered = [item["lastMessage"]["id"] for item in inbox if item["lastMessage"]]
+        if ordered != sorted(ordered, reverse=True):
+            wrong.append("order")
+
+        start = time.perf_counter()
+        idle = client.get("/api/conversations/inbox", headers={**headers, "If-None-Match": response.headers["ETag"]})
+        idle_ms = (time.perf_counter() - start) * 1000
+        idle_queries = int(idle.headers["X-Query-Count"])
+
+        print(f"{size:>5} conversations  inbox {cold_queries} queries {cold_ms:8.2f} ms  "
+              f"idle poll {idle.status_code} {idle_queries} query {idle_ms:6.2f} ms  "
+              f"{'ok' if not wrong else 'WRONG: ' + ', '.join(map(str, wrong[:10]))}")
+        ok = ok and not wrong and idle.status_code == 304
+        query_counts.add((cold_queries, idle_queries))
+
+    ok = ok and len(query_counts) == 1
+    print("Inbox counts are right in a fixed number of queries" if ok else "Inbox is wrong or its query count grows")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""Show query plans and latency for the hot lookups before and after the index pack.
+
+Seeds a throwaway database (BENCH_DB_URL, a local SQLite file by default, or point it at
+an empty MySQL schema), runs each lookup without the new indexes, builds them, and runs
+the lookups again.
+
+Run from the backend directory: python -m benchmarks.index_benchmark [--scale 200000]
+"""
+from sqlalchemy import create_engine, text, MetaData, Index, UniqueConstraint
+from migrations.add_lookup_indexes import INDEXES
+from db import db
+from models import *
+from datetime import datetime, timedelta
+import argparse
+import os
+import random
+import time
+
+TABLES = ("users", "properties", "groups", "conversation", "message", "participant",
+          "group_participant", "item", "reviews", "inventory", "expenses")
+
+LOOKUPS = [
+    ("messages in a conversation",
+        "SELECT * FROM message WHERE conversation_id = :conversation ORDER BY created_at"),
+    ("participant check",
+        "SELECT id FROM participant WHERE conversation_id = :conversation AND user_id = :user"),
+    ("tenant's groups",
+        "SELECT group_id FROM group_participant WHERE tenant_id = :user"),
+    ("items in a list",
+        "SELECT * FROM item WHERE list_id = :list"),
+    ("reviews of a property",
+        "SELECT * FROM reviews WHERE review_type = 'property' AND reviewed_item_id = :property"),
+    ("low inventory",
+        "SELECT * FROM inventory WHERE group_id = :group AND quantity <= 2"),
+    ("expenses paid by a user",
+        "SELECT * FROM expenses WHERE group_id = :group AND paid_by = :user"),
+    ("expenses owed to a user",
+        "SELECT * FROM expenses WHERE group_id = :group AND owed_to = :user"),
+]
+
+
+def build_schema(engine):
+    """Create the tables without the index pack, returning the indexes to build later"""
+    metadata = MetaData()
+    pending = []
+    for name in TABLES:
+        table = db.metadata.tables[name].to_metadata(metadata)
+        for index in list(table.indexes):
+            if index.name in INDEXES:
+                table.indexes.discard(index)
+                pending.append((table, index.name, [column.name for column in index.columns], index.unique))
+        for constraint in list(table.constraints):
+            if isinstance(constraint, UniqueConstraint) and constraint.name in INDEXES:
+                table.constraints.discard(constraint)
+                pending.append((table, constraint.name, [column.name for column in constraint.columns], True))
+    metadata.drop_all(engine)
+    metadata.create_all(engine)
+    return metadata, pending
+
+
+def seed(engine, metadata, scale):
+    users, groups = max(scale // 200, 10), max(scale // 1000, 5)
+    conversations = groups * 4
+    now = datetime(2025, 1, 1)
+    t = metadata.tables
+
+    with engine.begin() as conn:
+        conn.execute(t["users"].insert(), [
+            {"id": i, "firstName": "U", "lastName": str(i), "username": f"u{i}", "email": f"u{i}@example.com",
+             "password": "x", "role": "tenant"} for i in range(1, users + 1)])
+        conn.execute(t["groups"].insert(), [
+            {"id": i, "name": f"g{i}", "landlord_id": 1} for i in range(1, groups + 1)])
+        conn.execute(t["conversation"].insert(), [
+            {"id": i, "group_id": (i % groups) + 1, "type": "group", "name": f"c{i}"} for i in range(1, conversations + 1)])
+        conn.execute(t["participant"].insert(), [
+            {"conversation_id": c, "user_id": u, "role": "tenant"}
+            for c in range(1, conversations + 1) for u in random.sample(range(1, users + 1), min(5, users))])
+        conn.execute(t["group_participant"].insert(), [
+            {"group_id": (i % groups) + 1, "tenant_id": (i % users) + 1} for i in range(scale // 10)])
+        for start in range(0, scale, 20000):
+            conn.execute(t["message"].insert(), [
+                {"conversation_id": random.randint(1, conversations), "sender_id": random.randint(1, users),
+                 "content": "hello", "created_at": now + timedelta(seconds=i), "updated_at": now}
+                for i in range(start, min(start + 20000, scale))])
+        conn.execute(t["item"].insert(), [
+            {"list_id": random.randint(1, scale // 20), "item": "milk", "purchased": 0} for _ in range(scale // 2)])
+        conn.execute(t["reviews"].insert(), [
+            {"review_type": random.choice(["user", "property"]), "reviewed_item_id": random.randint(1, scale // 50),
+             "reviewer_id": 1, "score": 5} for _ in range(scale // 2)])
+        conn.execute(t["inventory"].insert(), [
+            {"item_name": "soap", "quantity": random.randint(0, 20), "group_id": random.randint(1, groups)}
+            for _ in range(scale // 2)])
+        conn.execute(t["expenses"].insert(), [
+            {"expense_name": "rent", "group_id": random.randint(1, groups), "amount": 10.0,
+             "paid_by": random.randint(1, users), "owed_to": random.randint(1, users), "completed": False}
+            for _ in range(scale // 2)])
+
+    return {"conversation": 1, "user": 1, "list": 1, "property": 1, "group": 1}
+
+
+def report(engine, params, runs):
+    prefix = "EXPLAIN QUERY PLAN " if engine.dialect.name == "sqlite" else "EXPLAIN "
+    with engine.connect() as conn:
+        for label, sql in LOOKUPS:
+            plan = conn.execute(text(prefix + sql), params).all()
+            start = time.perf_counter()
+            for _ in range(runs):
+                conn.execute(text(sql), params).all()
+            elapsed = (time.perf_counter() - start) / runs * 1000
+            print(f"  {label:<26} {elapsed:8.3f} ms")
+            for row in plan:
+                print(f"      {' | '.join(str(value) for value in row)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", type=int, default=200000, help="number of messages to seed")
+    parser.add_argument("--runs", type=int, default=50)
+    args = parser.parse_args()
+
+    engine = create_engine(os.getenv("BENCH_DB_URL", "sqlite:///index_benchmark.db"))
+    metadata, pending = build_schema(engine)
+    params = seed(engine, metadata, args.scale)
+
+    print("Before index pack")
+    report(engine, params, args.runs)
+
+    with engine.begin() as conn:
+        for table, name, columns, unique in pending:
+            Index(name, *[table.c[column] for column in columns], unique=unique).create(conn)
+
+    print("After index pack")
+    report(engine, params, args.runs)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Compare jsonify throughput of the stock Flask provider against our providers.
+
+Run from the backend directory: python -m benchmarks.json_benchmark
+"""
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+from datetime import datetime, timedelta
+from json_provider import StdlibJSONProvider, OrjsonProvider, orjson
+import timeit
+
+def message_payload(count):
+    now = datetime(2025, 1, 1, 12, 0, 0)
+    sender = {
+        "id": 7,
+        "firstName": "Jane",
+        "lastName": "Doe",
+        "username": "jdoe",
+        "email": "jane@example.com",
+        "role": "tenant",
+        "verified": True,
+    }
+    return {
+        "status": "success",
+        "message": f"{count} messages found",
+        "data": [{
+            "id": i,
+            "conversationId": 3,
+            "senderId": 7,
+            "content": "Did anyone take out the recycling this week? " * 2,
+            "readBy": [7, 9, 11],
+            "createdAt": now + timedelta(seconds=i),
+            "updatedAt": now + timedelta(seconds=i),
+            "sender": sender,
+        } for i in range(count)],
+        "errors": [],
+    }
+
+def expense_payload(count):
+    user = {"id": 2, "firstName": "Sam", "lastName": "Lee", "username": "slee", "email": "sam@example.com", "role": "tenant", "verified": True}
+    return {
+        "status": "success",
+        "message": f"{count} expense(s) found",
+        "data": [{
+            "id": i,
+            "expenseName": f"Groceries #{i}",
+            "groupId": 1,
+            "amount": 42.75 + i,
+            "paidBy": 2,
+            "owedTo": 3,
+            "completed": i % 2 == 0,
+            "owed_to_user": user,
+            "paid_by_user": user,
+        } for i in range(count)],
+        "errors": [],
+    }
+
+def run(name, provider_class, payload, number):
+    app = Flask(__name__)
+    app.json = provider_class(app)
+    with app.app_context():
+        seconds = timeit.timeit(lambda: app.json.response(payload).get_data(), number=number)
+    print(f"  {name:<10} {seconds / number * 1000:8.3f} ms/response")
+
+if __name__ == "__main__":
+    providers = [("stock", DefaultJSONProvider), ("stdlib", StdlibJSONProvider)]
+    if orjson:
+        providers.append(("orjson", OrjsonProvider))
+
+    for label, payload, number in [
+        ("get_messages, 1000 messages", message_payload(1000), 50),
+        ("get_expenses, 500 expenses", expense_payload(500), 50),
+    ]:
+        print(label)
+        for name, provider_class in providers:
+            run(name, provider_class, payload, number)
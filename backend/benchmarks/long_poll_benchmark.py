@@ -0,0 +1,194 @@
+"""Time how quickly a long poll for new messages answers, and what an idle one costs.
+
+Runs GET /api/messages/conversation/<id>/wait?after=<newest id> on a throwaway SQLite database
+under the threaded Flask app and under the ASGI app (uvicorn), and for each sends a message
+while the request is held: through POST /api/messages/send in the same process (woken by the
+in-process notifier), and committed from a separate connection as another worker would (woken
+by the shared outbox read, within GATEWAY_POLL_SECONDS), and committed out of order (its event id
+below one the outbox readers already moved past, as when a slower transaction commits last). Also
+reports the SQL statements an idle long poll runs until its timeout. Exits non-zero if a long poll
+misses its message.
+
+Run from the backend directory: python -m benchmarks.long_poll_benchmark [--timeout 3]
+Needs the dev requirements: pip install -r requirements-dev.txt
+"""
+import argparse
+import sys
+
+from benchmarks.fixtures import configure
+configure("long_poll_benchmark", async_db=True)
+
+from asgi import application
+from main import app
+from db import db
+from models import User, Group, Conversation, Participant, Message, ChatEvent
+from benchmarks.fixtures import create_tables, add_tenants, add_group_chat, auth_headers
+from realtime import GATEWAY_POLL_SECONDS, publish, conversation_channel
+import asyncio
+import json
+import socket
+import threading
+import time
+import httpx
+import uvicorn
+
+SEND_AFTER = 0.5  # seconds into the long poll
+
+
+def seed():
+    create_tables(User, Group, Conversation, Participant, Message, ChatEvent)
+    users = add_tenants(2)
+    _, conversation = add_group_chat(users)
+    db.session.add(Message(conversation_id=conversation.id, sender_id=users[0].id, content="Hello"))
+    db.session.commit()
+    return conversation.id, [user.id for user in users]
+
+
+def newest_id():
+    with app.app_context():
+        return db.session.scalar(db.select(db.func.max(Message.id)))
+
+
+def commit_elsewhere(conversation_id, sender_id, content):
+    """Send a message without notifying this process, like a request served by another worker"""
+    with app.test_request_context():
+        message = Message(conversation_id=conversation_id, sender_id=sender_id, content=content)
+        db.session.add(message)
+        db.session.flush()
+        publish(db.session, conversation_channel(conversation_id), "message.created", {"id": message.id})
+        db.session.info.pop("chat_events")
+        db.session.commit()
+
+
+def commit_out_of_order(conversation_id, sender_id, content):
+    """Commit an event past the next id first, then the message under the skipped id once the readers moved on"""
+    with app.test_request_context():
+        skipped = (db.session.scalar(db.select(db.func.max(ChatEvent.id))) or 0) + 1
+        db.session.add(ChatEvent(id=skipped + 1, channel=conversation_channel(0), type="message.created", payload="{}"))
+        db.session.commit()
+    time.sleep(GATEWAY_POLL_SECONDS * 1.5)
+    with app.test_request_context():
+        message = Message(conversation_id=conversation_id, sender_id=sender_id, content=content)
+        db.session.add(message)
+        db.session.flush()
+        db.session.add(ChatEvent(id=skipped, channel=conversation_channel(conversation_id), type="message.created",
+                                 payload=json.dumps({"id": message.id})))
+        db.session.commit()
+
+
+def late_timeout(args):
+    """Out of order commits land GATEWAY_POLL_SECONDS * 1.5 after the send, give them a few ticks more"""
+    return max(args.timeout, SEND_AFTER + GATEWAY_POLL_SECONDS * 4)
+
+
+def send_in_process(client, conversation_id, sender_id, content):
+    response = client.post("/api/messages/send", json={"conversationId": conversation_id, "content": content},
+                           headers=auth_headers(sender_id))
+    assert response.status_code == 201, response.get_data(as_text=True)[:500]
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def report(server, how, content, data, elapsed, queries=None):
+    got = [message["content"] for message in data]
+    ok = got == [content] if content else got == []
+    wake = "timeout" if content is None else f"+{(elapsed - SEND_AFTER) * 1000:.0f} ms after the send"
+    counted = f"  {queries} queries" if queries is not None else ""
+    print(f"{server:<9} {how:<32} answered in {elapsed * 1000:7.1f} ms ({wake}){counted}  {'ok' if ok else f'WRONG: {got}'}")
+    return ok
+
+
+def run_threaded(args, conversation_id, user_ids):
+    client = app.test_client()
+    headers = auth_headers(user_ids[1])
+    ok = True
+
+    for how, send, timeout in (
+            ("same process (notifier)", lambda content: send_in_process(client, conversation_id, user_ids[0], content), args.timeout),
+            ("other process (outbox thread)", lambda content: commit_elsewhere(conversation_id, user_ids[0], content), args.timeout),
+            ("out of order (outbox thread)", lambda content: commit_out_of_order(conversation_id, user_ids[0], content), late_timeout(args)),
+            ("nothing sent", None, args.timeout)):
+        content = None if send is None else f"Threaded {how}"
+        after = newest_id()
+        if send is not None:
+            threading.Timer(SEND_AFTER, send, [content]).start()
+        start = time.perf_counter()
+        response = client.get(f"/api/messages/conversation/{conversation_id}/wait?after={after}&timeout={timeout}", headers=headers)
+        elapsed = time.perf_counter() - start
+        assert response.status_code == 200, response.get_data(as_text=True)[:500]
+        ok = report("threaded", how, content, response.get_json()["data"], elapsed, response.headers.get("X-Query-Count")) and ok
+    return ok
+
+
+async def run_async(args, port, conversation_id, user_ids):
+    ok = True
+    headers = auth_headers(user_ids[1])
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=args.timeout + 10) as client:
+        async def send_over_http(content):
+            response = await client.post("/api/messages/send", json={"conversationId": conversation_id, "content": content},
+                                         headers=auth_headers(user_ids[0]))
+            assert response.status_code == 201, response.text[:500]
+
+        async def send_elsewhere(content):
+            await asyncio.to_thread(commit_elsewhere, conversation_id, user_ids[0], content)
+
+        async def send_out_of_order(content):
+            await asyncio.to_thread(commit_out_of_order, conversation_id, user_ids[0], content)
+
+        for how, send, timeout in (("same process (notifier)", send_over_http, args.timeout),
+                                   ("other process (gateway tail)", send_elsewhere, args.timeout),
+                                   ("out of order (gateway tail)", send_out_of_order, late_timeout(args)),
+                                   ("nothing sent", None, args.timeout)):
+            content = None if send is None else f"Async {how}"
+            after = await asyncio.to_thread(newest_id)
+
+            async def send_later():
+                await asyncio.sleep(SEND_AFTER)
+                await send(content)
+
+            sending = asyncio.create_task(send_later()) if send is not None else None
+            start = time.perf_counter()
+            response = await client.get(f"/api/messages/conversation/{conversation_id}/wait",
+                                        params={"after": after, "timeout": timeout}, headers=headers)
+            elapsed = time.perf_counter() - start
+            if sending is not None:
+                await sending
+            assert response.status_code == 200, response.text[:500]
+            ok = report("async", how, content, response.json()["data"], elapsed) and ok
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--timeout", type=float, default=3)
+    args = parser.parse_args()
+
+    with app.app_context():
+        conversation_id, user_ids = seed()
+
+    ok = run_threaded(args, conversation_id, user_ids)
+
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(application, host="127.0.0.1", port=port, lifespan="on", log_level="warning"))
+
+    async def serve_and_run():
+        serving = asyncio.create_task(server.serve())
+        while not server.started:
+            await asyncio.sleep(0.05)
+        try:
+            return await run_async(args, port, conversation_id, user_ids)
+        finally:
+            server.should_exit = True
+            await serving
+
+    ok = asyncio.run(serve_and_run()) and ok
+    print("Every long poll got its message" if ok else "A long poll missed its message")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""Check that polling a conversation costs the same however long its history is.
+
+Seeds a throwaway SQLite database with one conversation of growing length (and a busy
+neighbouring conversation), then times the client's requests: the latest page, a page of
+older messages and a poll with ?after=<last id> when nothing and when a few messages are
+new. Exits non-zero if the query count of a poll grows with the history.
+
+Run from the backend directory: python -m benchmarks.message_poll_benchmark [--sizes 1000 10000 100000]
+"""
+import argparse
+import sys
+
+from benchmarks.fixtures import configure
+configure("message_poll_benchmark")
+
+from main import app
+from db import db
+from models import User, Group, Conversation, Participant, Message
+from benchmarks.fixtures import create_tables, add_tenants, add_group_chat, auth_headers
+from datetime import datetime, timedelta
+import time
+
+MEMBERS = 5
+NEW_MESSAGES = 3
+BATCH = 10000
+RUNS = 5
+
+
+def seed(size):
+    """Reset the tables and fill conversation 1 with size messages from MEMBERS users"""
+    create_tables(User, Group, Conversation, Participant, Message)
+    users = add_tenants(MEMBERS)
+    group, conversation = add_group_chat(users)
+    neighbour = Conversation(group_id=group.id, type="group", name="Other chat")
+    db.session.add(neighbour)
+    db.session.commit()
+    conversations = [conversation, neighbour]
+
+    start = datetime(2025, 1, 1)
+    rows = []
+    # Interleave a second conversation so the chat's messages aren't one contiguous range
+    for i in range(size * 2):
+        rows.append({"conversation_id": conversations[i % 2].id, "sender_id": users[i % MEMBERS].id,
+                     "content": f"Message {i}", "created_at": start + timedelta(seconds=i),
+                     "updated_at": start + timedelta(seconds=i)})
+        if len(rows) == BATCH:
+            db.session.execute(Message.__table__.insert(), rows)
+            rows = []
+    if rows:
+        db.session.execute(Message.__table__.insert(), rows)
+    db.session.commit()
+    db.session.execute(db.text("ANALYZE"))
+    return conversations[0].id, users[0].id
+
+
+def timed(client, path, headers):
+    best = None
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        response = client.get(path, headers=headers)
+        elapsed = (time.perf_counter() - start) * 1000
+        assert response.status_code == 200, response.get_data(as_text=True)[:500]
+        best = elapsed if best is None else min(best, elapsed)
+    return response, int(response.headers["X-Query-Count"]), best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    args = parser.parse_args()
+
+    client = app.test_client()
+    counts = set()
+
+    for size in args.sizes:
+        with app.app_context():
+            conversation_id, user_id = seed(size)
+        headers = auth_headers(user_id)
+        path = f"/api/messages/conversation/{conversation_id}"
+
+        latest, queries, elapsed = timed(client, path, headers)
+        print(f"{size:>7} messages  latest page          {queries:>2} queries  {elapsed:7.2f} ms")
+        first_id = latest.get_json()["data"][0]["id"]
+        _, queries, elapsed = timed(client, f"{path}?before={first_id}", headers)
+        print(f"{size:>7} messages  older page           {queries:>2} queries  {elapsed:7.2f} ms")
+
+        last_id = latest.get_json()["data"][-1]["id"]
+        response, queries, elapsed = timed(client, f"{path}?after={last_id}", headers)
+        assert response.get_json()["data"] == []
+        counts.add(("empty", queries))
+        print(f"{size:>7} messages  poll, nothing new    {queries:>2} queries  {elapsed:7.2f} ms")
+
+        with app.app_context():
+            db.session.add_all([Message(conversation_id=conversation_id, sender_id=user_id, content=f"New {i}")
+                                for i in range(NEW_MESSAGES)])
+            db.session.commit()
+        response, queries, elapsed = timed(client, f"{path}?after={last_id}", headers)
+        assert len(response.get_json()["data"]) == NEW_MESSAGES
+        counts.add(("new", queries))
+        print(f"{size:>7} messages  poll, {NEW_MESSAGES} new          {queries:>2} queries  {elapsed:7.2f} ms")
+
+    flat = len(counts) == 2
+    print("Poll cost is flat" if flat else "Poll query count grows with the history")
+    sys.exit(0 if flat else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Measure peak RSS of GET /api/properties with and without the gallery image bytes.
+
+Seeds a throwaway SQLite database with 100 properties x 10 images, then calls the endpoint
+in a fresh process for each mode so the peaks don't mix:
+
+  full     ?includeImages=true, every gallery image read and encoded (what the list always did before)
+  default  exterior images only, gallery images as metadata
+
+Run from the backend directory: python -m benchmarks.property_memory_benchmark [--image-kb 100]
+"""
+import argparse
+import os
+import resource
+import shutil
+import subprocess
+import sys
+
+from benchmarks.fixtures import configure, create_tables, add_landlord, auth_headers
+
+MODES = {"full": "?includeImages=true", "default": ""}
+
+
+def seed(properties, images, image_kb):
+    from main import app
+    from db import db
+    from models import User, Property, PropertyImage, ImageVariant
+    from models.property import PropertyType
+
+    with app.app_context():
+        create_tables(User, Property, PropertyImage, ImageVariant)
+        landlord = add_landlord()
+
+        for i in range(properties):
+            property_item = Property(name=f"House {i}", address=f"{i} Main St", city="Springfield", property_description="",
+                                     bedrooms=3, price=1000, property_type=PropertyType.House, landlord_id=landlord.id,
+                                     exterior_image=os.urandom(image_kb * 1024))
+            db.session.add(property_item)
+            db.session.flush()
+            db.session.add_all([PropertyImage(property_id=property_item.id, label=f"Room {j}", image=os.urandom(image_kb * 1024))
+                                for j in range(images)])
+        db.session.commit()
+        return landlord.id
+
+
+def measure(workdir, mode, landlord_id):
+    """Runs in a child process: call the endpoint once and print the RSS growth"""
+    configure("property_memory_benchmark", workdir)
+    from main import app
+
+    client = app.test_client()
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    response = client.get(f"/api/properties/{MODES[mode]}", headers=auth_headers(landlord_id, "landlord", **{"Accept-Encoding": "identity"}))
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    assert response.status_code == 200, response.get_data(as_text=True)[:500]
+
+    print(f"{mode:<8} peak RSS {peak / 1024:8.1f} MB  (+{(peak - baseline) / 1024:.1f} MB for the request)  "
+          f"body {len(response.get_data()) / 1024 / 1024:.1f} MB  {response.headers['X-Query-Count']} queries")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--properties", type=int, default=100)
+    parser.add_argument("--images", type=int, default=10, help="gallery images per property")
+    parser.add_argument("--image-kb", type=int, default=100)
+    parser.add_argument("--measure", nargs=3, metavar=("WORKDIR", "MODE", "LANDLORD_ID"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        workdir, mode, landlord_id = args.measure
+        measure(workdir, mode, int(landlord_id))
+        return
+
+    workdir = configure("property_memory_benchmark")
+    landlord_id = seed(args.properties, args.images, args.image_kb)
+    print(f"{args.properties} properties x {args.images} images of {args.image_kb} KB")
+
+    for mode in MODES:
+        subprocess.run([sys.executable, "-m", "benchmarks.property_memory_benchmark", "--measure", workdir, mode, str(landlord_id)], check=True)
+
+    shutil.rmtree(workdir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Check read receipts from per-participant watermarks and count what marking a conversation read costs.
+
+Seeds a throwaway SQLite database with one conversation of --messages messages among --members
+participants, has each member mark a different message read through PATCH /api/messages/read,
+and checks every message's readBy on the latest page against the watermarks. Reports the SQL
+statements per mark (the old per-message read_by rewrite needed a read and a JSON write for
+every message marked), that a repeated mark publishes no chat event, and that a mark changes
+the page's ETag, and that a message id outside the conversation is refused without moving the
+watermark. Exits non-zero if anything is off.
+
+Run from the backend directory: python -m benchmarks.read_watermark_benchmark [--members 6] [--messages 200]
+"""
+import argparse
+import sys
+
+from benchmarks.fixtures import configure
+configure("read_watermark_benchmark")
+
+from main import app
+from db import db
+from models import User, Group, Conversation, Participant, Message, ChatEvent
+from benchmarks.fixtures import create_tables, add_tenants, add_group_chat, auth_headers
+from sqlalchemy import func, select
+
+
+def seed(members, messages):
+    create_tables(User, Group, Conversation, Participant, Message, ChatEvent)
+    users = add_tenants(members)
+    _, conversation = add_group_chat(users)
+    db.session.add_all([Message(conversation_id=conversation.id, sender_id=users[i % members].id, content=f"Message {i}")
+                        for i in range(messages)])
+    db.session.commit()
+    ids = db.session.scalars(select(Message.id).order_by(Message.id)).all()
+    return conversation.id, [user.id for user in users], ids
+
+
+def event_count():
+    with app.app_context():
+        return db.session.scalar(select(func.count()).select_from(ChatEvent))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--members", type=int, default=6)
+    parser.add_argument("--messages", type=int, default=200)
+    args = parser.parse_args()
+
+    with app.app_context():
+        conversation_id, user_ids, message_ids = seed(args.members, args.messages)
+    client = app.test_client()
+    page_url = f"/api/messages/conversation/{conversation_id}"
+    ok = True
+
+    etag = client.get(page_url, headers=auth_headers(user_ids[0])).headers["ETag"]
+
+    # Member i has read up to a different point of the history
+    read_up_to = {user_id: message_ids[-1 - i * 7] for i, user_id in enumerate(user_ids)}
+    statements = []
+    for user_id, message_id in read_up_to.items():
+        response = client.patch("/api/messages/read", json={"conversationId": conversation_id, "messageId": message_id},
+                                headers=auth_headers(user_id))
+        assert response.status_code == 200, response.get_data(as_text=True)[:500]
+        statements.append(int(response.headers["X-Query-Count"]))
+    print(f"mark read: {min(statements)}-{max(statements)} statements per call, however many messages it covers")
+
+    events = event_count()
+    response = client.patch("/api/messages/read", json={"conversationId": conversation_id, "messageId": message_ids[0]},
+                            headers=auth_headers(user_ids[0]))
+    repeat_ok = response.status_code == 200 and event_count() == events
+    print(f"marking an older message again: {response.headers['X-Query-Count']} statements, "
+          f"{'no event published' if repeat_ok else 'WRONG: published an event'}")
+    ok = ok and repeat_ok
+
+    response = client.patch("/api/messages/read", json={"conversationId": conversation_id, "messageId": message_ids[-1] + 1000},
+                            headers=auth_headers(user_ids[-1]))
+    with app.app_context():
+        watermark = db.session.scalar(select(Participant.last_read_message_id).where(
+            Participant.conversation_id == conversation_id, Participant.user_id == user_ids[-1]))
+    foreign_ok = response.status_code == 404 and watermark == read_up_to[user_ids[-1]]
+    print(f"marking a message outside the conversation: {response.status_code}, "
+          f"{'watermark unchanged' if foreign_ok else f'WRONG: watermark now {watermark}'}")
+    ok = ok and foreign_ok
+
+    response = client.get(page_url, headers=auth_headers(user_ids[0], **{"If-None-Match": etag}))
+    etag_ok = response.status_code == 200
+    print(f"page ETag after marks: {'changed' if etag_ok else 'WRONG: still 304'}")
+    ok = ok and etag_ok
+
+    wrong = []
+    for message in response.get_json()["data"]:
+        expected = sorted(user_id for user_id, last_read in read_up_to.items()
+                          if last_read >= message["id"] and user_id != message["senderId"])
+        if sorted(message["readBy"]) != expected:
+            wrong.append(message["id"])
+    print(f"readBy on the latest page ({len(response.get_json()['data'])} messages, "
+          f"{response.headers['X-Query-Count']} queries): {'matches the watermarks' if not wrong else f'WRONG for {wrong}'}")
+    ok = ok and not wrong
+
+    print("Read watermarks work" if ok else "Read watermarks are wrong")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
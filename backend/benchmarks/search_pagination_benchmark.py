@@ -0,0 +1,117 @@
+"""Check that a page of tenant search costs the same however many listings there are.
+
+Seeds a throwaway SQLite database with growing numbers of available properties, then times
+the first page and a page deep into the results for every ?sort=, following a cursor taken
+from the middle of the table. Exits non-zero if the query count grows; page times should stay
+flat too. SQLite seeks only on the leading sort column, so a page inside a long run of equal
+values (sort=bedrooms) scans the rest of that run here, where MySQL seeks to the exact row.
+
+Run from the backend directory: python -m benchmarks.search_pagination_benchmark [--sizes 10000 100000 300000]
+"""
+import argparse
+import os
+import random
+import sys
+
+from benchmarks.fixtures import configure
+configure("search_pagination_benchmark")
+
+from main import app
+from db import db
+from models import User, Property, ImageVariant
+from models.user import UserRole
+from models.property import PropertyType
+from controllers.property_controller import SEARCH_SORTS
+from blob_store import store_blob
+from pagination import encode_cursor
+from benchmarks.fixtures import create_tables, auth_headers
+from sqlalchemy import func, select
+import time
+
+LANDLORDS = 50
+BATCH = 10000
+RUNS = 5
+
+
+def seed(size):
+    """Reset the tables and add size properties (a tenth of them unavailable) spread over LANDLORDS landlords"""
+    create_tables(User, Property, ImageVariant)
+
+    landlords = [User(firstName="Lee", lastName=str(i), username=f"landlord{i}", email=f"landlord{i}@example.com",
+                      password="x", role=UserRole.landlord) for i in range(LANDLORDS)]
+    db.session.add_all(landlords)
+    db.session.commit()
+    key, image_size, mime_type = store_blob(b"\xff\xd8\xff" + os.urandom(1024))
+
+    rng = random.Random(size)
+    rows = []
+    for i in range(size):
+        rows.append({
+            "name": f"House {i}", "address": f"{i} Main St", "city": "Springfield", "property_description": "",
+            "bedrooms": rng.randint(1, 6), "price": rng.randint(500, 5000), "property_type": PropertyType.House,
+            "availability": i % 10 != 0, "landlord_id": landlords[i % LANDLORDS].id,
+            "exterior_image_hash": key, "exterior_image_size": image_size, "exterior_image_type": mime_type,
+        })
+        if len(rows) == BATCH:
+            db.session.execute(Property.__table__.insert(), rows)
+            rows = []
+    if rows:
+        db.session.execute(Property.__table__.insert(), rows)
+    db.session.commit()
+    db.session.execute(db.text("ANALYZE"))
+
+
+def middle_cursor(sort):
+    """A cursor pointing at the middle of the available listings in sort order"""
+    column, descending = SEARCH_SORTS[sort]
+    available = db.session.scalar(select(func.count()).where(Property.availability == True))
+    ordering = [column.desc() if descending else column.asc()]
+    if column is not Property.id:
+        ordering.append(Property.id.desc() if descending else Property.id.asc())
+    row = db.session.execute(
+        select(column, Property.id).where(Property.availability == True).order_by(*ordering).offset(available // 2).limit(1)
+    ).first()
+    name = f"{sort}:{'desc' if descending else 'asc'}"
+    return encode_cursor([name, row.id] if column is Property.id else [name, row[0], row.id])
+
+
+def fetch(client, headers, query):
+    best = None
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        response = client.get(f"/api/properties/search?{query}&imageFormat=url", headers=headers)
+        elapsed = (time.perf_counter() - start) * 1000
+        assert response.status_code == 200, response.get_data(as_text=True)[:500]
+        best = elapsed if best is None else min(best, elapsed)
+    body = response.get_json()
+    assert len(body["data"]) == 20 and body["nextCursor"], body["message"]
+    return int(response.headers["X-Query-Count"]), best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 300000])
+    args = parser.parse_args()
+
+    client = app.test_client()
+    headers = auth_headers(1)
+    counts = set()
+
+    for size in args.sizes:
+        with app.app_context():
+            seed(size)
+            cursors = {sort: middle_cursor(sort) for sort in SEARCH_SORTS}
+
+        for sort in SEARCH_SORTS:
+            for label, query in (("first", f"sort={sort}&limit=20"), ("middle", f"sort={sort}&limit=20&cursor={cursors[sort]}")):
+                queries, elapsed = fetch(client, headers, query)
+                counts.add(queries)
+                print(f"{size:>7} listings  sort={sort:<9} {label:<7} page  {queries:>2} queries  {elapsed:7.2f} ms")
+
+    flat = len(counts) == 1
+    print("Query count is flat" if flat else "Query count grows with the number of listings")
+    sys.exit(0 if flat else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Compare ?q= full-text search with a substring scan as the listings table grows.
+
+Seeds a throwaway SQLite database (searched through its FTS5 mirror of the FULLTEXT columns)
+with growing numbers of listings whose descriptions are drawn from a fixed vocabulary, plus
+one rare word that appears in the same number of listings at every size. Times the first
+page of GET /api/properties/search?q=<rare word> against the same search done as
+ILIKE '%word%' over name, description and city. Exits non-zero if the full-text time grows
+with the table the way the scan does.
+
+Run from the backend directory: python -m benchmarks.text_search_benchmark [--sizes 10000 50000 200000]
+"""
+import argparse
+import os
+import random
+import sys
+
+from benchmarks.fixtures import configure
+configure("text_search_benchmark")
+
+from main import app
+from db import db
+from models import User, Property, ImageVariant
+from models.property import PropertyType
+from controllers.property_controller import apply_tenant_search_filters
+from search import apply_text_search
+from blob_store import store_blob
+from benchmarks.fixtures import create_tables, add_landlord, auth_headers
+import time
+
+VOCABULARY = [f"word{i}" for i in range(2000)]
+RARE_WORD = "skylight"
+RARE_MATCHES = 50
+BATCH = 10000
+RUNS = 5
+
+
+def seed(size):
+    """Reset the tables and add size available listings, RARE_MATCHES of them mentioning RARE_WORD"""
+    create_tables(User, Property, ImageVariant)
+    landlord = add_landlord()
+    db.session.commit()
+    key, image_size, mime_type = store_blob(b"\xff\xd8\xff" + os.urandom(1024))
+
+    rng = random.Random(size)
+    rare = set(rng.sample(range(size), RARE_MATCHES))
+    rows = []
+    for i in range(size):
+        words = rng.choices(VOCABULARY, k=30) + ([RARE_WORD] if i in rare else [])
+        rows.append({
+            "name": f"House {i}", "address": f"{i} Main St", "city": "Springfield", "property_description": " ".join(words),
+            "bedrooms": rng.randint(1, 6), "price": rng.randint(500, 5000), "property_type": PropertyType.House,
+            "availability": True, "landlord_id": landlord.id,
+            "exterior_image_hash": key, "exterior_image_size": image_size, "exterior_image_type": mime_type,
+        })
+        if len(rows) == BATCH:
+            db.session.execute(Property.__table__.insert(), rows)
+            rows = []
+    if rows:
+        db.session.execute(Property.__table__.insert(), rows)
+    db.session.commit()
+    db.session.execute(db.text("ANALYZE"))
+
+
+def best_of(run):
+    best = None
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        result = run()
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 50000, 200000])
+    args = parser.parse_args()
+
+    client = app.test_client()
+    headers = auth_headers(1)
+    timings = {"full-text": [], "scan": []}
+
+    for size in args.sizes:
+        with app.app_context():
+            seed(size)
+
+            # The same search without a full-text index, as a substring match on every row
+            scan = apply_text_search(apply_tenant_search_filters(Property.query, {}), [RARE_WORD], "none")[0]
+            _, elapsed = best_of(lambda: scan.order_by(Property.id.desc()).limit(20).all())
+            timings["scan"].append(elapsed)
+            print(f"{size:>7} listings  ILIKE scan           {elapsed:8.2f} ms")
+
+        response, elapsed = best_of(lambda: client.get(
+            f"/api/properties/search?q={RARE_WORD}&limit=20&imageFormat=url", headers=headers
+        ))
+        assert response.status_code == 200 and len(response.get_json()["data"]) == 20, response.get_data(as_text=True)[:500]
+        timings["full-text"].append(elapsed)
+        print(f"{size:>7} listings  ?q= full-text page   {elapsed:8.2f} ms")
+
+    growth = args.sizes[-1] / args.sizes[0]
+    full_text, scan = timings["full-text"], timings["scan"]
+    print(f"Table grew {growth:.0f}x: full-text search took {full_text[-1] / full_text[0]:.1f}x as long, "
+          f"the scan {scan[-1] / scan[0]:.1f}x")
+    sublinear = full_text[-1] / full_text[0] < growth / 4
+    print("Full-text search is sublinear" if sublinear else "Full-text search grows with the table")
+    sys.exit(0 if sublinear else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Measure peak RSS of uploading one large image as base64 JSON and as multipart/form-data.
+
+Each upload runs in a fresh process so the peaks don't mix. The multipart peak should stay
+flat as --image-mb grows, the JSON one grows with about three copies of the image.
+
+Run from the backend directory: python -m benchmarks.upload_memory_benchmark [--image-mb 15]
+"""
+import argparse
+import base64
+import os
+import resource
+import shutil
+import subprocess
+import sys
+
+from benchmarks.fixtures import configure, create_tables, add_landlord, auth_headers
+
+MODES = ("json", "multipart")
+
+
+def seed():
+    from main import app
+    from db import db
+    from models import User, Property, PropertyImage, ImageVariant
+
+    with app.app_context():
+        create_tables(User, Property, PropertyImage, ImageVariant)
+        landlord = add_landlord()
+        db.session.commit()
+        return landlord.id
+
+
+def measure(workdir, mode, landlord_id, image_mb):
+    """Runs in a child process: upload one image and print the RSS growth"""
+    configure("upload_memory_benchmark", workdir)
+    from main import app
+
+    client = app.test_client()
+    headers = auth_headers(landlord_id, "landlord")
+    fields = {"name": "House", "address": "1 Main St", "city": "Springfield", "propertyDescription": "",
+              "bedrooms": "3", "price": "1000", "propertyType": "House"}
+
+    # Build the request body on disk, so the client side doesn't count towards the peak
+    image_path = os.path.join(workdir, "image.jpg")
+    with open(image_path, "wb") as image:
+        image.write(b"\xff\xd8\xff")
+        for _ in range(image_mb):
+            image.write(os.urandom(1024 * 1024))
+
+    if mode == "json":
+        with open(image_path, "rb") as image:
+            body = dict(fields, exteriorImage=base64.b64encode(image.read()).decode("ascii"))
+        baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        response = client.post("/api/properties/", json=body, headers=headers)
+    else:
+        baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        with open(image_path, "rb") as image:
+            response = client.post("/api/properties/", data=dict(fields, exteriorImage=(image, "image.jpg")),
+                                   headers=headers, content_type="multipart/form-data")
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    assert response.status_code == 201, response.get_data(as_text=True)[:500]
+
+    print(f"{mode:<9} peak RSS {peak / 1024:8.1f} MB  (+{(peak - baseline) / 1024:.1f} MB for the request)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--image-mb", type=int, default=15)
+    parser.add_argument("--measure", nargs=3, metavar=("WORKDIR", "MODE", "LANDLORD_ID"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        workdir, mode, landlord_id = args.measure
+        measure(workdir, mode, int(landlord_id), args.image_mb)
+        return
+
+    workdir = configure("upload_memory_benchmark")
+    landlord_id = seed()
+    print(f"One {args.image_mb} MB exterior image")
+
+    for mode in MODES:
+        subprocess.run([sys.executable, "-m", "benchmarks.upload_memory_benchmark", "--image-mb", str(args.image_mb),
+                        "--measure", workdir, mode, str(landlord_id)], check=True)
+
+    shutil.rmtree(workdir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+from abc import ABC, abstractmethod
+import hashlib
+import os
+import tempfile
+
+# Images live outside MySQL in a content-addressed store; tables keep the SHA-256, size and MIME type.
+# Identical uploads hash to the same key, so they are stored once however many rows point at them.
+
+CHUNK_SIZE = 64 * 1024
+
+# Leading bytes of the image formats the app accepts
+SIGNATURES = (
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+)
+
+
+def sniff_mime_type(data):
+    """Guess an image's MIME type from its leading bytes"""
+    for signature, mime_type in SIGNATURES:
+        if data.startswith(signature):
+            return mime_type
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    if data[4:12] in (b"ftypheic", b"ftypheix", b"ftypmif1"):
+        return "image/heic"
+    return "application/octet-stream"
+
+
+class BlobStore(ABC):
+    """Interface for blob storage backends, keyed by the SHA-256 hex digest of the content"""
+
+    @abstractmethod
+    def put(self, data):
+        """Store bytes (a no-op if they are already stored) and return their key"""
+
+    def put_stream(self, stream):
+        """Store a binary stream and return (key, size); backends that can, copy it in chunks"""
+        data = stream.read()
+        return self.put(data), len(data)
+
+    @abstractmethod
+    def get(self, key):
+        """Return the bytes stored under key, or None"""
+
+    @abstractmethod
+    def open(self, key):
+        """Return a readable binary file object for key, or None"""
+
+    @abstractmethod
+    def exists(self, key):
+        """Whether a blob is stored under key"""
+
+    @abstractmethod
+    def delete(self, key):
+        """Remove the blob under key, if any"""
+
+    @abstractmethod
+    def modified(self, key):
+        """Unix time the key was last written or stored again, or None if it doesn't exist"""
+
+    @abstractmethod
+    def keys(self):
+        """Iterate over every stored key"""
+
+
+class LocalBlobStore(BlobStore):
+    """Blobs as files under root/ab/cd/<sha256>, written atomically"""
+
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def path(self, key):
+        return os.path.join(self.root, key[:2], key[2:4], key)
+
+    def put(self, data):
+        key = hashlib.sha256(data).hexdigest()
+        path = self.path(key)
+        if self.touch(path):
+            return key
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temp file and rename, so readers never see a partial blob
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as tmp:
+                tmp.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return key
+
+    def put_stream(self, stream):
+        # Hash while copying to a temp file in the store, then move it under its key
+        digest = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as tmp:
+                while chunk := stream.read(CHUNK_SIZE):
+                    digest.update(chunk)
+                    tmp.write(chunk)
+                    size += len(chunk)
+
+            key = digest.hexdigest()
+            path = self.path(key)
+            if self.touch(path):
+                os.remove(tmp_path)
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.replace(tmp_path, path)
+            return key, size
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def touch(self, path):
+        """Refresh an existing blob's mtime so a prune running meanwhile treats it as new, False if it's missing"""
+        try:
+            os.utime(path)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def get(self, key):
+        blob = self.open(key)
+        if blob is None:
+            return None
+        with blob:
+            return blob.read()
+
+    def open(self, key):
+        try:
+            return open(self.path(key), "rb")
+        except FileNotFoundError:
+            return None
+
+    def exists(self, key):
+        return os.path.exists(self.path(key))
+
+    def delete(self, key):
+        try:
+            os.remove(self.path(key))
+        except FileNotFoundError:
+            pass
+
+    def modified(self, key):
+        try:
+            return os.path.getmtime(self.path(key))
+        except FileNotFoundError:
+            return None
+
+    def keys(self):
+        for directory, _, files in os.walk(self.root):
+            for name in files:
+                if not name.startswith(".tmp-"):
+                    yield name
+
+
+# BLOB_STORE picks the backend; register object store backends here
+BACKENDS = {
+    "local": lambda: LocalBlobStore(os.getenv("BLOB_STORE_DIR") or "blobs"),
+}
+
+blob_store = None
+
+
+def get_blob_store():
+    """The configured store, created on first use"""
+    global blob_store
+    if blob_store is None:
+        blob_store = BACKENDS[os.getenv("BLOB_STORE") or "local"]()
+    return blob_store
+
+
+def store_blob(data):
+    """Store bytes or a binary stream, returning (key, size, mime_type) for the row that references them"""
+    if hasattr(data, "read"):
+        head = data.read(16)
+        data.seek(0)
+        key, size = get_blob_store().put_stream(data)
+        return key, size, sniff_mime_type(head)
+    return get_blob_store().put(data), len(data), sniff_mime_type(data)
+
+
+def load_blob(key):
+    return get_blob_store().get(key) if key else None
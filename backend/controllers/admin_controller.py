@@ -0,0 +1,33 @@
+from flask import request, jsonify
+from middleware.slow_query_log import top_offenders, SLOW_QUERY_MS
+
+
+def get_slow_queries():
+    """Get the slowest recorded SQL statements with their EXPLAIN plans, from every worker's slow query log"""
+    if SLOW_QUERY_MS <= 0:
+        return jsonify({
+            "status": "error",
+            "message": "Slow query log is disabled",
+            "data": [],
+            "errors": ["Set SLOW_QUERY_MS to enable the slow query log"]
+        }), 404
+
+    limit = request.args.get("limit", "20")
+    sort = request.args.get("sort", "totalMs")
+
+    if not limit.isdigit() or sort not in ("totalMs", "maxMs", "avgMs", "count"):
+        return jsonify({
+            "status": "error",
+            "message": "Invalid query parameter(s)",
+            "data": [],
+            "errors": ["limit must be a number and sort one of totalMs, maxMs, avgMs, count"]
+        }), 400
+
+    result = top_offenders(int(limit), sort)
+
+    return jsonify({
+        "status": "success",
+        "message": f"{len(result)} slow statement(s) found",
+        "data": result,
+        "errors": []
+    }), 200
@@ -1,7 +1,40 @@
 from flask import request, jsonify, g
 from sqlalchemy.exc import SQLAlchemyError
-from models import Conversation, Participant, User, Group
+from sqlalchemy import select, func, and_
+from models import Conversation, Participant, User, Group, Message
+from realtime import publish, conversation_channel, group_channel
+import db as database
 from db import db
+import os
+
+# Characters of the last message shown in the inbox
+INBOX_PREVIEW_LENGTH = int(os.getenv("INBOX_PREVIEW_LENGTH") or 100)
+
+
+def conversations_version_query(group_id, user_id):
+    """Select a cheap version of the user's conversations in a group"""
+    return select(
+        func.count(Participant.id), func.max(Participant.id), func.max(Participant.updated_at)
+    ).join(Conversation, Conversation.id == Participant.conversation_id).where(
+        Conversation.group_id == group_id,
+        Participant.user_id == user_id
+    )
+
+
+def conversations_version(group_id):
+    """Cheap version of the user's conversations in a group for ETags"""
+    return db.session.execute(conversations_version_query(group_id, g.user.get("userId"))).one()
+
+
+async def conversations_version_async(user, group_id):
+    """conversations_version on the async engine"""
+    async with database.AsyncSession() as session:
+        return (await session.execute(conversations_version_query(group_id, user.get("userId")))).one()
+
+
+def publish_conversation_updated(conversation):
+    """Tell the group's subscribers (e.g. contact lists) that a conversation was created or its members changed"""
+    publish(db.session, group_channel(conversation.group_id), "conversation.updated", conversation.to_dict())
 
 
 def get_conversations(group_id):
@@ -39,6 +72,124 @@ def get_conversations(group_id):
         }), 500
 
 
+def inbox_memberships(user_id, group_id=None):
+    """The user's participant rows (conversation id and read watermark), optionally in one group"""
+    query = select(Participant.conversation_id, Participant.last_read_message_id).where(Participant.user_id == user_id)
+    if group_id is not None:
+        query = query.join(Conversation, Conversation.id == Participant.conversation_id).where(Conversation.group_id == group_id)
+    return query.subquery("memberships")
+
+
+def last_message_ids(memberships):
+    """Newest message id per conversation, one index seek per group on (conversation_id, id)"""
+    return select(Message.conversation_id, func.max(Message.id).label("last_message_id")).where(
+        Message.conversation_id.in_(select(memberships.c.conversation_id))
+    ).group_by(Message.conversation_id).subquery("last_messages")
+
+
+def inbox_group_id():
+    group_id = request.args.get("groupId")
+    return int(group_id) if group_id and group_id.isdigit() else None
+
+
+def inbox_version():
+    """Cheap version of the inbox for ETags: newest messages, the user's watermarks and the conversations' members"""
+    user_id = g.user.get("userId")
+    memberships = inbox_memberships(user_id, inbox_group_id())
+    last_messages = last_message_ids(memberships)
+    members = select(Participant.id).where(Participant.conversation_id.in_(select(memberships.c.conversation_id))).subquery()
+    return db.session.execute(select(
+        select(func.count()).select_from(memberships).scalar_subquery(),
+        select(func.sum(memberships.c.last_read_message_id)).scalar_subquery(),
+        select(func.sum(last_messages.c.last_message_id)).scalar_subquery(),
+        select(func.count()).select_from(members).scalar_subquery(),
+        select(func.max(members.c.id)).scalar_subquery(),
+    )).one()
+
+
+def get_inbox():
+    """Every conversation the user takes part in (?groupId= for one group), newest activity first, with the
+    last message's preview and time and the number of unread messages, in three queries"""
+    try:
+        user_id = g.user.get("userId")
+        memberships = inbox_memberships(user_id, inbox_group_id())
+        last_messages = last_message_ids(memberships)
+        
+        # Messages from others past the user's watermark, counted per conversation
+        unread = select(Message.conversation_id, func.count().label("unread_count")).join(
+            memberships, and_(
+                memberships.c.conversation_id == Message.conversation_id,
+                Message.id > func.coalesce(memberships.c.last_read_message_id, 0)
+            )
+        ).where(Message.sender_id != user_id).group_by(Message.conversation_id).subquery("unread")
+        
+        rows = db.session.execute(
+            select(
+                Conversation,
+                memberships.c.last_read_message_id,
+                last_messages.c.last_message_id,
+                func.coalesce(unread.c.unread_count, 0).label("unread_count")
+            )
+            .join(memberships, memberships.c.conversation_id == Conversation.id)
+            .outerjoin(last_messages, last_messages.c.conversation_id == Conversation.id)
+            .outerjoin(unread, unread.c.conversation_id == Conversation.id)
+            .order_by(func.coalesce(last_messages.c.last_message_id, 0).desc(), Conversation.id.desc())
+        ).all()
+        
+        conversation_ids = [row.Conversation.id for row in rows]
+        message_ids = [row.last_message_id for row in rows if row.last_message_id is not None]
+        
+        # The last messages with their senders, and every conversation's members, in one query each
+        last = {}
+        if message_ids:
+            last = {message.conversation_id: (message, sender) for message, sender in db.session.execute(
+                select(Message, User).outerjoin(User, User.id == Message.sender_id).where(Message.id.in_(message_ids))
+            )}
+        members = {}
+        if conversation_ids:
+            for participant, member in db.session.execute(
+                select(Participant, User).join(User, User.id == Participant.user_id)
+                .where(Participant.conversation_id.in_(conversation_ids)).order_by(Participant.id)
+            ):
+                members.setdefault(participant.conversation_id, []).append({
+                    "userId": participant.user_id,
+                    "role": participant.role,
+                    "user": member.to_safe_dict()
+                })
+        
+        result = []
+        for row in rows:
+            conversation_dict = row.Conversation.to_dict()
+            message, sender = last.get(row.Conversation.id, (None, None))
+            conversation_dict["lastMessage"] = {
+                "id": message.id,
+                "senderId": message.sender_id,
+                "sender": sender.to_safe_dict() if sender else None,
+                "preview": message.content[:INBOX_PREVIEW_LENGTH],
+                "createdAt": message.created_at
+            } if message else None
+            conversation_dict["lastMessageAt"] = message.created_at if message else None
+            conversation_dict["unreadCount"] = row.unread_count
+            conversation_dict["lastReadMessageId"] = row.last_read_message_id
+            conversation_dict["participants"] = members.get(row.Conversation.id, [])
+            result.append(conversation_dict)
+        
+        return jsonify({
+            "status": "success",
+            "message": f"{len(result)} conversations found",
+            "data": result,
+            "errors": []
+        }), 200
+        
+    except SQLAlchemyError as err:
+        return jsonify({
+            "status": "error",
+            "message": "Failed to retrieve inbox",
+            "data": [],
+            "errors": [str(err)]
+        }), 500
+
+
 def get_conversation_by_id(conversation_id):
     """Get a specific conversation by ID"""
     try:
@@ -88,14 +239,15 @@ def create_dm():
     try:
         data = request.get_json()
         user_id = data.get("userId")
+        group_id = data.get("groupId")
         current_user_id = g.user.get("userId")
         
-        if not user_id:
+        if not user_id or not group_id:
             return jsonify({
                 "status": "error",
-                "message": "Missing userId",
+                "message": "Missing required fields",
                 "data": [],
-                "errors": ["userId is required"]
+                "errors": ["userId and groupId are required"]
             }), 400
         
         if user_id == current_user_id:
@@ -108,7 +260,8 @@ def create_dm():
         
         # Create conversation
         conversation = Conversation(
-            conversation_type="dm",
+            group_id=group_id,
+            type="dm",
             name=f"DM-{current_user_id}-{user_id}"
         )
         
@@ -121,6 +274,7 @@ def create_dm():
         
         db.session.add(participant1)
         db.session.add(participant2)
+        publish_conversation_updated(conversation)
         db.session.commit()
         
         return jsonify({
@@ -145,20 +299,22 @@ def create_group_chat():
     try:
         data = request.get_json()
         name = data.get("name")
+        group_id = data.get("groupId")
         participant_ids = data.get("participantIds", [])
         current_user_id = g.user.get("userId")
         
-        if not name:
+        if not name or not group_id:
             return jsonify({
                 "status": "error",
-                "message": "Missing conversation name",
+                "message": "Missing required fields",
                 "data": [],
-                "errors": ["name is required"]
+                "errors": ["name and groupId are required"]
             }), 400
         
         # Create conversation
         conversation = Conversation(
-            conversation_type="group",
+            group_id=group_id,
+            type="group",
             name=name
         )
         
@@ -175,6 +331,7 @@ def create_group_chat():
                 participant = Participant(conversation_id=conversation.id, user_id=participant_id)
                 db.session.add(participant)
         
+        publish_conversation_updated(conversation)
         db.session.commit()
         
         return jsonify({
@@ -236,6 +393,11 @@ def add_participant():
         # Add participant
         participant = Participant(conversation_id=conversation_id, user_id=user_id)
         db.session.add(participant)
+        publish(db.session, conversation_channel(conversation_id), "participant.added", {
+            "conversationId": conversation_id,
+            "userId": user_id
+        })
+        publish_conversation_updated(conversation)
         db.session.commit()
         
         return jsonify({
@@ -285,6 +447,12 @@ def remove_participant():
             }), 404
         
         db.session.delete(participant)
+        # Subscribers see the removal, and the removed user's sockets stop receiving the conversation
+        publish(db.session, conversation_channel(conversation_id), "participant.removed", {
+            "conversationId": conversation_id,
+            "userId": user_id
+        })
+        publish_conversation_updated(Conversation.query.get(conversation_id))
         db.session.commit()
         
         return jsonify({
@@ -301,4 +469,37 @@ def remove_participant():
             "message": "Failed to remove participant",
             "data": [],
             "errors": [str(err)]
-        }), 500 
\ No newline at end of file
+        }), 500
+
+
+async def get_conversations_async(user, group_id):
+    """Get all conversations for a group on the async engine, returning (body, status)"""
+    try:
+        user_id = user.get("userId")
+
+        # Conversations in the group where the user is a participant, in one query
+        async with database.AsyncSession() as session:
+            conversations = (await session.scalars(
+                select(Conversation)
+                .join(Participant, Participant.conversation_id == Conversation.id)
+                .where(Conversation.group_id == group_id, Participant.user_id == user_id)
+                .distinct()
+                .order_by(Conversation.id)
+            )).all()
+
+        result = [conversation.to_dict() for conversation in conversations]
+
+        return {
+            "status": "success",
+            "message": f"{len(result)} conversations found",
+            "data": result,
+            "errors": []
+        }, 200
+
+    except SQLAlchemyError as err:
+        return {
+            "status": "error",
+            "message": "Failed to retrieve conversations",
+            "data": [],
+            "errors": [str(err)]
+        }, 500
@@ -1,61 +1,72 @@
 from flask import request, jsonify, g
 from sqlalchemy.exc import SQLAlchemyError
-import base64
+from images import exterior_image_value, listing_image_width
+from image_variants import load_variants, pick_variant
 from models import Group, GroupParticipant, Property, User, Conversation, Participant, Profile
 from db import db
 
 
+def property_summaries(property_ids):
+    """Property info for the group listings, keyed by property ID, in two queries"""
+    if not property_ids:
+        return {}
+
+    rows = db.session.query(
+        Property.id, Property.name, Property.address, Property.city,
+        Property.exterior_image_hash, Property.exterior_image_type
+    ).filter(Property.id.in_(property_ids)).all()
+
+    # Group cards get the smallest variant that covers them
+    width = listing_image_width()
+    variants = load_variants(row.exterior_image_hash for row in rows)
+
+    return {
+        row.id: {
+            "id": row.id,
+            "name": row.name,
+            "exteriorImage": exterior_image_value(
+                row.id, row.exterior_image_hash, row.exterior_image_type,
+                variant=pick_variant(variants.get(row.exterior_image_hash), width)
+            ),
+            "address": row.address,
+            "city": row.city
+        }
+        for row in rows
+    }
+
+
 def get_landlord_groups():
     """Get all groups where the authenticated user is the landlord"""
     try:
         user_id = g.user.get("userId")
         
         # Get groups where user is the landlord
-        groups = Group.query.filter_by(landlord_id=user_id).all()
-        
-        formatted_groups = []
-        for group in groups:
-            group_dict = group.to_dict()
-            
-            # Get participants
-            participants = []
-            group_participants = GroupParticipant.query.filter_by(group_id=group.id).all()
-            for gp in group_participants:
-                user = User.query.get(gp.user_id)
-                if user:
-                    participants.append({
-                        "id": user.id,
-                        "firstName": user.first_name,
-                        "lastName": user.last_name,
-                        "email": user.email
-                    })
-            
-            # Get property information
-            property_info = None
-            if group.property_id:
-                property_item = Property.query.get(group.property_id)
-                if property_item:
-                    property_dict = property_item.to_dict()
-                    exterior_image_base64 = None
-                    if property_dict.get("exterior_image"):
-                        exterior_image_base64 = f"data:image/jpeg;base64,{base64.b64encode(property_dict['exterior_image']).decode('utf-8')}"
-                    
-                    property_info = {
-                        "id": property_dict["id"],
-                        "name": property_dict["name"],
-                        "exteriorImage": exterior_image_base64,
-                        "address": property_dict["address"],
-                        "city": property_dict["city"]
-                    }
-            
-            formatted_group = {
-                "id": group_dict["id"],
-                "name": group_dict["name"],
-                "property": property_info,
-                "participants": participants
-            }
-            
-            formatted_groups.append(formatted_group)
+        groups = db.session.query(Group.id, Group.name, Group.property_id).filter_by(landlord_id=user_id).all()
+        group_ids = [group.id for group in groups]
+        
+        # Get participants of every group at once
+        participants_by_group = {group_id: [] for group_id in group_ids}
+        if group_ids:
+            rows = db.session.query(
+                GroupParticipant.group_id, User.id, User.firstName, User.lastName, User.email
+            ).join(User, User.id == GroupParticipant.tenant_id).filter(GroupParticipant.group_id.in_(group_ids)).all()
+            for row in rows:
+                participants_by_group[row.group_id].append({
+                    "id": row.id,
+                    "firstName": row.firstName,
+                    "lastName": row.lastName,
+                    "email": row.email
+                })
+        
+        # Get property information, once per property
+        properties = property_summaries({group.property_id for group in groups if group.property_id})
+        
+        formatted_groups = [{
+            "id": group.id,
+            "name": group.name,
+            "property": properties.get(group.property_id),
+            "participants": participants_by_group[group.id]
+        } for group in groups]
         
         return jsonify({
             "status": "success",
@@ -110,15 +121,12 @@ def get_landlord_group_by_id(group_id):
         if group.property_id:
             property_item = Property.query.get(group.property_id)
             if property_item:
-                property_dict = property_item.to_dict()
-                exterior_image_base64 = None
-                if property_dict.get("exterior_image"):
-                    exterior_image_base64 = f"data:image/jpeg;base64,{base64.b64encode(property_dict['exterior_image']).decode('utf-8')}"
+                property_dict = property_item.to_dict(include_image=False)
                 
                 property_info = {
                     "id": property_dict["id"],
                     "name": property_dict["name"],
-                    "exteriorImage": exterior_image_base64,
+                    "exteriorImage": exterior_image_value(property_item.id, property_item.exterior_image_hash, property_item.exterior_image_type),
                     "address": property_dict["address"],
                     "city": property_dict["city"]
                 }
@@ -151,54 +159,28 @@ def get_tenant_groups():
     try:
         user_id = g.user.get("userId")
         
-        # Get groups where user is a participant
-        group_participants = GroupParticipant.query.filter_by(tenant_id=user_id).all()
-        
-        formatted_groups = []
-        for gp in group_participants:
-            group = Group.query.get(gp.group_id)
-            if not group:
-                continue
-            
-            group_dict = group.to_dict()
-            
-            # Get landlord information
-            landlord = User.query.get(group.landlord_id)
-            landlord_info = None
-            if landlord:
-                landlord_info = {
-                    "id": landlord.id,
-                    "firstName": landlord.first_name,
-                    "lastName": landlord.last_name,
-                    "email": landlord.email
-                }
-            
-            # Get property information
-            property_info = None
-            if group.property_id:
-                property_item = Property.query.get(group.property_id)
-                if property_item:
-                    property_dict = property_item.to_dict()
-                    exterior_image_base64 = None
-                    if property_dict.get("exterior_image"):
-                        exterior_image_base64 = f"data:image/jpeg;base64,{base64.b64encode(property_dict['exterior_image']).decode('utf-8')}"
-                    
-                    property_info = {
-                        "id": property_dict["id"],
-                        "name": property_dict["name"],
-                        "exteriorImage": exterior_image_base64,
-                        "address": property_dict["address"],
-                        "city": property_dict["city"]
-                    }
-            
-            formatted_group = {
-                "id": group_dict["id"],
-                "name": group_dict["name"],
-                "property": property_info,
-                "landlord": landlord_info
-            }
-            
-            formatted_groups.append(formatted_group)
+        # Get groups where user is a participant, with their landlord
+        rows = db.session.query(
+            Group.id, Group.name, Group.property_id,
+            User.id.label("landlord_id"), User.firstName, User.lastName, User.email
+        ).join(GroupParticipant, GroupParticipant.group_id == Group.id) \
+            .outerjoin(User, User.id == Group.landlord_id) \
+            .filter(GroupParticipant.tenant_id == user_id).all()
+        
+        # Get property information, once per property
+        properties = property_summaries({row.property_id for row in rows if row.property_id})
+        
+        formatted_groups = [{
+            "id": row.id,
+            "name": row.name,
+            "property": properties.get(row.property_id),
+            "landlord": {
+                "id": row.landlord_id,
+                "firstName": row.firstName,
+                "lastName": row.lastName,
+                "email": row.email
+            } if row.landlord_id is not None else None
+        } for row in rows]
         
         return jsonify({
             "status": "success",
@@ -423,15 +405,12 @@ def get_property_info(group_id):
                 "errors": [f"Property with ID {group.property_id} not found"]
             }), 404
         
-        property_dict = property_item.to_dict()
-        exterior_image_base64 = None
-        if property_dict.get("exterior_image"):
-            exterior_image_base64 = f"data:image/jpeg;base64,{base64.b64encode(property_dict['exterior_image']).decode('utf-8')}"
+        property_dict = property_item.to_dict(include_image=False)
         
         property_info = {
             "id": property_dict["id"],
             "name": property_dict["name"],
-            "exteriorImage": exterior_image_base64,
+            "exteriorImage": exterior_image_value(property_item.id, property_item.exterior_image_hash, property_item.exterior_image_type),
             "address": property_dict["address"],
             "city": property_dict["city"],
             "propertyDescription": property_dict.get("property_description"),
@@ -1,7 +1,20 @@
 from flask import request, jsonify, g
 from sqlalchemy.exc import SQLAlchemyError
-from models import Message, Conversation, User
+from sqlalchemy import select, update, exists, func, or_
+from models import Message, Conversation, User, Participant
+from pagination import InvalidPage, page_limit
+from realtime import publish, conversation_channel, notifier, gateway
+import db as database
 from db import db
+import asyncio
+import os
+import time
+
+# Messages per page when the client doesn't pass ?limit=
+MESSAGE_PAGE_SIZE = int(os.getenv("MESSAGE_PAGE_SIZE") or 50)
+
+# Longest a long poll is held without a new message (?timeout= may ask for less), below proxy read timeouts
+LONG_POLL_SECONDS = float(os.getenv("LONG_POLL_SECONDS") or 20)
 
 
 def send_message():
@@ -34,17 +47,24 @@ def send_message():
         message = Message(
             conversation_id=conversation_id,
             sender_id=sender_id,
-            content=content,
-            is_read=False
+            content=content
         )
         
         db.session.add(message)
+        db.session.flush()
+        db.session.refresh(message)  # Timestamps come from the database
+        
+        # Push the message to the conversation's subscribers when this commits
+        sender = User.query.get(sender_id)
+        result = format_messages([message], {sender_id: sender} if sender else {})[0]
+        publish(db.session, conversation_channel(conversation_id), "message.created", result)
         db.session.commit()
+        notifier.notify(conversation_id)
         
         return jsonify({
             "status": "success",
             "message": "Message sent successfully",
-            "data": message.to_dict(),
+            "data": result,
             "errors": []
         }), 201
         
@@ -58,9 +78,104 @@ def send_message():
         }), 500
 
 
+def messages_page_query(conversation_id, args):
+    """Select a page of a conversation's messages by id: the latest, ?before= or ?after= a message id
+
+    Fetches one message more than the page size so the caller can tell whether more follow.
+    ?before= (and no cursor) pages backwards from the newest, ?after= forwards, so a poll with
+    ?after=<last id seen> only reads the messages sent since.
+    """
+    before = args.get("before")
+    after = args.get("after")
+    if before and after:
+        raise InvalidPage("use either before or after, not both")
+    for cursor in (before, after):
+        if cursor and not cursor.isdigit():
+            raise InvalidPage("before and after must be message ids")
+    limit = page_limit(args, MESSAGE_PAGE_SIZE)
+
+    query = select(Message).where(Message.conversation_id == conversation_id)
+    if after:
+        query = query.where(Message.id > int(after)).order_by(Message.id.asc())
+    else:
+        if before:
+            query = query.where(Message.id < int(before))
+        query = query.order_by(Message.id.desc())
+    return query.limit(limit + 1), limit
+
+
+def messages_version_query(conversation_id, args):
+    """Select a cheap version of the requested page of messages, read from the page's rows only, or None"""
+    try:
+        query, _ = messages_page_query(conversation_id, args)
+    except InvalidPage:
+        return None
+    page = query.with_only_columns(Message.id, Message.updated_at).subquery()
+    # Watermarks only move forward, so their sum changes whenever someone reads further
+    read_position = select(func.sum(Participant.last_read_message_id)).where(
+        Participant.conversation_id == conversation_id
+    ).scalar_subquery()
+    return select(func.count(), func.max(page.c.id), func.max(page.c.updated_at), read_position).select_from(page)
+
+
+def messages_version(conversation_id):
+    """Cheap version of the requested page of messages for ETags"""
+    query = messages_version_query(conversation_id, request.args)
+    return db.session.execute(query).one() if query is not None else None
+
+
+async def messages_version_async(user, conversation_id, args):
+    """messages_version on the async engine"""
+    query = messages_version_query(conversation_id, args)
+    if query is None:
+        return None
+    async with database.AsyncSession() as session:
+        return (await session.execute(query)).one()
+
+
+def messages_page(messages, limit, args):
+    """Trim the extra row, put the page in chronological order and say whether more messages follow"""
+    has_more = len(messages) > limit
+    messages = messages[:limit]
+    if not args.get("after"):
+        messages.reverse()
+    return messages, has_more
+
+
+def watermarks_query(conversation_id):
+    """(user id, last read message id) of each participant in the conversation"""
+    return select(Participant.user_id, Participant.last_read_message_id).where(
+        Participant.conversation_id == conversation_id,
+        Participant.last_read_message_id.is_not(None)
+    )
+
+
+def format_messages(messages, senders, watermarks=()):
+    """Message dicts with their sender and readBy, the other participants whose watermark has reached them"""
+    result = []
+    for message in messages:
+        message_dict = message.to_dict()
+        sender = senders.get(message.sender_id)
+        message_dict["sender"] = sender.to_safe_dict() if sender else None
+        message_dict["readBy"] = [user_id for user_id, last_read in watermarks
+                                  if last_read >= message.id and user_id != message.sender_id]
+        result.append(message_dict)
+    return result
+
+
 def get_messages(conversation_id):
-    """Get all messages for a conversation"""
+    """Get a page of messages for a conversation, oldest first, with ?before=, ?after= and ?limit="""
     try:
+        try:
+            query, limit = messages_page_query(conversation_id, request.args)
+        except InvalidPage as err:
+            return jsonify({
+                "status": "error",
+                "message": "Invalid query parameter(s)",
+                "data": [],
+                "errors": [str(err)]
+            }), 400
+        
         # Verify conversation exists
         conversation = Conversation.query.get(conversation_id)
         if not conversation:
@@ -71,20 +186,103 @@ def get_messages(conversation_id):
                 "errors": [f"No conversation found with ID {conversation_id}"]
             }), 404
         
-        # Get messages with sender information
-        messages = Message.query.filter_by(conversation_id=conversation_id).order_by(Message.created_at).all()
+        messages, has_more = messages_page(db.session.scalars(query).all(), limit, request.args)
         
-        result = []
-        for message in messages:
-            message_dict = message.to_dict()
-            sender = User.query.get(message.sender_id)
-            message_dict["sender"] = sender.to_safe_dict() if sender else None
-            result.append(message_dict)
+        # Load the page's senders and the read watermarks in one query each
+        sender_ids = {message.sender_id for message in messages}
+        senders = {sender.id: sender for sender in User.query.filter(User.id.in_(sender_ids))} if sender_ids else {}
+        watermarks = db.session.execute(watermarks_query(conversation_id)).all() if messages else []
+        
+        result = format_messages(messages, senders, watermarks)
         
         return jsonify({
             "status": "success",
             "message": f"{len(result)} messages found",
             "data": result,
+            "hasMore": has_more,
+            "errors": []
+        }), 200
+        
+    except SQLAlchemyError as err:
+        return jsonify({
+            "status": "error",
+            "message": "Failed to retrieve messages",
+            "data": [],
+            "errors": [str(err)]
+        }), 500
+
+
+def long_poll_args(args):
+    """The ?after= message id a long poll waits past, and its ?timeout= in seconds"""
+    after = args.get("after")
+    if not after or not after.isdigit():
+        raise InvalidPage("after must be the id of the newest message seen, or 0")
+    try:
+        timeout = min(float(args.get("timeout") or LONG_POLL_SECONDS), LONG_POLL_SECONDS)
+    except ValueError:
+        raise InvalidPage("timeout must be a number of seconds")
+    return max(timeout, 0)
+
+
+def wait_for_messages(conversation_id):
+    """Long poll: the messages after ?after= as soon as there are any, or none after ?timeout= seconds"""
+    try:
+        try:
+            timeout = long_poll_args(request.args)
+            query, limit = messages_page_query(conversation_id, request.args)
+        except InvalidPage as err:
+            return jsonify({
+                "status": "error",
+                "message": "Invalid query parameter(s)",
+                "data": [],
+                "errors": [str(err)]
+            }), 400
+        
+        # Verify conversation exists
+        conversation = Conversation.query.get(conversation_id)
+        if not conversation:
+            return jsonify({
+                "status": "error",
+                "message": "Conversation not found",
+                "data": [],
+                "errors": [f"No conversation found with ID {conversation_id}"]
+            }), 404
+        
+        notifier.follow(db.engine)
+        deadline = time.monotonic() + timeout
+        holding = False
+        try:
+            while True:
+                with notifier.watching(conversation_id) as watch:
+                    messages = db.session.scalars(query).all()
+                    if messages or time.monotonic() >= deadline:
+                        break
+                    # Past the worker's thread slots, answer now like a normal poll instead of tying up the thread
+                    holding = holding or notifier.hold_thread()
+                    if not holding:
+                        break
+                    # Hand the connection back to the pool while waiting, and read again in a fresh transaction
+                    db.session.close()
+                    if not watch.wait(deadline - time.monotonic()):
+                        break
+        finally:
+            if holding:
+                notifier.release_thread()
+        
+        messages, has_more = messages_page(messages, limit, request.args)
+        
+        # Load the page's senders and the read watermarks in one query each
+        sender_ids = {message.sender_id for message in messages}
+        senders = {sender.id: sender for sender in User.query.filter(User.id.in_(sender_ids))} if sender_ids else {}
+        watermarks = db.session.execute(watermarks_query(conversation_id)).all() if messages else []
+        
+        result = format_messages(messages, senders, watermarks)
+        
+        return jsonify({
+            "status": "success",
+            "message": f"{len(result)} messages found",
+            "data": result,
+            "hasMore": has_more,
             "errors": []
         }), 200
         
@@ -98,35 +296,71 @@ def get_messages(conversation_id):
 
 
 def mark_message_as_read():
-    """Mark a message as read"""
+    """Move the caller's read watermark in a conversation up to a message"""
     try:
         data = request.get_json()
         message_id = data.get("messageId")
+        conversation_id = data.get("conversationId")
+        user_id = g.user.get("userId")
         
-        if not message_id:
+        if not message_id or not str(message_id).isdigit():
             return jsonify({
                 "status": "error",
                 "message": "Missing messageId",
                 "data": [],
                 "errors": ["messageId is required"]
             }), 400
+        message_id = int(message_id)
+        
+        # Older clients only send the message id
+        if not conversation_id:
+            message = Message.query.get(message_id)
+            if not message:
+                return jsonify({
+                    "status": "error",
+                    "message": "Message not found",
+                    "data": [],
+                    "errors": [f"No message found with ID {message_id}"]
+                }), 404
+            conversation_id = message.conversation_id
         
-        message = Message.query.get(message_id)
-        if not message:
+        # One conditional UPDATE, the watermark never moves backwards and only to a message of this conversation
+        in_conversation = exists().where(Message.id == message_id, Message.conversation_id == conversation_id)
+        advanced = db.session.execute(
+            update(Participant)
+            .where(
+                Participant.conversation_id == conversation_id,
+                Participant.user_id == user_id,
+                or_(Participant.last_read_message_id.is_(None), Participant.last_read_message_id < message_id),
+                in_conversation
+            )
+            .values(last_read_message_id=message_id)
+        ).rowcount > 0
+        
+        if not advanced and not db.session.scalar(select(in_conversation)):
             return jsonify({
                 "status": "error",
                 "message": "Message not found",
                 "data": [],
-                "errors": [f"No message found with ID {message_id}"]
+                "errors": [f"No message found with ID {message_id} in conversation {conversation_id}"]
             }), 404
         
-        message.is_read = True
+        if advanced:
+            publish(db.session, conversation_channel(conversation_id), "message.read", {
+                "conversationId": conversation_id,
+                "messageId": message_id,
+                "userId": user_id
+            })
         db.session.commit()
         
         return jsonify({
             "status": "success",
-            "message": "Message marked as read",
-            "data": message.to_dict(),
+            "message": "Message marked as read" if advanced else "Already read up to this message",
+            "data": {
+                "conversationId": conversation_id,
+                "userId": user_id,
+                "lastReadMessageId": message_id if advanced else None
+            },
             "errors": []
         }), 200
         
@@ -137,4 +371,122 @@ def mark_message_as_read():
             "message": "Failed to mark message as read",
             "data": [],
             "errors": [str(err)]
-        }), 500 
\ No newline at end of file
+        }), 500
+
+
+async def get_messages_async(user, conversation_id, args):
+    """Get a page of messages for a conversation on the async engine, returning (body, status)"""
+    try:
+        query, limit = messages_page_query(conversation_id, args)
+    except InvalidPage as err:
+        return {
+            "status": "error",
+            "message": "Invalid query parameter(s)",
+            "data": [],
+            "errors": [str(err)]
+        }, 400
+
+    try:
+        async with database.AsyncSession() as session:
+            # Verify conversation exists
+            conversation = await session.get(Conversation, conversation_id)
+            if not conversation:
+                return {
+                    "status": "error",
+                    "message": "Conversation not found",
+                    "data": [],
+                    "errors": [f"No conversation found with ID {conversation_id}"]
+                }, 404
+
+            messages, has_more = messages_page((await session.scalars(query)).all(), limit, args)
+
+            # Load every sender, and the read watermarks, in one round trip each
+            sender_ids = {message.sender_id for message in messages}
+            senders = {}
+            watermarks = []
+            if sender_ids:
+                senders = {sender.id: sender for sender in await session.scalars(select(User).where(User.id.in_(sender_ids)))}
+                watermarks = (await session.execute(watermarks_query(conversation_id))).all()
+
+        result = format_messages(messages, senders, watermarks)
+
+        return {
+            "status": "success",
+            "message": f"{len(result)} messages found",
+            "data": result,
+            "hasMore": has_more,
+            "errors": []
+        }, 200
+
+    except SQLAlchemyError as err:
+        return {
+            "status": "error",
+            "message": "Failed to retrieve messages",
+            "data": [],
+            "errors": [str(err)]
+        }, 500
+
+
+async def wait_for_messages_async(user, conversation_id, args):
+    """Long poll on the async engine, returning (body, status); a waiting request holds no thread or connection"""
+    try:
+        timeout = long_poll_args(args)
+        query, limit = messages_page_query(conversation_id, args)
+    except InvalidPage as err:
+        return {
+            "status": "error",
+            "message": "Invalid query parameter(s)",
+            "data": [],
+            "errors": [str(err)]
+        }, 400
+
+    try:
+        async with database.AsyncSession() as session:
+            # Verify conversation exists
+            conversation = await session.get(Conversation, conversation_id)
+            if not conversation:
+                return {
+                    "status": "error",
+                    "message": "Conversation not found",
+                    "data": [],
+                    "errors": [f"No conversation found with ID {conversation_id}"]
+                }, 404
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            with notifier.watching(conversation_id, loop) as watch:
+                async with database.AsyncSession() as session:
+                    # The gateway's tail wakes the wait for messages sent through other processes
+                    await gateway.ensure_cursor(session)
+                    messages = (await session.scalars(query)).all()
+                if messages or loop.time() >= deadline or not await watch.wait_async(deadline - loop.time()):
+                    break
+
+        messages, has_more = messages_page(messages, limit, args)
+
+        sender_ids = {message.sender_id for message in messages}
+        senders = {}
+        watermarks = []
+        if sender_ids:
+            async with database.AsyncSession() as session:
+                senders = {sender.id: sender for sender in await session.scalars(select(User).where(User.id.in_(sender_ids)))}
+                watermarks = (await session.execute(watermarks_query(conversation_id))).all()
+
+        result = format_messages(messages, senders, watermarks)
+
+        return {
+            "status": "success",
+            "message": f"{len(result)} messages found",
+            "data": result,
+            "hasMore": has_more,
+            "errors": []
+        }, 200
+
+    except SQLAlchemyError as err:
+        return {
+            "status": "error",
+            "message": "Failed to retrieve messages",
+            "data": [],
+            "errors": [str(err)]
+        }, 500
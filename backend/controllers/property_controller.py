@@ -1,9 +1,17 @@
 from flask import request, jsonify, g
 from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy import and_, or_
-import base64
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
 from models import Property, PropertyImage, User
+from images import exterior_image_value, exterior_image_url, property_image_value, wants_image_urls, listing_image_width
+from uploads import request_fields, image_source, is_multipart, uploaded_files
+from image_variants import generate_variants, load_variants, group_variants, variants_query, pick_variant
+from search import search_terms, apply_text_search
+from facets import search_facets, facet_cache
+from pagination import InvalidPage, page_limit, encode_cursor, decode_cursor, after_keys, order_by_keys, page_of
+import db as database
 from db import db
+import asyncio
 import logging
 
 def get_properties():
@@ -11,7 +19,14 @@ def get_properties():
     try:
         user_id = g.user.get("userId")
         
-        properties = Property.query.filter_by(landlord_id=user_id).all()
+        # The list shows exterior images but only the gallery's metadata, unless asked for the bytes (URLs cost nothing)
+        include_images = request.args.get("includeImages") == "true" or wants_image_urls()
+        
+        properties = Property.query.options(selectinload(Property.images)).filter_by(landlord_id=user_id).all()
+        
+        # Listing cards get the smallest variant that covers them
+        width = listing_image_width()
+        variants = load_variants(property_item.exterior_image_hash for property_item in properties)
         
         if not properties:
             return jsonify({
@@ -24,18 +39,18 @@ def get_properties():
         # Format properties with base64 image conversion
         formatted_properties = []
         for property_item in properties:
-            property_dict = property_item.to_dict()
-            
-            # Convert exterior image to base64 if it exists
-            if property_dict.get("exterior_image"):
-                property_dict["exteriorImage"] = f"data:image/jpeg;base64,{base64.b64encode(property_dict['exterior_image']).decode('utf-8')}"
-                property_dict.pop("exterior_image", None)  # Remove the raw binary data
-            else:
-                property_dict["exteriorImage"] = None
+            property_dict = property_item.to_dict(include_image=False)
+            property_dict["exteriorImage"] = exterior_image_value(
+                property_item.id, property_item.exterior_image_hash, property_item.exterior_image_type,
+                variant=pick_variant(variants.get(property_item.exterior_image_hash), width)
+            )
             
-            # Get property images
-            images = PropertyImage.query.filter_by(property_id=property_item.id).all()
-            property_dict["images"] = [img.to_dict() for img in images]
+            property_dict["images"] = []
+            for img in property_item.images:
+                img_dict = img.to_dict(include_image=False)
+                if include_images:
+                    img_dict["image"] = property_image_value(property_item.id, img.id, img.image_hash, img.image_type)
+                property_dict["images"].append(img_dict)
             
             formatted_properties.append(property_dict)
         
@@ -60,7 +75,7 @@ def get_property_by_id(id):
     try:
         user_id = g.user.get("userId")
         
-        property_item = Property.query.filter_by(id=id, landlord_id=user_id).first()
+        property_item = Property.query.options(selectinload(Property.images)).filter_by(id=id, landlord_id=user_id).first()
         
         if not property_item:
             return jsonify({
@@ -71,18 +86,16 @@ def get_property_by_id(id):
             }), 404
         
         # Format property with base64 image conversion
-        property_dict = property_item.to_dict()
-        
-        # Convert exterior image to base64 if it exists
-        if property_dict.get("exterior_image"):
-            property_dict["exteriorImage"] = f"data:image/jpeg;base64,{base64.b64encode(property_dict['exterior_image']).decode('utf-8')}"
-            property_dict.pop("exterior_image", None)
-        else:
-            property_dict["exteriorImage"] = None
+        property_dict = property_item.to_dict(include_image=False)
+        property_dict["exteriorImage"] = exterior_image_value(
+            property_item.id, property_item.exterior_image_hash, property_item.exterior_image_type
+        )
         
-        # Get property images
-        images = PropertyImage.query.filter_by(property_id=property_item.id).all()
-        property_dict["images"] = [img.to_dict() for img in images]
+        property_dict["images"] = []
+        for img in property_item.images:
+            img_dict = img.to_dict(include_image=False)
+            img_dict["image"] = property_image_value(property_item.id, img.id, img.image_hash, img.image_type)
+            property_dict["images"].append(img_dict)
         
         return jsonify({
             "status": "success",
@@ -100,35 +113,158 @@ def get_property_by_id(id):
         }), 500
 
 
+def tenant_search_filters(args):
+    """The tenant search filters from the query string, None for the ones not given (or not usable)"""
+    max_price = args.get("maxPrice")
+    city = args.get("city")
+    property_type = args.get("propertyType")
+    bedrooms = args.get("bedrooms")
+
+    return {
+        "maxPrice": int(max_price) if max_price and max_price.isdigit() else None,
+        "city": city if city and city.strip() else None,
+        "propertyType": property_type if property_type and property_type != "Any" else None,
+        "bedrooms": int(bedrooms) if bedrooms and bedrooms.isdigit() else None,
+    }
+
+
+def apply_tenant_search_filters(query, args):
+    """Apply the tenant search filters from the query string to a Property query or select"""
+    filters = tenant_search_filters(args)
+
+    # Start with base filter - only available properties
+    query = query.filter(Property.availability == True)
+
+    # Apply filters if provided
+    if filters["maxPrice"] is not None:
+        query = query.filter(Property.price <= filters["maxPrice"])
+
+    if filters["city"] is not None:
+        query = query.filter(Property.city.ilike(f"%{filters['city']}%"))
+
+    if filters["propertyType"] is not None:
+        query = query.filter(Property.property_type == filters["propertyType"])
+
+    if filters["bedrooms"] is not None:
+        query = query.filter(Property.bedrooms >= filters["bedrooms"])
+
+    return query
+
+
+# ?sort= options as (column, descending), ?order=asc|desc overrides the direction. Each is backed by an
+# (availability, column, id) index and ties break on id, so pages don't skip or repeat rows.
+# Ids grow with created_at, so newest walks the primary key.
+SEARCH_SORTS = {
+    "newest": (Property.id, True),
+    "price": (Property.price, False),
+    "bedrooms": (Property.bedrooms, False),
+}
+
+
+def apply_tenant_search_page(query, args, dialect):
+    """Match ?q=, sort a tenant search and start it after ?cursor=, returning (query, page size, cursor for a row)
+
+    The query fetches one row more than the page size, so page_of can tell whether another page follows.
+    With ?q= results default to sort=relevance, best match first.
+    """
+    terms = search_terms(args.get("q"))
+    sort = args.get("sort") or ("relevance" if terms else "newest")
+    if sort != "relevance" and sort not in SEARCH_SORTS:
+        raise InvalidPage(f"sort must be one of relevance, {', '.join(SEARCH_SORTS)}")
+    if sort == "relevance" and not terms:
+        raise InvalidPage("sort=relevance needs a search query (q)")
+
+    limit = page_limit(args)
+    cursor = args.get("cursor")
+    if terms:
+        query, relevance = apply_text_search(query, terms, dialect)
+
+    if sort == "relevance":
+        # Ranking scores every match anyway, so relevance pages by position in the ranked matches
+        offset = 0
+        if cursor:
+            values = decode_cursor(cursor)
+            if len(values) != 2 or values[0] != "relevance" or type(values[1]) is not int or values[1] < 0:
+                raise InvalidPage("cursor does not belong to this sort")
+            offset = values[1]
+
+        def cursor_for(property_item):
+            return encode_cursor(["relevance", offset + limit])
+
+        return query.order_by(relevance, Property.id.desc()).offset(offset).limit(limit + 1), limit, cursor_for
+
+    column, descending = SEARCH_SORTS[sort]
+    order = args.get("order")
+    if order:
+        if order not in ("asc", "desc"):
+            raise InvalidPage("order must be asc or desc")
+        descending = order == "desc"
+
+    keys = [(column, descending)]
+    if column is not Property.id:
+        keys.append((Property.id, descending))
+    name = f"{sort}:{'desc' if descending else 'asc'}"
+
+    if cursor:
+        values = decode_cursor(cursor)
+        if len(values) != len(keys) + 1 or values[0] != name or not all(type(value) is int for value in values[1:]):
+            raise InvalidPage("cursor does not belong to this sort")
+        query = query.filter(after_keys(keys, values[1:]))
+
+    def cursor_for(property_item):
+        return encode_cursor([name] + [getattr(property_item, key.key) for key, _ in keys])
+
+    return query.order_by(*order_by_keys(keys)).limit(limit + 1), limit, cursor_for
+
+
+def invalid_page_response(err):
+    return {
+        "status": "error",
+        "message": "Invalid query parameter(s)",
+        "data": [],
+        "errors": [str(err)]
+    }, 400
+
+
+def format_tenant_property(property_item, landlord, image_urls=None, variant=None):
+    """Format a property search result with its landlord information"""
+    return {
+        "id": property_item.id,
+        "name": property_item.name,
+        "address": property_item.address,
+        "city": property_item.city,
+        "price": property_item.price,
+        "bedrooms": property_item.bedrooms,
+        "propertyType": property_item.property_type,
+        "availability": property_item.availability,
+        "description": property_item.property_description,
+        "exteriorImage": exterior_image_value(
+            property_item.id, property_item.exterior_image_hash, property_item.exterior_image_type, image_urls, variant
+        ),
+        "landlord": {
+            "id": landlord.id,
+            "name": f"{landlord.firstName[0]}. {landlord.lastName}",
+            "firstName": landlord.firstName,
+            "lastName": landlord.lastName,
+            "email": landlord.email
+        } if landlord else None
+    }
+
+
 def get_properties_for_tenants():
-    """Get properties for tenant search with filters"""
+    """Get a page of properties for tenant search with filters, ?q=, ?sort=, ?limit= and ?cursor="""
     try:
-        # Get query parameters
-        max_price = request.args.get("maxPrice")
-        city = request.args.get("city")
-        property_type = request.args.get("propertyType")
-        bedrooms = request.args.get("bedrooms")
-        
-        # Start with base filter - only available properties
-        query = Property.query.filter_by(availability=True)
-        
-        # Apply filters if provided
-        if max_price and max_price.isdigit():
-            query = query.filter(Property.price <= int(max_price))
-        
-        if city and city.strip():
-            query = query.filter(Property.city.ilike(f"%{city}%"))
-        
-        if property_type and property_type != "Any":
-            query = query.filter(Property.property_type == property_type)
-        
-        if bedrooms and bedrooms.isdigit():
-            query = query.filter(Property.bedrooms >= int(bedrooms))
-        
-        # Execute query and get landlord information
-        properties = query.all()
+        try:
+            query, limit, cursor_for = apply_tenant_search_page(
+                apply_tenant_search_filters(Property.query, request.args), request.args, db.engine.dialect.name
+            )
+        except InvalidPage as err:
+            body, status = invalid_page_response(err)
+            return jsonify(body), status
+
+        properties, next_cursor = page_of(query.all(), limit, cursor_for)
         
-        if not properties:
+        if not properties and not request.args.get("cursor"):
             return jsonify({
                 "status": "error",
                 "message": "No properties found matching your criteria",
@@ -136,45 +272,25 @@ def get_properties_for_tenants():
                 "errors": ["No properties match the search filters"]
             }), 404
         
+        # Search results get the smallest exterior image variant that covers the card
+        width = listing_image_width()
+        variants = load_variants(property_item.exterior_image_hash for property_item in properties)
+        
+        # Load the page's landlords in one query
+        landlord_ids = {property_item.landlord_id for property_item in properties}
+        landlords = {landlord.id: landlord for landlord in User.query.filter(User.id.in_(landlord_ids))} if landlord_ids else {}
+        
         # Format properties with landlord information
         formatted_properties = []
         for property_item in properties:
-            property_dict = property_item.to_dict()
-            
-            # Get landlord information
-            landlord = User.query.get(property_item.landlord_id)
-            
-            # Convert exterior image to base64 if it exists
-            exterior_image_base64 = None
-            if property_dict.get("exterior_image"):
-                exterior_image_base64 = f"data:image/jpeg;base64,{base64.b64encode(property_dict['exterior_image']).decode('utf-8')}"
-            
-            formatted_property = {
-                "id": property_dict["id"],
-                "name": property_dict["name"],
-                "address": property_dict["address"],
-                "city": property_dict["city"],
-                "price": property_dict["price"],
-                "bedrooms": property_dict["bedrooms"],
-                "propertyType": property_dict.get("property_type"),
-                "availability": property_dict["availability"],
-                "description": property_dict.get("property_description"),
-                "exteriorImage": exterior_image_base64,
-                "landlord": {
-                    "id": landlord.id,
-                    "name": f"{landlord.firstName[0]}. {landlord.lastName}",
-                    "firstName": landlord.firstName,
-                    "lastName": landlord.lastName,
-                    "email": landlord.email
-                } if landlord else None
-            }
-            
-            formatted_properties.append(formatted_property)
+            variant = pick_variant(variants.get(property_item.exterior_image_hash), width)
+            formatted_properties.append(format_tenant_property(property_item, landlords.get(property_item.landlord_id), variant=variant))
         
         return jsonify({
             "status": "success",
             "message": f"{len(formatted_properties)} property(s) found",
             "data": formatted_properties,
+            "nextCursor": next_cursor,
             "errors": []
         }), 200
         
@@ -187,10 +303,101 @@ def get_properties_for_tenants():
         }), 500
 
 
+async def get_properties_for_tenants_async(user, args):
+    """Get a page of properties for tenant search on the async engine, returning (body, status)"""
+    try:
+        query, limit, cursor_for = apply_tenant_search_page(
+            apply_tenant_search_filters(select(Property), args), args, database.async_engine.dialect.name
+        )
+    except InvalidPage as err:
+        return invalid_page_response(err)
+
+    try:
+        async with database.AsyncSession() as session:
+            properties, next_cursor = page_of((await session.scalars(query)).all(), limit, cursor_for)
+
+            if not properties and not args.get("cursor"):
+                return {
+                    "status": "error",
+                    "message": "No properties found matching your criteria",
+                    "data": [],
+                    "errors": ["No properties match the search filters"]
+                }, 404
+
+            # Load every landlord in one round trip
+            landlord_ids = {property_item.landlord_id for property_item in properties}
+            landlords = {landlord.id: landlord for landlord in await session.scalars(select(User).where(User.id.in_(landlord_ids)))} if landlord_ids else {}
+            variants = group_variants(await session.scalars(variants_query(property_item.exterior_image_hash for property_item in properties)))
+
+        width = listing_image_width(args)
+        image_urls = wants_image_urls(args)
+
+        def format_page():
+            return [
+                format_tenant_property(
+                    property_item, landlords.get(property_item.landlord_id), image_urls,
+                    pick_variant(variants.get(property_item.exterior_image_hash), width)
+                )
+                for property_item in properties
+            ]
+
+        # Inline images are read from the blob store, which would block every socket and long poll on the loop
+        formatted_properties = format_page() if image_urls else await asyncio.to_thread(format_page)
+
+        return {
+            "status": "success",
+            "message": f"{len(formatted_properties)} property(s) found",
+            "data": formatted_properties,
+            "nextCursor": next_cursor,
+            "errors": []
+        }, 200
+
+    except SQLAlchemyError as err:
+        return {
+            "status": "error",
+            "message": "Failed to retrieve properties",
+            "data": [],
+            "errors": [str(err)]
+        }, 500
+
+
+def get_search_facets():
+    """Get result counts for each tenant search filter option under the current filters"""
+    try:
+        facets = search_facets(
+            db.session, tenant_search_filters(request.args), search_terms(request.args.get("q")), db.engine.dialect.name
+        )
+        
+        return jsonify({
+            "status": "success",
+            "message": f"{facets['total']} property(s) match the current filters",
+            "data": facets,
+            "errors": []
+        }), 200
+        
+    except SQLAlchemyError as err:
+        return jsonify({
+            "status": "error",
+            "message": "Failed to count properties",
+            "data": None,
+            "errors": [str(err)]
+        }), 500
+
+
+def saved_property_dict(property_item):
+    """Echo a saved property back; multipart clients get the exterior image's URL instead of its bytes"""
+    if not is_multipart():
+        return property_item.to_dict()
+    property_dict = property_item.to_dict(include_image=False)
+    property_dict["exteriorImage"] = exterior_image_url(property_item.id, property_item.exterior_image_hash)
+    return property_dict
+
+
 def create_property():
     """Create a new property"""
     try:
-        data = request.get_json()
+        # JSON with base64 images, or multipart/form-data with the images as file parts
+        data = request_fields(image_fields=("exteriorImage",))
         user_id = g.user.get("userId")
         
         name = data.get("name")
@@ -203,6 +410,15 @@ def create_property():
         availability = data.get("availability", True)
         exterior_image = data.get("exteriorImage")
         images = data.get("images", [])
+        if is_multipart():
+            # Gallery files come as repeated "images" parts, labelled in order by imageLabels/imageDescriptions
+            labels = request.form.getlist("imageLabels")
+            descriptions = request.form.getlist("imageDescriptions")
+            images = [{
+                "image": stream,
+                "label": labels[i] if i < len(labels) else None,
+                "description": descriptions[i] if i < len(descriptions) else None
+            } for i, stream in enumerate(uploaded_files("images"))]
         
         # Validate required fields
         if not all([name, address, city, bedrooms, price, property_type]) or exterior_image is None:
@@ -217,7 +433,7 @@ def create_property():
         exterior_image_binary = None
         if exterior_image:
             try:
-                exterior_image_binary = base64.b64decode(exterior_image)
+                exterior_image_binary = image_source(exterior_image)
             except Exception as e:
                 return jsonify({
                     "status": "error",
@@ -243,11 +459,14 @@ def create_property():
         db.session.add(new_property)
         db.session.flush()  # Get the property ID
         
+        # Resize and recompress every upload once the rows are committed
+        uploads = [new_property.exterior_image_hash]
+        
         # Add property images if provided
         for img_data in images:
             if img_data.get("image") and img_data.get("label"):
                 try:
-                    image_binary = base64.b64decode(img_data["image"])
+                    image_binary = image_source(img_data["image"])
                     property_image = PropertyImage(
                         property_id=new_property.id,
                         label=img_data["label"],
@@ -255,15 +474,20 @@ def create_property():
                         description=img_data.get("description")
                     )
                     db.session.add(property_image)
+                    uploads.append(property_image.image_hash)
                 except Exception:
                     continue  # Skip invalid images
         
         db.session.commit()
+        facet_cache.clear()
+        
+        for source_hash in uploads:
+            generate_variants(source_hash)
         
         return jsonify({
             "status": "success",
             "message": "Property created successfully",
-            "data": new_property.to_dict(),
+            "data": saved_property_dict(new_property),
             "errors": []
         }), 201
         
@@ -278,10 +502,23 @@ def create_property():
         }), 500
 
 
+# Request fields a landlord may change on a property, and the columns they set
+EDITABLE_PROPERTY_FIELDS = {
+    "name": "name",
+    "address": "address",
+    "city": "city",
+    "propertyDescription": "property_description",
+    "bedrooms": "bedrooms",
+    "price": "price",
+    "propertyType": "property_type",
+    "availability": "availability",
+}
+
+
 def update_property(id):
     """Update an existing property"""
     try:
-        data = request.get_json()
+        data = request_fields(image_fields=("exteriorImage",))
         user_id = g.user.get("userId")
         
         property_item = Property.query.filter_by(id=id, landlord_id=user_id).first()
@@ -294,26 +531,28 @@ def update_property(id):
                 "errors": [f"No property found with ID {id}"]
             }), 404
         
-        # Update property fields
+        # Update property fields; anything else (ids, owner, blob hash/size/type) is ignored
+        exterior_image_updated = False
         for field, value in data.items():
             if field == "exteriorImage" and value:
                 try:
-                    property_item.exterior_image = base64.b64decode(value)
+                    property_item.exterior_image = image_source(value)
+                    exterior_image_updated = True
                 except Exception:
                     continue  # Skip invalid image
-            elif field == "propertyDescription":
-                property_item.property_description = value
-            elif field == "propertyType":
-                property_item.property_type = value
-            elif hasattr(property_item, field):
-                setattr(property_item, field, value)
+            elif field in EDITABLE_PROPERTY_FIELDS:
+                setattr(property_item, EDITABLE_PROPERTY_FIELDS[field], value)
         
         db.session.commit()
+        facet_cache.clear()
+        
+        if exterior_image_updated:
+            generate_variants(property_item.exterior_image_hash)
         
         return jsonify({
             "status": "success",
             "message": "Property updated successfully",
-            "data": property_item.to_dict(),
+            "data": saved_property_dict(property_item),
             "errors": []
         }), 200
         
@@ -348,6 +587,7 @@ def delete_property(id):
         # Delete the property
         db.session.delete(property_item)
         db.session.commit()
+        facet_cache.clear()
         
         return jsonify({
             "status": "success",
@@ -1,14 +1,26 @@
 from flask import request, jsonify, g
 from sqlalchemy.exc import SQLAlchemyError
-import base64
-from models import PropertyImage, Property
+from models import PropertyImage, Property, ImageVariant
+from image_variants import generate_variants
+from images import property_image_value, property_image_url, send_blob
+from uploads import request_fields, image_source, is_multipart
 from db import db
 
 
+def uploaded_image_dict(property_image):
+    """Echo an upload back; multipart clients get the image's URL instead of the bytes they just sent"""
+    if not is_multipart():
+        return property_image.to_dict()
+    image_dict = property_image.to_dict(include_image=False)
+    image_dict["image"] = property_image_url(property_image.property_id, property_image.id, property_image.image_hash)
+    return image_dict
+
+
 def upload_property_image(id):
     """Upload a new image for a property"""
     try:
-        data = request.get_json()
+        # JSON with a base64 image, or multipart/form-data with the image as a file part
+        data = request_fields(image_fields=("image",))
         label = data.get("label")
         image = data.get("image")
         description = data.get("description")
@@ -34,7 +46,7 @@ def upload_property_image(id):
         
         # Convert base64 image to binary
         try:
-            image_binary = base64.b64decode(image)
+            image_binary = image_source(image)
         except Exception as e:
             return jsonify({
                 "status": "error",
@@ -54,10 +66,12 @@ def upload_property_image(id):
         db.session.add(new_image)
         db.session.commit()
         
+        generate_variants(new_image.image_hash)
+        
         return jsonify({
             "status": "success",
             "message": "Image uploaded successfully",
-            "data": new_image.to_dict(),
+            "data": uploaded_image_dict(new_image),
             "errors": []
         }), 201
         
@@ -88,11 +102,8 @@ def get_property_images(id):
         # Convert images to base64
         formatted_images = []
         for img in images:
-            img_dict = img.to_dict()
-            if img_dict.get("image"):
-                img_dict["image"] = f"data:image/jpeg;base64,{base64.b64encode(img_dict['image']).decode('utf-8')}"
-            else:
-                img_dict["image"] = None
+            img_dict = img.to_dict(include_image=False)
+            img_dict["image"] = property_image_value(property_id, img.id, img.image_hash, img.image_type)
             formatted_images.append(img_dict)
         
         return jsonify({
@@ -111,10 +122,73 @@ def get_property_images(id):
         }), 500
 
 
+def send_image(key, size, mime_type):
+    """Send a stored image, or the ?variant= of it when one has been rendered"""
+    variant_name = request.args.get("variant")
+    if variant_name:
+        variant = ImageVariant.query.filter_by(source_hash=key, variant=variant_name).first()
+        if variant:
+            return send_blob(variant.hash, variant.size, variant.type)
+    return send_blob(key, size, mime_type)
+
+
+def get_property_image_raw(id, image_id):
+    """Stream the bytes of a property image"""
+    try:
+        property_image = db.session.query(
+            PropertyImage.image_hash, PropertyImage.image_size, PropertyImage.image_type
+        ).filter_by(id=image_id, property_id=id).first()
+        
+        if not property_image:
+            return jsonify({
+                "status": "error",
+                "message": "Image not found",
+                "data": None,
+                "errors": [f"No image found with ID {image_id} for property {id}"]
+            }), 404
+        
+        return send_image(property_image.image_hash, property_image.image_size, property_image.image_type)
+        
+    except SQLAlchemyError as err:
+        return jsonify({
+            "status": "error",
+            "message": "Failed to retrieve image",
+            "data": None,
+            "errors": [str(err)]
+        }), 500
+
+
+def get_exterior_image_raw(id):
+    """Stream the bytes of a property's exterior image"""
+    try:
+        property_item = db.session.query(
+            Property.exterior_image_hash, Property.exterior_image_size, Property.exterior_image_type
+        ).filter_by(id=id).first()
+        
+        if not property_item:
+            return jsonify({
+                "status": "error",
+                "message": "Property not found",
+                "data": None,
+                "errors": [f"No property found with ID {id}"]
+            }), 404
+        
+        return send_image(property_item.exterior_image_hash, property_item.exterior_image_size, property_item.exterior_image_type)
+        
+    except SQLAlchemyError as err:
+        return jsonify({
+            "status": "error",
+            "message": "Failed to retrieve image",
+            "data": None,
+            "errors": [str(err)]
+        }), 500
+
+
 def update_property_image(id, image_id):
     """Update a property image"""
     try:
-        data = request.get_json()
+        # JSON with a base64 image, or multipart/form-data with the image as a file part
+        data = request_fields(image_fields=("image",))
         label = data.get("label")
         image = data.get("image")
         description = data.get("description")
@@ -133,9 +207,11 @@ def update_property_image(id, image_id):
             property_image.label = label
         if description:
             property_image.description = description
+        image_updated = False
         if image:
             try:
-                property_image.image = base64.b64decode(image)
+                property_image.image = image_source(image)
+                image_updated = True
             except Exception:
                 return jsonify({
                     "status": "error",
@@ -146,10 +222,13 @@ def update_property_image(id, image_id):
         
         db.session.commit()
         
+        if image_updated:
+            generate_variants(property_image.image_hash)
+        
         return jsonify({
             "status": "success",
             "message": "Image updated successfully",
-            "data": property_image.to_dict(),
+            "data": uploaded_image_dict(property_image),
             "errors": []
         }), 200
         
@@ -1,15 +1,215 @@
 from flask_sqlalchemy import SQLAlchemy
-from flask import current_app
+from flask_sqlalchemy.session import Session
+from flask import current_app, request, g, has_request_context
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.pool import QueuePool
+from metrics import Gauge, Histogram
+from functools import wraps
+import random
+import threading
+import time
 import os
 
-db = SQLAlchemy()
+# Read replicas from DB_REPLICA_URLS, GET requests read from these unless they must see their own writes
+replica_engines = []
+
+# Seconds a user keeps reading from the primary after writing, to cover replication lag
+STICKY_SECONDS = float(os.getenv("DB_REPLICA_STICKY_SECONDS") or 5)
+STICKY_COOKIE = "db_primary_until"
+# {user id: time their sticky window ends}, oldest first since every window is the same length
+last_write_by_user = {}
+last_write_lock = threading.Lock()
+
+
+def use_primary(f):
+    """Force a view to read from the primary (e.g. GET routes that write)"""
+    @wraps(f)
+    def wrapper(*args, **kwargs):
+        g.db_use_primary = True
+        return f(*args, **kwargs)
+    return wrapper
+
+
+def reads_from_replica():
+    """Whether the current request may read from a replica"""
+    if not replica_engines or not has_request_context():
+        return False
+    if request.method not in ("GET", "HEAD") or g.get("db_use_primary") or g.get("db_wrote"):
+        return False
+
+    now = time.time()
+    try:
+        if float(request.cookies.get(STICKY_COOKIE, 0)) > now:
+            return False
+    except ValueError:
+        pass
+
+    user = g.get("user") or {}
+    sticky_until = last_write_by_user.get(user.get("userId"))
+    if sticky_until is None:
+        return True
+    if sticky_until > now:
+        return False
+    last_write_by_user.pop(user.get("userId"), None)
+    return True
+
+
+class RoutingSession(Session):
+    """Session that sends reads in GET requests to a replica and everything else to the primary"""
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and reads_from_replica():
+            if "db_replica" not in g:
+                g.db_replica = random.choice(replica_engines)
+            return g.db_replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+db = SQLAlchemy(session_options={"class_": RoutingSession})
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def remember_write(session, flush_context):
+    """Pin the rest of the request, and the user's next few seconds, to the primary"""
+    if not has_request_context():
+        return
+    g.db_wrote = True
+    user = g.get("user") or {}
+    if user.get("userId") is not None:
+        remember_user_write(user["userId"])
+
+
+def remember_user_write(user_id):
+    """Start a user's sticky window, dropping windows that already ended so the map only holds recent writers"""
+    now = time.time()
+    with last_write_lock:
+        # Re-insert to keep the map ordered by expiry
+        last_write_by_user.pop(user_id, None)
+        last_write_by_user[user_id] = now + STICKY_SECONDS
+        while last_write_by_user:
+            oldest, sticky_until = next(iter(last_write_by_user.items()))
+            if sticky_until > now:
+                break
+            del last_write_by_user[oldest]
+
+
+def set_sticky_cookie(response):
+    """Tell the client to read from the primary for a moment after it wrote"""
+    if replica_engines and g.get("db_wrote"):
+        response.set_cookie(STICKY_COOKIE, str(time.time() + STICKY_SECONDS), max_age=int(STICKY_SECONDS) + 1, httponly=True)
+    return response
+
+# Async engine and session factory used by the ASGI entry point
+async_engine = None
+AsyncSession = None
+
+POOL_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds", "Time spent waiting for a pooled connection",
+    ["pool"], buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+)
+POOL_CHECKED_OUT = Gauge("db_pool_checked_out", "Connections currently checked out of the pool", ["pool"])
+POOL_OVERFLOW = Gauge("db_pool_overflow", "Connections open beyond pool_size", ["pool"])
+POOL_SIZE = Gauge("db_pool_size", "Configured pool size", ["pool"])
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that reports how long each checkout waited for a connection"""
+    metrics_name = "primary"
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            POOL_CHECKOUT_WAIT.observe(time.perf_counter() - start, pool=self.metrics_name)
+
+    def recreate(self):
+        # engine.dispose() swaps in a recreated pool, keep reporting under the same name
+        pool = super().recreate()
+        pool.metrics_name = self.metrics_name
+        return pool
+
+
+def pool_options():
+    """Connection pool settings from the environment"""
+    return {
+        "pool_size": int(os.getenv("DB_POOL_SIZE") or 10),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW") or 20),
+        "pool_timeout": int(os.getenv("DB_POOL_TIMEOUT") or 30),
+        # Recycle below MySQL's wait_timeout so idle connections are never stale
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE") or 1800),
+        "pool_pre_ping": (os.getenv("DB_POOL_PRE_PING") or "true") == "true",
+    }
+
+
+def instrument_pool(engine, name):
+    """Export checked-out, overflow and size gauges for an engine's pool"""
+    engine.pool.metrics_name = name
+    POOL_SIZE.set(engine.pool.size(), pool=name)
+
+    def update(*args):
+        # Read engine.pool each time, dispose() replaces the pool object
+        POOL_CHECKED_OUT.set(engine.pool.checkedout(), pool=name)
+        POOL_OVERFLOW.set(max(engine.pool.overflow(), 0), pool=name)
+
+    event.listen(engine, "checkout", update)
+    event.listen(engine, "checkin", update)
+
+
+def all_engines():
+    """The primary engine followed by every replica"""
+    return [db.engine, *replica_engines]
+
+
+def warmup_count(pool, count=None):
+    """DB_POOL_WARMUP capped at pool_size + max_overflow, the most connections the pool hands out
+    at once; warming up holds them all, so asking for more would wait pool_timeout and fail"""
+    count = int(os.getenv("DB_POOL_WARMUP") or 0) if count is None else count
+    if isinstance(pool, QueuePool) and pool._max_overflow >= 0:
+        count = min(count, pool.size() + pool._max_overflow)
+    return count
+
+
+def warm_pool(engine, count=None):
+    """Open connections up front so the first requests don't pay for the TCP and auth handshake"""
+    connections = []
+    try:
+        for _ in range(warmup_count(engine.pool, count)):
+            conn = engine.connect()
+            conn.execute(text("SELECT 1"))
+            connections.append(conn)
+    finally:
+        for conn in connections:
+            conn.close()
 
 def init_db(app):
     db_url = os.getenv("DB_URL")
     app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv("DB_URL")
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    if db_url and not db_url.startswith("sqlite"):
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {"poolclass": InstrumentedQueuePool, **pool_options()}
     db.init_app(app)
 
+    with app.app_context():
+        if isinstance(db.engine.pool, QueuePool):
+            instrument_pool(db.engine, "primary")
+
+    for i, replica_url in enumerate(url for url in (os.getenv("DB_REPLICA_URLS") or "").split(",") if url.strip()):
+        engine = create_engine(replica_url.strip(), poolclass=InstrumentedQueuePool, **pool_options())
+        instrument_pool(engine, f"replica{i}")
+        replica_engines.append(engine)
+
+    app.after_request(set_sticky_cookie)
+
+def init_async_db():
+    """Create the async engine, deriving an aiomysql URL from DB_URL unless ASYNC_DB_URL is set"""
+    global async_engine, AsyncSession
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+    db_url = os.getenv("ASYNC_DB_URL") or os.getenv("DB_URL", "").replace("mysql+pymysql://", "mysql+aiomysql://", 1)
+    options = pool_options() if not db_url.startswith("sqlite") else {}
+    async_engine = create_async_engine(db_url, **options)
+    AsyncSession = async_sessionmaker(async_engine, expire_on_commit=False)
+
 def sync_database():
     with current_app.app_context():
-        db.create_all()
\ No newline at end of file
+        db.create_all()
@@ -37,6 +37,23 @@ CREATE TABLE `calendar_events` (
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
 /*!40101 SET character_set_client = @saved_cs_client */;
 
+--
+-- Table structure for table `chat_events`
+--
+
+DROP TABLE IF EXISTS `chat_events`;
+/*!40101 SET @saved_cs_client     = @@character_set_client */;
+/*!50503 SET character_set_client = utf8mb4 */;
+CREATE TABLE `chat_events` (
+  `id` int NOT NULL AUTO_INCREMENT,
+  `channel` varchar(64) NOT NULL,
+  `type` varchar(32) NOT NULL,
+  `payload` text NOT NULL,
+  `created_at` datetime DEFAULT (now()),
+  PRIMARY KEY (`id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+/*!40101 SET character_set_client = @saved_cs_client */;
+
 --
 -- Table structure for table `Chores`
 --
@@ -98,6 +115,8 @@ CREATE TABLE `expenses` (
   KEY `group_id` (`group_id`),
   KEY `paid_by` (`paid_by`),
   KEY `owed_to` (`owed_to`),
+  KEY `ix_expenses_group_id_paid_by` (`group_id`,`paid_by`),
+  KEY `ix_expenses_group_id_owed_to` (`group_id`,`owed_to`),
   CONSTRAINT `expenses_ibfk_1` FOREIGN KEY (`group_id`) REFERENCES `groups` (`id`) ON DELETE CASCADE,
   CONSTRAINT `expenses_ibfk_2` FOREIGN KEY (`paid_by`) REFERENCES `users` (`id`),
   CONSTRAINT `expenses_ibfk_3` FOREIGN KEY (`owed_to`) REFERENCES `users` (`id`)
@@ -119,6 +138,7 @@ CREATE TABLE `group_participant` (
   PRIMARY KEY (`id`),
   KEY `group_id` (`group_id`),
   KEY `tenant_id` (`tenant_id`),
+  KEY `ix_group_participant_tenant_id_group_id` (`tenant_id`,`group_id`),
   CONSTRAINT `group_participant_ibfk_1` FOREIGN KEY (`group_id`) REFERENCES `groups` (`id`) ON DELETE CASCADE,
   CONSTRAINT `group_participant_ibfk_2` FOREIGN KEY (`tenant_id`) REFERENCES `users` (`id`) ON DELETE CASCADE
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
@@ -144,6 +164,28 @@ CREATE TABLE `groups` (
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
 /*!40101 SET character_set_client = @saved_cs_client */;
 
+--
+-- Table structure for table `image_variants`
+--
+
+DROP TABLE IF EXISTS `image_variants`;
+/*!40101 SET @saved_cs_client     = @@character_set_client */;
+/*!50503 SET character_set_client = utf8mb4 */;
+CREATE TABLE `image_variants` (
+  `id` int NOT NULL AUTO_INCREMENT,
+  `source_hash` varchar(64) NOT NULL,
+  `variant` varchar(20) NOT NULL,
+  `hash` varchar(64) NOT NULL,
+  `size` int NOT NULL,
+  `type` varchar(100) NOT NULL,
+  `width` int NOT NULL,
+  `height` int NOT NULL,
+  `created_at` datetime DEFAULT NULL,
+  PRIMARY KEY (`id`),
+  UNIQUE KEY `uq_image_variants_source_hash_variant` (`source_hash`,`variant`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+/*!40101 SET character_set_client = @saved_cs_client */;
+
 --
 -- Table structure for table `inventory`
 --
@@ -158,6 +200,7 @@ CREATE TABLE `inventory` (
   `group_id` int NOT NULL,
   PRIMARY KEY (`item_id`),
   KEY `group_id` (`group_id`),
+  KEY `ix_inventory_group_id_quantity` (`group_id`,`quantity`),
   CONSTRAINT `inventory_ibfk_1` FOREIGN KEY (`group_id`) REFERENCES `groups` (`id`) ON DELETE CASCADE
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
 /*!40101 SET character_set_client = @saved_cs_client */;
@@ -175,7 +218,8 @@ CREATE TABLE `item` (
   `item` varchar(255) NOT NULL,
   `assigned_to` varchar(255) DEFAULT NULL,
   `purchased` int NOT NULL,
-  PRIMARY KEY (`item_id`)
+  PRIMARY KEY (`item_id`),
+  KEY `ix_item_list_id` (`list_id`)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
 /*!40101 SET character_set_client = @saved_cs_client */;
 
@@ -209,12 +253,12 @@ CREATE TABLE `message` (
   `conversation_id` int NOT NULL,
   `sender_id` int NOT NULL,
   `content` text NOT NULL,
-  `read_by` json DEFAULT NULL,
   `created_at` datetime DEFAULT (now()),
   `updated_at` datetime DEFAULT (now()),
   PRIMARY KEY (`id`),
   KEY `conversation_id` (`conversation_id`),
   KEY `sender_id` (`sender_id`),
+  KEY `ix_message_conversation_id_created_at` (`conversation_id`,`created_at`),
   CONSTRAINT `message_ibfk_1` FOREIGN KEY (`conversation_id`) REFERENCES `conversation` (`id`),
   CONSTRAINT `message_ibfk_2` FOREIGN KEY (`sender_id`) REFERENCES `users` (`id`)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
@@ -232,10 +276,11 @@ CREATE TABLE `participant` (
   `conversation_id` int NOT NULL,
   `user_id` int NOT NULL,
   `role` enum('tenant','landlord') NOT NULL,
+  `last_read_message_id` int DEFAULT NULL,
   `created_at` datetime DEFAULT (now()),
   `updated_at` datetime DEFAULT (now()),
   PRIMARY KEY (`id`),
-  KEY `conversation_id` (`conversation_id`),
+  UNIQUE KEY `uq_participant_conversation_id_user_id` (`conversation_id`,`user_id`),
   KEY `user_id` (`user_id`),
   CONSTRAINT `participant_ibfk_1` FOREIGN KEY (`conversation_id`) REFERENCES `conversation` (`id`),
   CONSTRAINT `participant_ibfk_2` FOREIGN KEY (`user_id`) REFERENCES `users` (`id`)
@@ -282,11 +327,19 @@ CREATE TABLE `properties` (
   `property_type` enum('House','Apartment','Condo','Townhouse','Duplex','Studio','Loft','Bungalow','Cabin','MobileHome','Other') NOT NULL,
   `availability` tinyint(1) NOT NULL,
   `landlord_id` int NOT NULL,
-  `exterior_image` longblob NOT NULL,
+  `exterior_image_hash` varchar(64) NOT NULL,
+  `exterior_image_size` int NOT NULL,
+  `exterior_image_type` varchar(100) NOT NULL,
   `created_at` datetime DEFAULT NULL,
   `updated_at` datetime DEFAULT NULL,
   PRIMARY KEY (`id`),
   KEY `landlord_id` (`landlord_id`),
+  KEY `ix_properties_exterior_image_hash` (`exterior_image_hash`),
+  KEY `ix_properties_availability_id` (`availability`,`id`),
+  KEY `ix_properties_availability_price_id` (`availability`,`price`,`id`),
+  KEY `ix_properties_availability_bedrooms_id` (`availability`,`bedrooms`,`id`),
+  KEY `ix_properties_availability_city_type` (`availability`,`city`,`property_type`,`price`,`bedrooms`),
+  FULLTEXT KEY `ft_properties_name_description_city` (`name`,`property_description`,`city`),
   CONSTRAINT `properties_ibfk_1` FOREIGN KEY (`landlord_id`) REFERENCES `users` (`id`) ON DELETE CASCADE
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
 /*!40101 SET character_set_client = @saved_cs_client */;
@@ -302,12 +355,15 @@ CREATE TABLE `property_images` (
   `id` int NOT NULL AUTO_INCREMENT,
   `property_id` int NOT NULL,
   `label` varchar(255) NOT NULL,
-  `image` longblob NOT NULL,
+  `image_hash` varchar(64) NOT NULL,
+  `image_size` int NOT NULL,
+  `image_type` varchar(100) NOT NULL,
   `description` text,
   `created_at` datetime DEFAULT NULL,
   `updated_at` datetime DEFAULT NULL,
   PRIMARY KEY (`id`),
   KEY `property_id` (`property_id`),
+  KEY `ix_property_images_image_hash` (`image_hash`),
   CONSTRAINT `property_images_ibfk_1` FOREIGN KEY (`property_id`) REFERENCES `properties` (`id`) ON DELETE CASCADE
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
 /*!40101 SET character_set_client = @saved_cs_client */;
@@ -326,7 +382,8 @@ CREATE TABLE `reviews` (
   `reviewer_id` int NOT NULL,
   `score` int NOT NULL,
   `description` varchar(255) DEFAULT NULL,
-  PRIMARY KEY (`review_id`)
+  PRIMARY KEY (`review_id`),
+  KEY `ix_reviews_review_type_reviewed_item_id` (`review_type`,`reviewed_item_id`)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
 /*!40101 SET character_set_client = @saved_cs_client */;
 
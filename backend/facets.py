@@ -0,0 +1,128 @@
+from collections import OrderedDict
+from sqlalchemy import select, func, case, and_, true
+from models import Property
+from models.property import PropertyType
+from search import apply_text_search
+import os
+import threading
+import time
+
+# Result counts for each tenant search filter option under the other filters the user picked,
+# so the search screen can show what an option would return before running it. One GROUP BY
+# (city, property type) pass with conditional sums feeds every facet; each facet leaves its
+# own filter out, so picking an option never hides the alternatives.
+BEDROOM_FACETS = (1, 2, 3, 4, 5)
+PRICE_FACETS = (500, 1000, 1500, 2000, 3000, 5000)
+TOP_CITIES = int(os.getenv("FACET_TOP_CITIES") or 10)
+
+# Counts are cached per filter combination for FACET_CACHE_SECONDS in each worker. Property
+# writes clear this worker's cache, other workers catch up when their entries expire.
+FACET_CACHE_SECONDS = float(os.getenv("FACET_CACHE_SECONDS") or 60)
+FACET_CACHE_SIZE = int(os.getenv("FACET_CACHE_SIZE") or 1024)
+
+
+class TTLCache:
+    """Least recently used cache whose entries expire ttl seconds after they are stored"""
+
+    def __init__(self, ttl, size):
+        self.ttl = ttl
+        self.size = size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        if self.ttl <= 0:
+            return
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+facet_cache = TTLCache(FACET_CACHE_SECONDS, FACET_CACHE_SIZE)
+
+
+def count_where(condition):
+    return func.sum(case((condition, 1), else_=0))
+
+
+def facets_query(filters, terms, dialect):
+    """Per (city, property type) group: matches under the price and bedroom filters, and the
+    count for each bedroom and price option under the other of the two"""
+    price_ok = Property.price <= filters["maxPrice"] if filters["maxPrice"] is not None else true()
+    bedrooms_ok = Property.bedrooms >= filters["bedrooms"] if filters["bedrooms"] is not None else true()
+
+    query = select(
+        Property.city,
+        Property.property_type,
+        count_where(and_(price_ok, bedrooms_ok)).label("matches"),
+        *[count_where(and_(price_ok, Property.bedrooms >= bedrooms)).label(f"bedrooms_{bedrooms}") for bedrooms in BEDROOM_FACETS],
+        *[count_where(and_(bedrooms_ok, Property.price <= price)).label(f"price_{price}") for price in PRICE_FACETS],
+    ).select_from(Property).where(Property.availability == True)
+
+    if terms:
+        query = apply_text_search(query, terms, dialect)[0]
+    return query.group_by(Property.city, Property.property_type)
+
+
+def roll_up(rows, filters):
+    """Fold the grouped rows into facet counts, applying the city and type filters to the group keys"""
+    city = filters["city"].lower() if filters["city"] is not None else None
+    property_type = filters["propertyType"]
+
+    total = 0
+    types = {member.name: 0 for member in PropertyType}
+    cities = {}
+    bedrooms = dict.fromkeys(BEDROOM_FACETS, 0)
+    prices = dict.fromkeys(PRICE_FACETS, 0)
+
+    for row in rows:
+        city_ok = city is None or city in row.city.lower()
+        type_ok = property_type is None or row.property_type.name == property_type
+
+        if city_ok:
+            types[row.property_type.name] += row.matches
+        if type_ok:
+            cities[row.city] = cities.get(row.city, 0) + row.matches
+        if city_ok and type_ok:
+            total += row.matches
+            for option in BEDROOM_FACETS:
+                bedrooms[option] += getattr(row, f"bedrooms_{option}")
+            for option in PRICE_FACETS:
+                prices[option] += getattr(row, f"price_{option}")
+
+    top_cities = sorted((item for item in cities.items() if item[1]), key=lambda item: (-item[1], item[0]))[:TOP_CITIES]
+    return {
+        "total": total,
+        "propertyTypes": [{"value": name, "count": count} for name, count in types.items()],
+        "bedrooms": [{"min": option, "count": count} for option, count in bedrooms.items()],
+        "prices": [{"max": option, "count": count} for option, count in prices.items()],
+        "cities": [{"value": name, "count": count} for name, count in top_cities],
+    }
+
+
+def search_facets(session, filters, terms, dialect):
+    """Facet counts for the filters and ?q= terms, from the cache or one aggregate query"""
+    key = (tuple(sorted(filters.items())), tuple(term.lower() for term in terms))
+    facets = facet_cache.get(key)
+    if facets is None:
+        facets = roll_up(session.execute(facets_query(filters, terms, dialect)).all(), filters)
+        facet_cache.set(key, facets)
+    return facets
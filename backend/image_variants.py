@@ -0,0 +1,146 @@
+from flask import current_app
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from concurrent.futures import ProcessPoolExecutor
+from blob_store import store_blob, load_blob
+from models import ImageVariant
+from db import db
+import io
+import logging
+import multiprocessing
+import os
+import threading
+
+# Pillow is optional: without it uploads are stored as sent and listings fall back to the originals
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = None
+
+# (name, longest edge in pixels), smallest first
+VARIANTS = (("thumb", 256), ("card", 640), ("full", 1600))
+
+VARIANT_FORMAT = os.getenv("IMAGE_VARIANT_FORMAT") or "WEBP"
+VARIANT_QUALITY = int(os.getenv("IMAGE_VARIANT_QUALITY") or 80)
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS") or 2)
+
+MIME_TYPES = {"WEBP": "image/webp", "JPEG": "image/jpeg", "PNG": "image/png"}
+
+log = logging.getLogger("homey.images")
+
+pool = None
+pool_pid = None
+pool_lock = threading.Lock()
+
+
+def render_variants(source_hash):
+    """Decode a stored image and encode each variant, returning [(name, bytes, width, height)]
+
+    Runs in a worker process, which reads the original from the blob store itself so request
+    workers never hold the bytes. Orientation is applied to the pixels first, and nothing from the
+    original's metadata (EXIF, GPS, ICC, comments) is passed to the encoder, so it is stripped.
+    """
+    with Image.open(io.BytesIO(load_blob(source_hash))) as original:
+        image = ImageOps.exif_transpose(original)
+        has_alpha = image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info
+        image = image.convert("RGBA" if has_alpha and VARIANT_FORMAT != "JPEG" else "RGB")
+
+        options = {"quality": VARIANT_QUALITY}
+        if VARIANT_FORMAT == "WEBP":
+            options["method"] = 4
+        elif VARIANT_FORMAT == "JPEG":
+            options.update(optimize=True, progressive=True)
+
+        results = []
+        for name, edge in VARIANTS:
+            variant = image.copy()
+            variant.thumbnail((edge, edge), Image.LANCZOS)
+            out = io.BytesIO()
+            variant.save(out, VARIANT_FORMAT, **options)
+            results.append((name, out.getvalue(), variant.width, variant.height))
+        return results
+
+
+def get_pool():
+    """The image worker pool, created once per process (pools don't survive a pre-fork)"""
+    global pool, pool_pid
+    with pool_lock:
+        if pool_pid != os.getpid():
+            # spawn, not fork: forking a threaded server process can copy held locks into the child
+            pool = ProcessPoolExecutor(max_workers=IMAGE_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+            pool_pid = os.getpid()
+        return pool
+
+
+def save_variants(app, source_hash, future):
+    """Store rendered variants and record them (runs when the worker finishes)"""
+    try:
+        results = future.result()
+    except Exception as err:
+        log.warning("Could not render variants of %s: %s", source_hash, err)
+        return
+
+    with app.app_context():
+        try:
+            for name, data, width, height in results:
+                key, size, mime_type = store_blob(data)
+                db.session.add(ImageVariant(
+                    source_hash=source_hash, variant=name, hash=key, size=size,
+                    type=MIME_TYPES.get(VARIANT_FORMAT, mime_type), width=width, height=height
+                ))
+            db.session.commit()
+        except IntegrityError:
+            # Someone uploaded the same image at the same time and its variants won
+            db.session.rollback()
+        finally:
+            db.session.remove()
+
+
+def generate_variants(source_hash):
+    """Render the size variants of a stored image in the process pool, without waiting for them
+
+    Identical images share variants, so nothing is rendered if these bytes already have them.
+    """
+    if Image is None or not source_hash:
+        return None
+    if db.session.query(ImageVariant.id).filter_by(source_hash=source_hash).first() is not None:
+        return None
+
+    app = current_app._get_current_object()
+    future = get_pool().submit(render_variants, source_hash)
+    future.add_done_callback(lambda done: save_variants(app, source_hash, done))
+    return future
+
+
+def variants_query(source_hashes):
+    """Select every variant of the given images (run it on a sync or async session)"""
+    return select(ImageVariant).where(ImageVariant.source_hash.in_(set(source_hashes)))
+
+
+def group_variants(variants):
+    """{source_hash: {name: ImageVariant}}"""
+    grouped = {}
+    for variant in variants:
+        grouped.setdefault(variant.source_hash, {})[variant.variant] = variant
+    return grouped
+
+
+def load_variants(source_hashes):
+    hashes = [key for key in source_hashes if key]
+    if not hashes:
+        return {}
+    return group_variants(db.session.scalars(variants_query(hashes)))
+
+
+def pick_variant(variants, width):
+    """The smallest variant at least `width` pixels on its longest edge, else the largest there is
+
+    Returns None when the image has no variants yet, so callers serve the original.
+    """
+    if not variants:
+        return None
+    available = [variants[name] for name, _ in VARIANTS if name in variants]
+    for variant in available:
+        if max(variant.width, variant.height) >= width:
+            return variant
+    return available[-1]
@@ -0,0 +1,96 @@
+from flask import request, current_app, jsonify
+from werkzeug.wsgi import wrap_file
+from blob_store import get_blob_store, load_blob
+import base64
+import os
+
+# How JSON responses carry images: "base64" data URIs (what existing clients expect) or "url"s
+# pointing at the raw endpoints. Clients can opt in per request with ?imageFormat=url.
+IMAGE_FORMAT = os.getenv("IMAGE_FORMAT") or "base64"
+
+# Listings draw images this wide unless the client says otherwise, the smallest variant that covers it is sent
+LISTING_IMAGE_WIDTH = int(os.getenv("LISTING_IMAGE_WIDTH") or 640)
+
+# Raw image URLs carry the content hash, so a response for the current version never changes
+IMMUTABLE_CACHE_CONTROL = "private, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "private, no-cache"
+
+
+def wants_image_urls(args=None):
+    """Whether this request wants image URLs, from its query string (pass args outside a Flask request)"""
+    args = request.args if args is None else args
+    return (args.get("imageFormat") or IMAGE_FORMAT) == "url"
+
+
+def image_version(key):
+    return key[:16]
+
+
+def listing_image_width(args=None):
+    """Pixels the client will draw listing images at (?imageWidth=), used to pick a variant"""
+    args = request.args if args is None else args
+    width = args.get("imageWidth")
+    return int(width) if width and width.isdigit() else LISTING_IMAGE_WIDTH
+
+
+def raw_query(key, variant):
+    """?v= (and ?variant=) for a raw image URL, versioned by the bytes it will return"""
+    if variant is not None:
+        return f"?variant={variant.variant}&v={image_version(variant.hash)}"
+    return f"?v={image_version(key)}"
+
+
+def exterior_image_url(property_id, key, variant=None):
+    return f"/api/properties/{property_id}/exterior-image/raw{raw_query(key, variant)}"
+
+
+def property_image_url(property_id, image_id, key, variant=None):
+    return f"/api/properties/{property_id}/images/{image_id}/raw{raw_query(key, variant)}"
+
+
+def image_value(url, key, mime_type, as_url=None, variant=None):
+    """An image for a JSON response: its raw URL, or its bytes (or a variant's) as a data URI"""
+    if not key:
+        return None
+    if wants_image_urls() if as_url is None else as_url:
+        return url
+
+    if variant is not None:
+        key, mime_type = variant.hash, variant.type
+    data = load_blob(key)
+    if data is None:
+        return None
+    return f"data:{mime_type};base64,{base64.b64encode(data).decode('utf-8')}"
+
+
+def exterior_image_value(property_id, key, mime_type, as_url=None, variant=None):
+    return image_value(exterior_image_url(property_id, key, variant), key, mime_type, as_url, variant)
+
+
+def property_image_value(property_id, image_id, key, mime_type, as_url=None, variant=None):
+    return image_value(property_image_url(property_id, image_id, key, variant), key, mime_type, as_url, variant)
+
+
+def send_blob(key, size, mime_type):
+    """Stream a stored image with its SHA-256 as the ETag, answering If-None-Match and Range requests"""
+    blob = get_blob_store().open(key)
+    if blob is None:
+        return jsonify({
+            "status": "error",
+            "message": "Image not found",
+            "data": None,
+            "errors": ["The image file is missing from the blob store"]
+        }), 404
+
+    response = current_app.response_class(
+        wrap_file(request.environ, blob), mimetype=mime_type, direct_passthrough=True
+    )
+    response.content_length = size
+    response.set_etag(key)
+    # Only the URL for the current content is immutable, an old or missing ?v= must revalidate
+    if request.args.get("v") == image_version(key):
+        response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+    else:
+        response.headers["Cache-Control"] = REVALIDATE_CACHE_CONTROL
+
+    return response.make_conditional(request, accept_ranges=True, complete_length=size)
@@ -0,0 +1,59 @@
+from flask.json.provider import DefaultJSONProvider
+from datetime import date, datetime, time
+from decimal import Decimal
+import dataclasses
+import enum
+import uuid
+
+# orjson is optional, the stdlib encoder is used when it isn't installed
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def default(o):
+    """Encode the types our models hand to jsonify that json doesn't know about"""
+    if isinstance(o, (datetime, date, time)):
+        return o.isoformat()
+    if isinstance(o, enum.Enum):
+        return o.value
+    if isinstance(o, Decimal):
+        return str(o)
+    if isinstance(o, uuid.UUID):
+        return str(o)
+    if dataclasses.is_dataclass(o) and not isinstance(o, type):
+        return dataclasses.asdict(o)
+    if isinstance(o, (set, frozenset)):
+        return list(o)
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+class StdlibJSONProvider(DefaultJSONProvider):
+    """Stock provider, but with ISO 8601 dates and enum values like the fast provider"""
+    default = staticmethod(default)
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """JSON provider backed by orjson, which encodes datetime, date, time and enum natively"""
+    option = orjson.OPT_NON_STR_KEYS if orjson else 0
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=default, option=self.option).decode("utf-8")
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        # Skip the str round trip, orjson already produces bytes
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            orjson.dumps(obj, default=default, option=self.option), mimetype=self.mimetype
+        )
+
+
+def init_json(app):
+    """Install the fastest available JSON provider on the app"""
+    provider = OrjsonProvider if orjson else StdlibJSONProvider
+    app.json_provider_class = provider
+    app.json = provider(app)
@@ -1,4 +1,4 @@
-from flask import Flask, jsonify, request
+from flask import Flask, jsonify, request, Response
 from flask_cors import CORS
 from werkzeug.middleware.proxy_fix import ProxyFix
 from routes.user_routes import user_routes
@@ -14,8 +14,16 @@ from routes.property_routes import property_routes
 from routes.group_routes import group_routes
 from routes.chores_routes import chores_routes
 from routes.review_routes import review_routes
-# from middleware.logger import logger
-from db import db, init_db, sync_database
+from routes.admin_routes import admin_routes
+from middleware.logger import logger
+from middleware.query_counter import query_counter
+from middleware.slow_query_log import slow_query_log
+from middleware.compress import compress_response
+from middleware.conditional import conditional_get
+from db import db, init_db, sync_database, warm_pool, all_engines
+from json_provider import init_json
+from uploads import UploadRequest
+import metrics
 from dotenv import load_dotenv
 from models import *
 import os
@@ -24,15 +32,34 @@ import ssl
 load_dotenv()
 
 app = Flask(__name__)
+init_json(app)
 init_db(app)
 CORS(app)
 
-# Logger middleware (you can uncomment this once logger is implemented)
-# app.before_request(logger)
+# Request logging and latency/status metrics (registered first so it sees the final status)
+logger(app)
+
+# Per-request SQL statement counts, DB time and N+1 warnings
+query_counter(app)
+
+# Slow statements with EXPLAIN plans (opt-in with SLOW_QUERY_MS)
+with app.app_context():
+    slow_query_log(app, all_engines())
+
+# Compress large JSON bodies (base64 images) for clients on mobile data
+app.after_request(compress_response)
+
+# ETags and Cache-Control for GET responses (after_request runs in reverse, so this sees the uncompressed body)
+app.after_request(conditional_get)
 
 # JSON body limits (optional)
 app.config['MAX_CONTENT_LENGTH'] = 50 * 1024 * 1024  # 50 MB
 
+# Multipart uploads stream file parts to disk (MAX_IMAGE_SIZE each), text fields stay small
+app.request_class = UploadRequest
+app.config['MAX_FORM_MEMORY_SIZE'] = 1024 * 1024
+app.config['MAX_FORM_PARTS'] = 100
+
 # Register Blueprints
 app.register_blueprint(user_routes, url_prefix="/api/users")
 app.register_blueprint(list_routes, url_prefix="/api/lists")
@@ -47,32 +74,114 @@ app.register_blueprint(property_routes, url_prefix="/api/properties")
 app.register_blueprint(group_routes, url_prefix="/api/groups")
 app.register_blueprint(chores_routes, url_prefix="/api/chores")
 app.register_blueprint(review_routes, url_prefix="/api/reviews")
+app.register_blueprint(admin_routes, url_prefix="/api/admin")
 
 # Health check route
 @app.route("/")
 def index():
     return jsonify({ "message": "Backend is running" })
 
+# Prometheus scrape endpoint (set METRICS_TOKEN to require a bearer token)
+@app.route("/metrics")
+def metrics_endpoint():
+    token = os.getenv("METRICS_TOKEN")
+    if token and request.headers.get("Authorization") != f"Bearer {token}":
+        return jsonify({ "message": "Access denied" }), 403
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
 # 404 Handler
 @app.errorhandler(404)
 def not_found(e):
     return jsonify({ "message": f"{request.method} {request.path} Not found" }), 404
 
+# 413 Handler (body over MAX_CONTENT_LENGTH or an image over MAX_IMAGE_SIZE)
+@app.errorhandler(413)
+def too_large(e):
+    return jsonify({
+        "status": "error",
+        "message": "Upload too large",
+        "data": None,
+        "errors": [e.description]
+    }), 413
+
 def run_http(port):
     with app.app_context():
         if os.getenv("SYNC") == "true":
             sync_database()
             print("Database synced")
+        for engine in all_engines():
+            warm_pool(engine)
     app.run(host="0.0.0.0", port=port)
 
 def run_https(port):
     context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
     context.load_cert_chain('./cert.crt', './key.pem')
+    with app.app_context():
+        for engine in all_engines():
+            warm_pool(engine)
     app.run(host="0.0.0.0", port=port, ssl_context=context)
 
+def warm_worker_pool(server, worker):
+    with app.app_context():
+        for engine in all_engines():
+            warm_pool(engine)
+
+def run_wsgi(port, use_tls):
+    # Imported lazily so development setups don't need gunicorn installed
+    from gunicorn.app.base import BaseApplication
+
+    class WSGIServer(BaseApplication):
+        def __init__(self, application, options):
+            self.application = application
+            self.options = options
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return self.application
+
+    # The app is already imported here, so workers are forked from a
+    # preloaded master and share its memory copy-on-write
+    with app.app_context():
+        if os.getenv("SYNC") == "true":
+            sync_database()
+            print("Database synced")
+
+        # Pooled connections must not be shared across the fork
+        for engine in all_engines():
+            engine.dispose()
+
+    options = {
+        "bind": f"0.0.0.0:{port}",
+        "workers": int(os.getenv("WSGI_WORKERS") or (os.cpu_count() or 1) * 2 + 1),
+        "threads": int(os.getenv("WSGI_THREADS") or 4),
+        "worker_class": "gthread",
+        "preload_app": True,
+        "timeout": int(os.getenv("WSGI_TIMEOUT", 30)),
+        "graceful_timeout": int(os.getenv("WSGI_GRACEFUL_TIMEOUT", 30)),
+        "keepalive": int(os.getenv("WSGI_KEEPALIVE", 5)),
+        "max_requests": int(os.getenv("WSGI_MAX_REQUESTS", 0)),
+        "max_requests_jitter": int(os.getenv("WSGI_MAX_REQUESTS_JITTER", 0)),
+        "accesslog": "-",
+        # Each worker opens its own DB_POOL_WARMUP connections after the fork
+        "post_fork": warm_worker_pool,
+    }
+    if use_tls:
+        options["certfile"] = "./cert.crt"
+        options["keyfile"] = "./key.pem"
+
+    # Send SIGHUP to the master for a graceful reload of all workers
+    WSGIServer(app, options).run()
+
 if __name__ == "__main__":
     port = int(os.getenv("FLASK_PORT", 8080))
-    if os.getenv("DEVELOPMENT", "true") == "true":
+    development = os.getenv("DEVELOPMENT", "true") == "true"
+    if os.getenv("SERVER_MODE", "flask") == "wsgi":
+        run_wsgi(port, use_tls=not development)
+    elif development:
         run_http(port)
     else:
         run_https(port)
\ No newline at end of file
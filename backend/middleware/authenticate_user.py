@@ -1,53 +1,70 @@
 from flask import request, jsonify, g
+from werkzeug.exceptions import HTTPException
 import jwt
 from functools import wraps
 import os
 
+def verify_token(auth_header, allowed_roles):
+    """Decode a bearer token and check its role, returning (user, error_body, status)"""
+    if not auth_header or not auth_header.startswith("Bearer "):
+        return None, {
+            "status": "error",
+            "message": "Invalid token",
+            "data": [],
+            "errors": ["Token is invalid or expired, please login to get a new token"],
+        }, 401
+
+    token = auth_header.split(" ")[1]
+
+    try:
+        decoded = jwt.decode(token, os.getenv("JWT_SECRET"), algorithms=["HS256"])
+
+        user_role = decoded.get("role")
+        if user_role == "admin" or user_role in allowed_roles:
+            return decoded, None, None
+        else:
+            return None, {
+                "status": "error",
+                "message": "Access denied",
+                "data": [],
+                "errors": [f"User role must be one of {allowed_roles} and you are {user_role}"],
+            }, 403
+
+    except jwt.ExpiredSignatureError as err:
+        return None, {
+            "status": "error",
+            "message": "The token has expired. Please log in again",
+            "data": [],
+            "errors": [str(err)],
+        }, 401
+    except jwt.InvalidTokenError as err:
+        return None, {
+            "status": "error",
+            "message": "Invalid token. Please log in or provide a valid token",
+            "data": [],
+            "errors": [str(err)],
+        }, 401
+    except Exception as err:
+        return None, {
+            "status": "error",
+            "message": "An unexpected error occurred while trying to verify the token",
+            "data": [],
+            "errors": [str(err)],
+        }, 500
+
 def authenticate_user(allowed_roles):
     def decorator(f):
         @wraps(f)
         def wrapper(*args, **kwargs):
-            auth_header = request.headers.get("Authorization")
-
-            if not auth_header or not auth_header.startswith("Bearer "):
-                return jsonify({
-                    "status": "error",
-                    "message": "Invalid token",
-                    "data": [],
-                    "errors": ["Token is invalid or expired, please login to get a new token"],
-                }), 401
-
-            token = auth_header.split(" ")[1]
+            decoded, error, status = verify_token(request.headers.get("Authorization"), allowed_roles)
+            if error:
+                return jsonify(error), status
 
+            g.user = decoded
             try:
-                decoded = jwt.decode(token, os.getenv("JWT_SECRET"), algorithms=["HS256"])
-
-                user_role = decoded.get("role")
-                if user_role == "admin" or user_role in allowed_roles:
-                    g.user = decoded
-                    return f(*args, **kwargs)
-                else:
-                    return jsonify({
-                        "status": "error",
-                        "message": "Access denied",
-                        "data": [],
-                        "errors": [f"User role must be one of {allowed_roles} and you are {user_role}"],
-                    }), 403
-
-            except jwt.ExpiredSignatureError as err:
-                return jsonify({
-                    "status": "error",
-                    "message": "The token has expired. Please log in again",
-                    "data": [],
-                    "errors": [str(err)],
-                }), 401
-            except jwt.InvalidTokenError as err:
-                return jsonify({
-                    "status": "error",
-                    "message": "Invalid token. Please log in or provide a valid token",
-                    "data": [],
-                    "errors": [str(err)],
-                }), 401
+                return f(*args, **kwargs)
+            except HTTPException:
+                raise  # e.g. 413 from an upload, answered by the app's error handlers
             except Exception as err:
                 return jsonify({
                     "status": "error",
@@ -57,4 +74,4 @@ def authenticate_user(allowed_roles):
                 }), 500
 
         return wrapper
-    return decorator
\ No newline at end of file
+    return decorator
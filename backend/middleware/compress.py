@@ -0,0 +1,85 @@
+from flask import request, current_app
+import gzip
+import os
+
+# Brotli is optional, gzip is always available
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE") or 1024)
+GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL") or 6)
+BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY") or 5)
+
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript", "image/svg+xml")
+
+
+def skip_compression(f):
+    """Mark a view so its responses are never compressed"""
+    f.skip_compression = True
+    return f
+
+
+def choose_encoding(accept_encoding):
+    """Pick the best supported encoding from an Accept-Encoding header"""
+    accepted = {}
+    for part in (accept_encoding or "").split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        if name:
+            accepted[name.lower()] = quality
+
+    if brotli is not None and accepted.get("br", 0) > 0:
+        return "br"
+    if accepted.get("gzip", 0) > 0:
+        return "gzip"
+    return None
+
+
+def compress_body(body, encoding):
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+
+def compress_response(response):
+    """Compress large textual responses with brotli or gzip based on Accept-Encoding"""
+    response.vary.add("Accept-Encoding")
+
+    if (
+        response.direct_passthrough
+        or response.is_streamed
+        or "Content-Encoding" in response.headers
+        or response.status_code < 200
+        or response.status_code in (204, 304)
+        or not (response.mimetype or "").startswith(COMPRESSIBLE_TYPES)
+    ):
+        return response
+
+    view = current_app.view_functions.get(request.endpoint)
+    if getattr(view, "skip_compression", False):
+        return response
+
+    encoding = choose_encoding(request.headers.get("Accept-Encoding"))
+    if not encoding:
+        return response
+
+    body = response.get_data()
+    if len(body) < MIN_SIZE:
+        return response
+
+    response.set_data(compress_body(body, encoding))
+    response.headers["Content-Encoding"] = encoding
+
+    # The encoded bytes differ from the identity body, so only a weak validator still holds
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+
+    return response
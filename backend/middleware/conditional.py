@@ -0,0 +1,67 @@
+from flask import request, current_app, make_response, g
+from functools import wraps
+import hashlib
+
+DEFAULT_CACHE_CONTROL = "private, no-cache"
+
+
+def scoped_etag(user_id, full_path, token):
+    """Build an ETag from a resource version token, scoped to a caller and a URL (path?query)"""
+    raw = f"{user_id}:{full_path}:{token}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def version_etag(token):
+    """ETag of a version token for the current request"""
+    user = getattr(g, "user", None) or {}
+    return scoped_etag(user.get("userId"), request.full_path, token)
+
+
+def cache_policy(cache_control=DEFAULT_CACHE_CONTROL, version=None):
+    """Set the Cache-Control policy for a GET view and optionally derive its ETag from a cheap version check
+
+    version is called with the view's arguments and returns any value that changes whenever the
+    response would, or None to fall back to hashing the rendered body.
+    """
+    def decorator(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            if version is None or request.method != "GET":
+                return f(*args, **kwargs)
+
+            token = version(*args, **kwargs)
+            if token is None:
+                return f(*args, **kwargs)
+
+            # Answer with 304 before running the view's queries
+            etag = version_etag(token)
+            if request.if_none_match.contains_weak(etag):
+                response = current_app.response_class(status=304)
+            else:
+                response = make_response(f(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+            response.set_etag(etag)
+            return response
+
+        wrapper.cache_control = cache_control
+        return wrapper
+    return decorator
+
+
+def conditional_get(response):
+    """Add strong ETags and Cache-Control to blueprint GET responses and answer If-None-Match with 304"""
+    if request.method != "GET" or not request.blueprint:
+        return response
+
+    view = current_app.view_functions.get(request.endpoint)
+    response.headers.setdefault("Cache-Control", getattr(view, "cache_control", DEFAULT_CACHE_CONTROL))
+
+    if response.status_code != 200 or response.direct_passthrough or response.is_streamed:
+        return response
+
+    if "ETag" not in response.headers:
+        response.add_etag()
+
+    return response.make_conditional(request)
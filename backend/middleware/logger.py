@@ -1,32 +1,84 @@
 from flask import request, g
+from logging.handlers import QueueHandler, QueueListener
+from metrics import Counter, Gauge, Histogram
+import atexit
+import logging
+import os
+import queue
 import time
-from datetime import datetime
 
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "Request latency by blueprint and endpoint",
+    ["method", "blueprint", "endpoint"]
+)
+REQUEST_COUNT = Counter(
+    "http_requests_total", "Requests by blueprint, endpoint and status",
+    ["method", "blueprint", "endpoint", "status"]
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight", "Requests currently being handled",
+    ["blueprint"]
+)
 
-def logger():
-    """Logger middleware for Flask"""
+# Request lines go through a queue so the request thread never blocks on stdout
+log_queue = queue.SimpleQueue()
+request_log = logging.getLogger("homey.requests")
+request_log.setLevel(logging.INFO)
+request_log.propagate = False
+request_log.addHandler(QueueHandler(log_queue))
+
+stream_handler = logging.StreamHandler()
+stream_handler.setFormatter(logging.Formatter("[%(asctime)s] %(message)s"))
+listener_pid = None
+
+
+def start_listener():
+    """Start the queue listener thread once per process (threads don't survive a pre-fork)"""
+    global listener_pid
+    if listener_pid == os.getpid():
+        return
+
+    listener = QueueListener(log_queue, stream_handler)
+    listener.start()
+    atexit.register(listener.stop)
+    listener_pid = os.getpid()
+
+
+def labels_for_request():
+    return {
+        "method": request.method,
+        "blueprint": request.blueprint or "app",
+        "endpoint": request.endpoint or "unmatched",
+    }
+
+
+def logger(app):
+    """Logger and metrics middleware for Flask"""
     def log_request():
-        g.start_time = time.time()
-        
+        start_listener()
+        g.start_time = time.perf_counter()
+        g.metric_labels = labels_for_request()
+        REQUESTS_IN_FLIGHT.inc(blueprint=g.metric_labels["blueprint"])
+
     def log_response(response):
-        # Calculate duration
-        duration = time.time() - g.start_time if hasattr(g, 'start_time') else 0
-        duration_ms = round(duration * 1000, 2)
-        
-        # Get response message if it's JSON
-        response_message = "N/A"
-        try:
-            if response.is_json:
-                response_data = response.get_json()
-                if response_data and isinstance(response_data, dict):
-                    response_message = response_data.get("message", "N/A")
-        except:
-            pass
-        
-        # Log the request
-        timestamp = datetime.now().isoformat()
-        print(f"[{timestamp}] {request.method} {request.url} {response.status_code} {response_message} - {duration_ms}ms")
-        
+        g.status_code = response.status_code
         return response
-    
-    return log_request, log_response
\ No newline at end of file
+
+    def end_request(error=None):
+        # Runs even when the view raised, so the in-flight gauge always comes back down
+        if not hasattr(g, "start_time"):
+            return
+
+        duration = time.perf_counter() - g.start_time
+        labels = g.metric_labels
+        status = getattr(g, "status_code", 500)
+
+        REQUESTS_IN_FLIGHT.dec(blueprint=labels["blueprint"])
+        REQUEST_LATENCY.observe(duration, **labels)
+        REQUEST_COUNT.inc(status=status, **labels)
+
+        request_log.info("%s %s %s - %.2fms", request.method, request.url, status, duration * 1000)
+
+    app.before_request(log_request)
+    app.after_request(log_response)
+    app.teardown_request(end_request)
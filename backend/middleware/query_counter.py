@@ -0,0 +1,75 @@
+from flask import g, request, has_request_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from metrics import Counter, Histogram
+import logging
+import os
+import time
+
+# Repeats of one statement shape in a request before it is reported as an N+1
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD") or 5)
+DEBUG_HEADERS = os.getenv("QUERY_DEBUG_HEADERS", os.getenv("DEVELOPMENT", "true")) == "true"
+
+QUERIES_PER_REQUEST = Histogram(
+    "db_queries_per_request", "SQL statements executed per request",
+    ["blueprint", "endpoint"], buckets=(1, 2, 5, 10, 20, 50, 100, 250, 500, 1000)
+)
+QUERY_TIME_PER_REQUEST = Histogram(
+    "db_query_seconds_per_request", "Time spent in SQL statements per request",
+    ["blueprint", "endpoint"]
+)
+N_PLUS_ONE_COUNT = Counter(
+    "db_n_plus_one_total", "Requests where one statement shape repeated past the N+1 threshold",
+    ["blueprint", "endpoint"]
+)
+
+log = logging.getLogger("homey.queries")
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context():
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if not has_request_context() or not conn.info.get("query_start_time"):
+        return
+
+    elapsed = time.perf_counter() - conn.info["query_start_time"].pop()
+    stats = g.get("query_stats")
+    if stats is None:
+        stats = g.query_stats = {"count": 0, "time": 0.0, "shapes": {}}
+
+    # Statements are already parameterized, so the SQL text is the statement shape
+    stats["count"] += 1
+    stats["time"] += elapsed
+    stats["shapes"][statement] = stats["shapes"].get(statement, 0) + 1
+
+
+def query_counter(app):
+    """Count SQL statements and DB time per request, and flag repeated statement shapes (N+1)"""
+    def report_queries(response):
+        stats = g.pop("query_stats", None) or {"count": 0, "time": 0.0, "shapes": {}}
+        labels = {"blueprint": request.blueprint or "app", "endpoint": request.endpoint or "unmatched"}
+
+        QUERIES_PER_REQUEST.observe(stats["count"], **labels)
+        QUERY_TIME_PER_REQUEST.observe(stats["time"], **labels)
+
+        repeated = {shape: count for shape, count in stats["shapes"].items() if count > N_PLUS_ONE_THRESHOLD}
+        if repeated:
+            N_PLUS_ONE_COUNT.inc(**labels)
+            for shape, count in repeated.items():
+                log.warning("Possible N+1 in %s %s: statement ran %d times: %s",
+                            request.method, request.endpoint, count, " ".join(shape.split()))
+
+        if DEBUG_HEADERS:
+            response.headers["X-Query-Count"] = str(stats["count"])
+            response.headers["X-Query-Time-Ms"] = f"{stats['time'] * 1000:.2f}"
+            if repeated:
+                response.headers["X-N-Plus-One"] = str(max(repeated.values()))
+
+        return response
+
+    app.after_request(report_queries)
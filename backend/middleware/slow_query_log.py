@@ -0,0 +1,194 @@
+from flask import request, has_request_context
+from sqlalchemy import event
+from logging.handlers import RotatingFileHandler
+from datetime import datetime
+import glob
+import json
+import logging
+import os
+import queue
+import threading
+import time
+
+# Opt-in: statements slower than SLOW_QUERY_MS are recorded with their EXPLAIN plan
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS") or 0)
+# Each process appends to <SLOW_QUERY_LOG_FILE>.<pid> and rotates only its own file
+SLOW_QUERY_LOG_FILE = os.getenv("SLOW_QUERY_LOG_FILE", "slow_queries.log")
+LOG_MAX_BYTES = 10 * 1024 * 1024
+LOG_BACKUPS = 5
+# Bytes of the newest logs the admin report reads, and how long a file nobody writes to is kept
+SLOW_QUERY_REPORT_BYTES = int(os.getenv("SLOW_QUERY_REPORT_BYTES") or 8 * 1024 * 1024)
+STALE_LOG_SECONDS = 7 * 24 * 3600
+EXPLAINABLE = ("select", "update", "delete")
+
+pending = queue.Queue(maxsize=1000)
+
+log = logging.getLogger("homey.slow_queries")
+
+
+def explain(engine, statement, parameters):
+    """Run EXPLAIN for a statement on its own connection, returning the plan rows"""
+    if not statement.lstrip().lower().startswith(EXPLAINABLE):
+        return None
+
+    prefix = "EXPLAIN QUERY PLAN " if engine.dialect.name == "sqlite" else "EXPLAIN "
+    try:
+        with engine.connect() as conn:
+            result = conn.exec_driver_sql(prefix + statement, parameters or ())
+            columns = list(result.keys())
+            return [dict(zip(columns, [str(value) if value is not None else None for value in row])) for row in result]
+    except Exception as err:
+        return [{"error": str(err)}]
+
+
+def loggable(parameters):
+    """Replace binary and string parameters (image blobs, emails, password hashes) with their size"""
+    def summarize(value):
+        if isinstance(value, (bytes, bytearray, memoryview)):
+            return f"<{len(value)} bytes>"
+        if isinstance(value, str):
+            return f"<{len(value)} chars>"
+        return value
+
+    if isinstance(parameters, dict):
+        return {key: summarize(value) for key, value in parameters.items()}
+    return [summarize(value) for value in parameters or ()]
+
+
+def record():
+    """Background worker: EXPLAIN each slow statement and log it"""
+    while True:
+        entry = pending.get()
+        entry["explain"] = explain(entry.pop("engine"), entry["statement"], entry["parameters"])
+        entry["parameters"] = loggable(entry["parameters"])
+        log.warning(json.dumps(entry, default=str))
+
+
+def log_files():
+    """Every process's slow query log and rotated backups, newest first"""
+    paths = glob.glob(f"{glob.escape(SLOW_QUERY_LOG_FILE)}.*")
+    return sorted(paths, key=lambda path: os.path.getmtime(path) if os.path.exists(path) else 0, reverse=True)
+
+
+def log_lines(path, max_bytes):
+    """The lines in the last max_bytes of a file and the bytes read, dropping a first line cut in half"""
+    try:
+        with open(path, "rb") as file:
+            start = max(0, file.seek(0, os.SEEK_END) - max_bytes)
+            file.seek(start)
+            data = file.read(max_bytes)
+    except FileNotFoundError:
+        return [], 0  # rotated away meanwhile
+    lines = data.splitlines()
+    return (lines[1:] if start else lines), len(data)
+
+
+def start_process_log():
+    """Log this process's slow statements to its own file, and drop files no process has written in a while"""
+    for handler in list(log.handlers):
+        log.removeHandler(handler)
+        handler.close()
+    handler = RotatingFileHandler(f"{SLOW_QUERY_LOG_FILE}.{os.getpid()}", maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUPS)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    log.addHandler(handler)
+
+    for path in log_files():
+        try:
+            if os.path.getmtime(path) < time.time() - STALE_LOG_SECONDS:
+                os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def fold(offenders, entry):
+    """Add one logged slow statement to its shape's totals"""
+    offender = offenders.setdefault(entry["statement"], {
+        "statement": entry["statement"],
+        "count": 0,
+        "totalMs": 0.0,
+        "maxMs": 0.0,
+        "lastSeen": "",
+        "endpoints": [],
+    })
+    offender["count"] += 1
+    offender["totalMs"] += entry["durationMs"]
+    offender["lastSeen"] = max(offender["lastSeen"], entry["timestamp"])
+    if entry["durationMs"] >= offender["maxMs"]:
+        offender["maxMs"] = entry["durationMs"]
+        offender["parameters"] = entry["parameters"]
+        offender["explain"] = entry["explain"]
+    if entry["endpoint"] not in offender["endpoints"]:
+        offender["endpoints"].append(entry["endpoint"])
+
+
+def top_offenders(limit=20, sort="totalMs"):
+    """Slow statement shapes ordered by total time (or maxMs / count)
+
+    Read from every process's log rather than kept in memory, so the report covers all workers,
+    not just the one serving the request; only the newest SLOW_QUERY_REPORT_BYTES are read.
+    """
+    offenders = {}
+    budget = SLOW_QUERY_REPORT_BYTES
+    for path in log_files():
+        if budget <= 0:
+            break
+        lines, read = log_lines(path, budget)
+        budget -= read
+        for line in lines:
+            try:
+                fold(offenders, json.loads(line))
+            except (ValueError, KeyError, TypeError):
+                continue  # a line cut short by a crash
+    rows = [dict(offender, avgMs=offender["totalMs"] / offender["count"]) for offender in offenders.values()]
+    return sorted(rows, key=lambda row: row.get(sort, 0), reverse=True)[:limit]
+
+
+def slow_query_log(app, engines):
+    """Record statements slower than SLOW_QUERY_MS on the given engines, if enabled"""
+    if SLOW_QUERY_MS <= 0:
+        return
+
+    log.setLevel(logging.WARNING)
+    log.propagate = False
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("slow_query_start_time", []).append(time.perf_counter())
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if not conn.info.get("slow_query_start_time"):
+            return
+
+        duration_ms = (time.perf_counter() - conn.info["slow_query_start_time"].pop()) * 1000
+        if duration_ms < SLOW_QUERY_MS or statement.lstrip().upper().startswith("EXPLAIN"):
+            return
+
+        try:
+            pending.put_nowait({
+                "engine": conn.engine,
+                "timestamp": datetime.utcnow().isoformat(),
+                "statement": statement,
+                "parameters": parameters,
+                "durationMs": round(duration_ms, 2),
+                "endpoint": f"{request.method} {request.endpoint}" if has_request_context() else None,
+            })
+        except queue.Full:
+            pass  # Never slow requests down to record slow queries
+
+    for engine in engines:
+        event.listen(engine, "before_cursor_execute", before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", after_cursor_execute)
+
+    # One worker and log file per process, started on its first request (threads don't survive a pre-fork)
+    worker_pid = None
+    worker_lock = threading.Lock()
+
+    @app.before_request
+    def start_worker():
+        nonlocal worker_pid
+        if worker_pid == os.getpid():
+            return
+        with worker_lock:
+            if worker_pid != os.getpid():
+                start_process_log()
+                threading.Thread(target=record, daemon=True, name="slow-query-log").start()
+                worker_pid = os.getpid()
@@ -0,0 +1,143 @@
+"""Build the hot lookup indexes declared on the models on a live MySQL database.
+
+Each index is added (and redundant ones dropped) with ALGORITHM=INPLACE, LOCK=NONE so reads and writes keep flowing
+while InnoDB builds it. A short lock_wait_timeout makes the ALTER give up (and retry)
+instead of queueing every other query behind its metadata lock when a long transaction
+is open on the table.
+
+Run from the backend directory:
+    python -m migrations.add_lookup_indexes [--dry-run] [--dedupe]
+"""
+from sqlalchemy import create_engine, text, UniqueConstraint
+from dotenv import load_dotenv
+from db import db
+from models import *
+import argparse
+import os
+import time
+
+INDEXES = (
+    "ix_message_conversation_id_created_at",
+    "uq_participant_conversation_id_user_id",
+    "ix_group_participant_tenant_id_group_id",
+    "ix_item_list_id",
+    "ix_reviews_review_type_reviewed_item_id",
+    "ix_inventory_group_id_quantity",
+    "ix_expenses_group_id_paid_by",
+    "ix_expenses_group_id_owed_to",
+    "ix_properties_availability_id",
+    "ix_properties_availability_price_id",
+    "ix_properties_availability_bedrooms_id",
+    "ix_properties_availability_city_type",
+)
+
+# (table, name) of indexes an earlier version of this script built that duplicate another one
+REDUNDANT_INDEXES = (
+    # InnoDB's conversation_id key already ends in the primary key id
+    ("message", "ix_message_conversation_id_id"),
+)
+
+
+def declared_indexes():
+    """(table, name, columns, unique) for every index in INDEXES, read from the model metadata"""
+    found = {}
+    for table in db.metadata.tables.values():
+        for index in table.indexes:
+            found[index.name] = (table.name, index.name, [column.name for column in index.columns], index.unique)
+        for constraint in table.constraints:
+            if isinstance(constraint, UniqueConstraint) and constraint.name:
+                found[constraint.name] = (table.name, constraint.name, [column.name for column in constraint.columns], True)
+    return [found[name] for name in INDEXES]
+
+
+def index_exists(conn, table, name):
+    return conn.execute(text(
+        "SELECT 1 FROM information_schema.statistics "
+        "WHERE table_schema = DATABASE() AND table_name = :table AND index_name = :name LIMIT 1"
+    ), {"table": table, "name": name}).first() is not None
+
+
+def find_duplicates(conn, table, columns):
+    cols = ", ".join(f"`{column}`" for column in columns)
+    return conn.execute(text(
+        f"SELECT {cols}, COUNT(*) AS copies, MIN(id) AS keep_id FROM `{table}` GROUP BY {cols} HAVING COUNT(*) > 1"
+    )).all()
+
+
+def remove_duplicates(conn, table, columns, duplicates):
+    """Keep the oldest row of each duplicate group"""
+    for row in duplicates:
+        conditions = " AND ".join(f"`{column}` = :{column}" for column in columns)
+        params = {column: row[i] for i, column in enumerate(columns)}
+        params["keep_id"] = row.keep_id
+        conn.execute(text(f"DELETE FROM `{table}` WHERE {conditions} AND id <> :keep_id"), params)
+        conn.commit()
+
+
+def add_index(conn, table, name, columns, unique, retries, dry_run):
+    cols = ", ".join(f"`{column}`" for column in columns)
+    alter(conn, f"ALTER TABLE `{table}` ADD {'UNIQUE ' if unique else ''}INDEX `{name}` ({cols}), ALGORITHM=INPLACE, LOCK=NONE",
+          retries, dry_run)
+
+
+def drop_index(conn, table, name, retries, dry_run):
+    alter(conn, f"ALTER TABLE `{table}` DROP INDEX `{name}`, ALGORITHM=INPLACE, LOCK=NONE", retries, dry_run)
+
+
+def alter(conn, statement, retries, dry_run):
+    print(statement)
+    if dry_run:
+        return
+
+    for attempt in range(1, retries + 1):
+        try:
+            start = time.perf_counter()
+            conn.execute(text(statement))
+            conn.commit()
+            print(f"  done in {time.perf_counter() - start:.1f}s")
+            return
+        except Exception as err:
+            conn.rollback()
+            # 1205: lock wait timeout, another transaction holds the table's metadata lock
+            if "1205" not in str(err) or attempt == retries:
+                raise
+            print(f"  metadata lock busy, retrying ({attempt}/{retries})")
+            time.sleep(2 ** attempt)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dry-run", action="store_true", help="print the ALTER statements without running them")
+    parser.add_argument("--dedupe", action="store_true", help="delete duplicate rows that would block a unique index")
+    parser.add_argument("--lock-wait-timeout", type=int, default=5, help="seconds to wait for the metadata lock")
+    parser.add_argument("--retries", type=int, default=5)
+    args = parser.parse_args()
+
+    load_dotenv()
+    engine = create_engine(os.getenv("DB_URL"))
+
+    with engine.connect() as conn:
+        conn.execute(text(f"SET SESSION lock_wait_timeout = {int(args.lock_wait_timeout)}"))
+
+        for table, name, columns, unique in declared_indexes():
+            if index_exists(conn, table, name):
+                print(f"{table}.{name} already exists")
+                continue
+
+            if unique:
+                duplicates = find_duplicates(conn, table, columns)
+                if duplicates and not args.dedupe:
+                    print(f"{table}.{name} skipped: {len(duplicates)} duplicate group(s), rerun with --dedupe")
+                    continue
+                if duplicates and not args.dry_run:
+                    remove_duplicates(conn, table, columns, duplicates)
+
+            add_index(conn, table, name, columns, unique, args.retries, args.dry_run)
+
+        for table, name in REDUNDANT_INDEXES:
+            if index_exists(conn, table, name):
+                drop_index(conn, table, name, args.retries, args.dry_run)
+
+
+if __name__ == "__main__":
+    main()
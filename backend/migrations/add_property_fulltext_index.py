@@ -0,0 +1,71 @@
+"""Build the FULLTEXT index behind ?q= property search on a live MySQL database.
+
+The first FULLTEXT index on an InnoDB table adds a hidden FTS_DOC_ID column, which rebuilds
+the table, so it can't run with LOCK=NONE like the lookup indexes: LOCK=SHARED keeps reads
+flowing while writes to properties wait for the build. Run it in a quiet window. A short
+lock_wait_timeout makes the ALTER give up (and retry) instead of queueing every other
+query behind its metadata lock when a long transaction is open on the table.
+
+Run from the backend directory:
+    python -m migrations.add_property_fulltext_index [--dry-run]
+"""
+from sqlalchemy import create_engine, text
+from dotenv import load_dotenv
+from migrations.add_lookup_indexes import index_exists
+from models import Property
+import argparse
+import os
+import time
+
+INDEX = "ft_properties_name_description_city"
+
+
+def declared_columns():
+    index = next(index for index in Property.__table__.indexes if index.name == INDEX)
+    return [column.name for column in index.columns]
+
+
+def add_fulltext_index(conn, retries, dry_run):
+    cols = ", ".join(f"`{column}`" for column in declared_columns())
+    statement = f"ALTER TABLE `properties` ADD FULLTEXT INDEX `{INDEX}` ({cols}), ALGORITHM=INPLACE, LOCK=SHARED"
+    print(statement)
+    if dry_run:
+        return
+
+    for attempt in range(1, retries + 1):
+        try:
+            start = time.perf_counter()
+            conn.execute(text(statement))
+            conn.commit()
+            print(f"  built in {time.perf_counter() - start:.1f}s")
+            return
+        except Exception as err:
+            conn.rollback()
+            # 1205: lock wait timeout, another transaction holds the table's metadata lock
+            if "1205" not in str(err) or attempt == retries:
+                raise
+            print(f"  metadata lock busy, retrying ({attempt}/{retries})")
+            time.sleep(2 ** attempt)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dry-run", action="store_true", help="print the ALTER statement without running it")
+    parser.add_argument("--lock-wait-timeout", type=int, default=5, help="seconds to wait for the metadata lock")
+    parser.add_argument("--retries", type=int, default=5)
+    args = parser.parse_args()
+
+    load_dotenv()
+    engine = create_engine(os.getenv("DB_URL"))
+
+    with engine.connect() as conn:
+        conn.execute(text(f"SET SESSION lock_wait_timeout = {int(args.lock_wait_timeout)}"))
+
+        if index_exists(conn, "properties", INDEX):
+            print(f"properties.{INDEX} already exists")
+            return
+        add_fulltext_index(conn, args.retries, args.dry_run)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""Move property image LONGBLOBs out of MySQL into the blob store.
+
+1. Adds <column>_hash, _size and _type to properties and property_images (online, nullable)
+   and makes the blob columns nullable.
+2. Copies blobs into the store in batches of --batch-size rows, keyed by SHA-256, then sets
+   the hash/size/type and clears the blob in the same transaction. Safe to stop and rerun:
+   rows that already have a hash are skipped, and identical images are stored once.
+3. --finalize drops the blob columns and makes the new columns NOT NULL once every row
+   has been moved (then OPTIMIZE TABLE returns the space to the OS).
+
+--prune deletes blobs that no row references any more (after deletes or image updates); images
+and their rendered variants (image_variants.hash) both count as references, and blobs written in the
+last --prune-grace seconds are kept for uploads whose rows haven't committed yet.
+
+Run from the backend directory:
+    python -m migrations.move_images_to_blob_store [--dry-run] [--batch-size 50] [--finalize] [--prune [--prune-grace 3600]]
+"""
+from sqlalchemy import create_engine, text
+from dotenv import load_dotenv
+from blob_store import get_blob_store, store_blob
+import argparse
+import os
+import time
+
+# (table, blob column, prefix of the hash/size/type columns)
+IMAGE_COLUMNS = (
+    ("properties", "exterior_image", "exterior_image"),
+    ("property_images", "image", "image"),
+)
+
+# (table, column) of every blob key still in use, including rendered image variants
+BLOB_REFERENCES = tuple((table, f"{prefix}_hash") for table, _, prefix in IMAGE_COLUMNS) + (
+    ("image_variants", "hash"),
+)
+
+
+def table_exists(conn, table):
+    return conn.execute(text(
+        "SELECT 1 FROM information_schema.tables WHERE table_schema = DATABASE() AND table_name = :table LIMIT 1"
+    ), {"table": table}).first() is not None
+
+
+def column_exists(conn, table, column):
+    return conn.execute(text(
+        "SELECT 1 FROM information_schema.columns "
+        "WHERE table_schema = DATABASE() AND table_name = :table AND column_name = :column LIMIT 1"
+    ), {"table": table, "column": column}).first() is not None
+
+
+def alter(conn, statement, retries, dry_run):
+    print(statement)
+    if dry_run:
+        return
+
+    for attempt in range(1, retries + 1):
+        try:
+            conn.execute(text(statement))
+            conn.commit()
+            return
+        except Exception as err:
+            conn.rollback()
+            # 1205: lock wait timeout, another transaction holds the table's metadata lock
+            if "1205" not in str(err) or attempt == retries:
+                raise
+            print(f"  metadata lock busy, retrying ({attempt}/{retries})")
+            time.sleep(2 ** attempt)
+
+
+def add_columns(conn, table, blob, prefix, retries, dry_run):
+    if not column_exists(conn, table, f"{prefix}_hash"):
+        alter(conn,
+              f"ALTER TABLE `{table}` ADD COLUMN `{prefix}_hash` VARCHAR(64) NULL, "
+              f"ADD COLUMN `{prefix}_size` INT NULL, ADD COLUMN `{prefix}_type` VARCHAR(100) NULL, "
+              f"ADD INDEX `ix_{table}_{prefix}_hash` (`{prefix}_hash`), ALGORITHM=INPLACE, LOCK=NONE",
+              retries, dry_run)
+    if column_exists(conn, table, blob):
+        alter(conn, f"ALTER TABLE `{table}` MODIFY `{blob}` LONGBLOB NULL, ALGORITHM=INPLACE, LOCK=NONE", retries, dry_run)
+
+
+def move_blobs(conn, table, blob, prefix, batch_size, dry_run):
+    """Copy blobs into the store batch by batch, returning (rows moved, bytes moved)"""
+    moved_filter = f"`{prefix}_hash` IS NULL AND " if column_exists(conn, table, f"{prefix}_hash") else ""
+    remaining = conn.execute(text(
+        f"SELECT COUNT(*) FROM `{table}` WHERE {moved_filter}`{blob}` IS NOT NULL"
+    )).scalar()
+    print(f"{table}.{blob}: {remaining} row(s) to move")
+    if dry_run or not remaining:
+        return 0, 0
+
+    moved = size = 0
+    last_id = 0
+    while True:
+        # Keyset on id, each batch is a short range scan on the primary key
+        rows = conn.execute(text(
+            f"SELECT id, `{blob}` AS data FROM `{table}` "
+            f"WHERE id > :last_id AND `{prefix}_hash` IS NULL AND `{blob}` IS NOT NULL ORDER BY id LIMIT :limit"
+        ), {"last_id": last_id, "limit": batch_size}).all()
+        if not rows:
+            break
+
+        for row in rows:
+            key, length, mime_type = store_blob(row.data)
+            conn.execute(text(
+                f"UPDATE `{table}` SET `{prefix}_hash` = :key, `{prefix}_size` = :size, `{prefix}_type` = :type, "
+                f"`{blob}` = NULL WHERE id = :id"
+            ), {"key": key, "size": length, "type": mime_type, "id": row.id})
+            moved += 1
+            size += length
+        conn.commit()
+
+        last_id = rows[-1].id
+        print(f"  {moved}/{remaining} row(s), {size / 1024 / 1024:.1f} MB")
+
+    return moved, size
+
+
+def finalize(conn, table, blob, prefix, retries, dry_run):
+    if not column_exists(conn, table, blob):
+        print(f"{table}.{blob} already dropped")
+        return
+    if not column_exists(conn, table, f"{prefix}_hash"):
+        print(f"{table}.{blob} not dropped: blobs have not been moved yet")
+        return
+
+    pending = conn.execute(text(f"SELECT COUNT(*) FROM `{table}` WHERE `{prefix}_hash` IS NULL")).scalar()
+    if pending:
+        print(f"{table}.{blob} not dropped: {pending} row(s) still have no hash")
+        return
+
+    alter(conn,
+          f"ALTER TABLE `{table}` DROP COLUMN `{blob}`, MODIFY `{prefix}_hash` VARCHAR(64) NOT NULL, "
+          f"MODIFY `{prefix}_size` INT NOT NULL, MODIFY `{prefix}_type` VARCHAR(100) NOT NULL, "
+          f"ALGORITHM=INPLACE, LOCK=NONE",
+          retries, dry_run)
+
+
+def prune(conn, grace, dry_run):
+    """Delete stored blobs no row points at"""
+    # An upload stores its blob before its row commits, so blobs written (or stored again) within
+    # the grace window are never candidates; references are read after the listing for the same reason
+    store = get_blob_store()
+    cutoff = time.time() - grace
+    stored = [key for key in store.keys() if (store.modified(key) or cutoff) < cutoff]
+    referenced = set()
+    for table, column in BLOB_REFERENCES:
+        if not table_exists(conn, table):
+            continue
+        referenced.update(key for (key,) in conn.execute(text(
+            f"SELECT DISTINCT `{column}` FROM `{table}` WHERE `{column}` IS NOT NULL"
+        )))
+
+    orphans = [key for key in stored if key not in referenced]
+    print(f"{len(orphans)} unreferenced blob(s) older than {grace}s")
+    if not dry_run:
+        for key in orphans:
+            store.delete(key)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dry-run", action="store_true", help="print what would change without changing it")
+    parser.add_argument("--batch-size", type=int, default=50, help="rows (and blobs held in memory) per transaction")
+    parser.add_argument("--finalize", action="store_true", help="drop the blob columns once every row is moved")
+    parser.add_argument("--prune", action="store_true", help="delete blobs no row references")
+    parser.add_argument("--prune-grace", type=int, default=3600,
+                        help="seconds a new blob is kept unreferenced, for uploads still in flight")
+    parser.add_argument("--lock-wait-timeout", type=int, default=5, help="seconds to wait for the metadata lock")
+    parser.add_argument("--retries", type=int, default=5)
+    args = parser.parse_args()
+
+    load_dotenv()
+    engine = create_engine(os.getenv("DB_URL"))
+
+    with engine.connect() as conn:
+        conn.execute(text(f"SET SESSION lock_wait_timeout = {int(args.lock_wait_timeout)}"))
+
+        for table, blob, prefix in IMAGE_COLUMNS:
+            if column_exists(conn, table, blob):
+                add_columns(conn, table, blob, prefix, args.retries, args.dry_run)
+                moved, size = move_blobs(conn, table, blob, prefix, args.batch_size, args.dry_run)
+                if moved:
+                    print(f"{table}.{blob}: moved {moved} row(s), {size / 1024 / 1024:.1f} MB")
+            if args.finalize:
+                finalize(conn, table, blob, prefix, args.retries, args.dry_run)
+
+        if args.prune:
+            prune(conn, args.prune_grace, args.dry_run)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Move read state from message.read_by JSON to per-participant read watermarks on a live MySQL database.
+
+Adds participant.last_read_message_id (ALGORITHM=INSTANT, no table copy), then walks the
+messages that have read_by data in id order and sets each participant's watermark to the
+newest message they had read in the conversation. The backfill never moves a watermark
+backwards, so it is safe to rerun, and clients marking messages read meanwhile keep working.
+read_by is left in place unless --drop-read-by is passed; the app no longer reads it.
+
+Run from the backend directory:
+    python -m migrations.move_read_by_to_watermarks [--dry-run] [--drop-read-by]
+"""
+from sqlalchemy import create_engine, text
+from dotenv import load_dotenv
+import argparse
+import json
+import os
+
+BATCH = 5000
+
+
+def column_exists(conn, table, name):
+    return conn.execute(text(
+        "SELECT 1 FROM information_schema.columns "
+        "WHERE table_schema = DATABASE() AND table_name = :table AND column_name = :name LIMIT 1"
+    ), {"table": table, "name": name}).first() is not None
+
+
+def reader_ids(read_by):
+    """User ids in a read_by value: ids, numeric strings or objects with a userId"""
+    if isinstance(read_by, str):
+        read_by = json.loads(read_by)
+    if isinstance(read_by, dict):
+        read_by = [read_by]
+    ids = set()
+    for entry in read_by or []:
+        if isinstance(entry, dict):
+            entry = entry.get("userId", entry.get("user_id", entry.get("id")))
+        if isinstance(entry, int) or (isinstance(entry, str) and entry.isdigit()):
+            ids.add(int(entry))
+    return ids
+
+
+def newest_read(conn):
+    """{(conversation id, user id): newest message id the user had read}, read in keyset batches"""
+    watermarks = {}
+    last_id = 0
+    while True:
+        rows = conn.execute(text(
+            "SELECT id, conversation_id, read_by FROM message "
+            "WHERE id > :last_id AND read_by IS NOT NULL ORDER BY id LIMIT :batch"
+        ), {"last_id": last_id, "batch": BATCH}).all()
+        if not rows:
+            return watermarks
+        for row in rows:
+            for user_id in reader_ids(row.read_by):
+                key = (row.conversation_id, user_id)
+                watermarks[key] = max(watermarks.get(key, 0), row.id)
+        last_id = rows[-1].id
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dry-run", action="store_true", help="print what would change without writing")
+    parser.add_argument("--drop-read-by", action="store_true", help="drop message.read_by after the backfill")
+    parser.add_argument("--lock-wait-timeout", type=int, default=5, help="seconds to wait for the metadata lock")
+    args = parser.parse_args()
+
+    load_dotenv()
+    engine = create_engine(os.getenv("DB_URL"))
+
+    with engine.connect() as conn:
+        conn.execute(text(f"SET SESSION lock_wait_timeout = {int(args.lock_wait_timeout)}"))
+
+        if column_exists(conn, "participant", "last_read_message_id"):
+            print("participant.last_read_message_id already exists")
+        else:
+            statement = "ALTER TABLE `participant` ADD COLUMN `last_read_message_id` INT NULL, ALGORITHM=INSTANT"
+            print(statement)
+            if not args.dry_run:
+                conn.execute(text(statement))
+                conn.commit()
+
+        if not column_exists(conn, "message", "read_by"):
+            print("message.read_by is gone, nothing to backfill")
+            return
+
+        watermarks = newest_read(conn)
+        print(f"{len(watermarks)} participant watermarks to backfill")
+        if not args.dry_run and watermarks:
+            params = [{"conversation_id": conversation_id, "user_id": user_id, "message_id": message_id}
+                      for (conversation_id, user_id), message_id in watermarks.items()]
+            for start in range(0, len(params), BATCH):
+                conn.execute(text(
+                    "UPDATE participant SET last_read_message_id = :message_id "
+                    "WHERE conversation_id = :conversation_id AND user_id = :user_id "
+                    "AND (last_read_message_id IS NULL OR last_read_message_id < :message_id)"
+                ), params[start:start + BATCH])
+                conn.commit()
+            print("  backfilled")
+
+        if args.drop_read_by:
+            statement = "ALTER TABLE `message` DROP COLUMN `read_by`, ALGORITHM=INPLACE, LOCK=NONE"
+            print(statement)
+            if not args.dry_run:
+                conn.execute(text(statement))
+                conn.commit()
+
+
+if __name__ == "__main__":
+    main()
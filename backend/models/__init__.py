@@ -15,6 +15,8 @@ from .list import List
 from .item import Item
 from .inventory import Inventory
 from .store import Store
+from .image_variant import ImageVariant
+from .chat_event import ChatEvent
 from db import db
 
 # === Set up relationships ===
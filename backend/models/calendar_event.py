@@ -27,9 +27,9 @@ class CalendarEvent(db.Model):
         return {
             "id": self.id,
             "title": self.title,
-            "eventDate": self.event_date.isoformat() if self.event_date else None,
-            "startTime": self.start_time.isoformat() if self.start_time else None,
-            "endTime": self.end_time.isoformat() if self.end_time else None,
+            "eventDate": self.event_date,
+            "startTime": self.start_time,
+            "endTime": self.end_time,
             "location": self.location,
             "description": self.description,
             "groupId": self.group_id
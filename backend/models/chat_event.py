@@ -0,0 +1,22 @@
+from db import db
+
+# Outbox of chat events (new messages, read receipts, conversation changes), written in the same
+# transaction as the change and tailed by id by the WebSocket gateway (realtime.py)
+class ChatEvent(db.Model):
+    __tablename__ = "chat_events"
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    channel = db.Column(db.String(64), nullable=False)  # "conversation:<id>" or "group:<id>"
+    type = db.Column(db.String(32), nullable=False)
+    payload = db.Column(db.Text, nullable=False)  # JSON, sent to subscribers as is
+
+    created_at = db.Column(db.DateTime, server_default=db.func.now())
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "channel": self.channel,
+            "type": self.type,
+            "payload": self.payload,
+            "createdAt": self.created_at
+        }
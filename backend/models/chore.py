@@ -27,6 +27,6 @@ class Chore(db.Model):
             "assignedTo": self.assigned_to,
             "completed": self.completed,
             "bannerImage": self.banner_image,
-            "dueDate": self.due_date.isoformat() if self.due_date else None,
+            "dueDate": self.due_date,
             "groupId": self.group_id
         }
@@ -4,6 +4,10 @@ from sqlalchemy.orm import relationship
 
 class Expense(db.Model):
     __tablename__ = 'expenses'
+    __table_args__ = (
+        db.Index("ix_expenses_group_id_paid_by", "group_id", "paid_by"),
+        db.Index("ix_expenses_group_id_owed_to", "group_id", "owed_to"),
+    )
 
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     expense_name = db.Column(db.String(255), nullable=False)
@@ -3,6 +3,9 @@ from datetime import datetime
 
 class GroupParticipant(db.Model):
     __tablename__ = 'group_participant'
+    __table_args__ = (
+        db.Index("ix_group_participant_tenant_id_group_id", "tenant_id", "group_id"),
+    )
 
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     group_id = db.Column(db.Integer, db.ForeignKey('groups.id', ondelete='CASCADE'), nullable=False)
@@ -14,5 +17,5 @@ class GroupParticipant(db.Model):
             "id": self.id,
             "groupId": self.group_id,
             "tenantId": self.tenant_id,
-            "joinedAt": self.joined_at.isoformat() if self.joined_at else None
+            "joinedAt": self.joined_at
         }
@@ -0,0 +1,33 @@
+from db import db
+
+# A resized, recompressed copy of a stored image, keyed by the original's blob hash
+class ImageVariant(db.Model):
+    __tablename__ = "image_variants"
+    __table_args__ = (
+        db.UniqueConstraint("source_hash", "variant", name="uq_image_variants_source_hash_variant"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    source_hash = db.Column(db.String(64), nullable=False)
+    variant = db.Column(db.String(20), nullable=False)
+
+    hash = db.Column(db.String(64), nullable=False)
+    size = db.Column(db.Integer, nullable=False)
+    type = db.Column(db.String(100), nullable=False)
+    width = db.Column(db.Integer, nullable=False)
+    height = db.Column(db.Integer, nullable=False)
+
+    created_at = db.Column(db.DateTime, default=db.func.now())
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "sourceHash": self.source_hash,
+            "variant": self.variant,
+            "hash": self.hash,
+            "size": self.size,
+            "type": self.type,
+            "width": self.width,
+            "height": self.height,
+            "createdAt": self.created_at
+        }
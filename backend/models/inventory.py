@@ -2,6 +2,9 @@ from db import db
 
 class Inventory(db.Model):
     __tablename__ = 'inventory'
+    __table_args__ = (
+        db.Index("ix_inventory_group_id_quantity", "group_id", "quantity"),
+    )
 
     item_id = db.Column(db.Integer, primary_key=True, autoincrement=True, nullable=False)
     item_name = db.Column(db.String(255), nullable=False)
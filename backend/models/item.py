@@ -2,6 +2,9 @@ from db import db
 
 class Item(db.Model):
     __tablename__ = 'item'
+    __table_args__ = (
+        db.Index("ix_item_list_id", "list_id"),
+    )
 
     item_id = db.Column(db.Integer, primary_key=True, autoincrement=True, nullable=False)
     list_id = db.Column(db.Integer, nullable=False)
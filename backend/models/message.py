@@ -1,14 +1,18 @@
 from db import db
-from sqlalchemy.dialects.mysql import JSON
 
 class Message(db.Model):
     __tablename__ = 'message'
+    __table_args__ = (
+        db.Index("ix_message_conversation_id_created_at", "conversation_id", "created_at"),
+        # The foreign key's index; InnoDB appends the primary key to it, so message history
+        # pages and polls seek by id within a conversation on it
+        db.Index("conversation_id", "conversation_id"),
+    )
 
     id = db.Column(db.Integer, primary_key=True, autoincrement=True, nullable=False)
     conversation_id = db.Column(db.Integer, db.ForeignKey('conversation.id'), nullable=False)
     sender_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     content = db.Column(db.Text, nullable=False)
-    read_by = db.Column(JSON, nullable=True)  # Stores list of user IDs or metadata
 
     created_at = db.Column(db.DateTime, server_default=db.func.now())
     updated_at = db.Column(db.DateTime, server_default=db.func.now(), onupdate=db.func.now())
@@ -19,7 +23,6 @@ class Message(db.Model):
             "conversationId": self.conversation_id,
             "senderId": self.sender_id,
             "content": self.content,
-            "readBy": self.read_by,
-            "createdAt": self.created_at.isoformat() if self.created_at else None,
-            "updatedAt": self.updated_at.isoformat() if self.updated_at else None
+            "createdAt": self.created_at,
+            "updatedAt": self.updated_at
         }
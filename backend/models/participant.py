@@ -3,11 +3,16 @@ from sqlalchemy import Enum
 
 class Participant(db.Model):
     __tablename__ = 'participant'
+    __table_args__ = (
+        db.UniqueConstraint("conversation_id", "user_id", name="uq_participant_conversation_id_user_id"),
+    )
 
     id = db.Column(db.Integer, primary_key=True, autoincrement=True, nullable=False)
     conversation_id = db.Column(db.Integer, db.ForeignKey('conversation.id'), nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     role = db.Column(Enum("tenant", "landlord", name="participant_role_enum"), default="tenant", nullable=False)
+    # Read watermark: the participant has read every message in the conversation up to this id
+    last_read_message_id = db.Column(db.Integer, nullable=True)
 
     created_at = db.Column(db.DateTime, server_default=db.func.now())
     updated_at = db.Column(db.DateTime, server_default=db.func.now(), onupdate=db.func.now())
@@ -18,6 +23,7 @@ class Participant(db.Model):
             "conversationId": self.conversation_id,
             "userId": self.user_id,
             "role": self.role,
-            "createdAt": self.created_at.isoformat() if self.created_at else None,
-            "updatedAt": self.updated_at.isoformat() if self.updated_at else None
+            "lastReadMessageId": self.last_read_message_id,
+            "createdAt": self.created_at,
+            "updatedAt": self.updated_at
         }
@@ -28,8 +28,8 @@ class Profile(db.Model):
     def to_dict(self):
         return {
             "id": self.id,
-            "cleaningHabits": self.cleaning_habits.value if self.cleaning_habits else "",
-            "noiseLevel": self.noise_level.value if self.noise_level else "",
+            "cleaningHabits": self.cleaning_habits or "",
+            "noiseLevel": self.noise_level or "",
             "sleepStart": self.sleep_start,
             "sleepEnd": self.sleep_end,
             "alergies": self.alergies,
@@ -1,6 +1,7 @@
 from db import db
-from sqlalchemy import Enum, ForeignKey, LargeBinary
+from sqlalchemy import Enum, ForeignKey, DDL, event
 from sqlalchemy.orm import relationship
+from blob_store import store_blob, load_blob
 from datetime import datetime
 import enum
 import base64
@@ -21,6 +22,16 @@ class PropertyType(enum.Enum):
 
 class Property(db.Model):
     __tablename__ = "properties"
+    __table_args__ = (
+        # One per tenant search sort, see SEARCH_SORTS in the property controller
+        db.Index("ix_properties_availability_id", "availability", "id"),
+        db.Index("ix_properties_availability_price_id", "availability", "price", "id"),
+        db.Index("ix_properties_availability_bedrooms_id", "availability", "bedrooms", "id"),
+        # Covers the search facets' GROUP BY (city, property type) pass, see facets.py
+        db.Index("ix_properties_availability_city_type", "availability", "city", "property_type", "price", "bedrooms"),
+        # Free-text ?q= search, see search.py
+        db.Index("ft_properties_name_description_city", "name", "property_description", "city", mysql_prefix="FULLTEXT").ddl_if(dialect="mysql"),
+    )
 
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     name = db.Column(db.String(255), nullable=False)
@@ -34,7 +45,10 @@ class Property(db.Model):
 
     landlord_id = db.Column(db.Integer, ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
 
-    exterior_image = db.Column(LargeBinary(length=2**32 - 1), nullable=False)
+    # Image bytes live in the blob store, keyed by their SHA-256
+    exterior_image_hash = db.Column(db.String(64), nullable=False, index=True)
+    exterior_image_size = db.Column(db.Integer, nullable=False)
+    exterior_image_type = db.Column(db.String(100), nullable=False)
 
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -42,7 +56,16 @@ class Property(db.Model):
     # Optional relationship if you want to backref to User
     landlord = relationship("User", back_populates="properties")
 
-    def to_dict(self):
+    @property
+    def exterior_image(self):
+        return load_blob(self.exterior_image_hash)
+
+    @exterior_image.setter
+    def exterior_image(self, data):
+        self.exterior_image_hash, self.exterior_image_size, self.exterior_image_type = store_blob(data) if data is not None else (None, None, None)
+
+    def to_dict(self, include_image=True):
+        exterior_image = self.exterior_image if include_image else None
         return {
             "id": self.id,
             "name": self.name,
@@ -51,10 +74,33 @@ class Property(db.Model):
             "propertyDescription": self.property_description,
             "bedrooms": self.bedrooms,
             "price": self.price,
-            "propertyType": self.property_type.value,
+            "propertyType": self.property_type,
             "availability": self.availability,
             "landlordId": self.landlord_id,
-            "createdAt": self.created_at.isoformat() if self.created_at else None,
-            "updatedAt": self.updated_at.isoformat() if self.updated_at else None,
-            "exteriorImage": base64.b64encode(self.exterior_image).decode('utf-8') if self.exterior_image else None
+            "createdAt": self.created_at,
+            "updatedAt": self.updated_at,
+            "exteriorImage": base64.b64encode(exterior_image).decode('utf-8') if exterior_image else None
         }
+
+
+# SQLite has no FULLTEXT index, so local databases mirror the searched columns into an FTS5 table
+# that triggers keep in sync with properties
+SQLITE_FTS_DDL = (
+    "CREATE VIRTUAL TABLE properties_fts USING fts5("
+    "name, property_description, city, content='properties', content_rowid='id')",
+    "CREATE TRIGGER properties_fts_insert AFTER INSERT ON properties BEGIN "
+    "INSERT INTO properties_fts(rowid, name, property_description, city) "
+    "VALUES (new.id, new.name, new.property_description, new.city); END",
+    "CREATE TRIGGER properties_fts_delete AFTER DELETE ON properties BEGIN "
+    "INSERT INTO properties_fts(properties_fts, rowid, name, property_description, city) "
+    "VALUES ('delete', old.id, old.name, old.property_description, old.city); END",
+    "CREATE TRIGGER properties_fts_update AFTER UPDATE OF name, property_description, city ON properties BEGIN "
+    "INSERT INTO properties_fts(properties_fts, rowid, name, property_description, city) "
+    "VALUES ('delete', old.id, old.name, old.property_description, old.city); "
+    "INSERT INTO properties_fts(rowid, name, property_description, city) "
+    "VALUES (new.id, new.name, new.property_description, new.city); END",
+)
+
+for statement in SQLITE_FTS_DDL:
+    event.listen(Property.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+event.listen(Property.__table__, "before_drop", DDL("DROP TABLE IF EXISTS properties_fts").execute_if(dialect="sqlite"))
@@ -1,6 +1,7 @@
 from db import db
-from sqlalchemy import ForeignKey, LargeBinary
+from sqlalchemy import ForeignKey
 from sqlalchemy.orm import relationship
+from blob_store import store_blob, load_blob
 from datetime import datetime
 import base64
 
@@ -11,22 +12,34 @@ class PropertyImage(db.Model):
     property_id = db.Column(db.Integer, ForeignKey('properties.id', ondelete='CASCADE'), nullable=False)
 
     label = db.Column(db.String(255), nullable=False)
-    image = db.Column(LargeBinary(length=2**32 - 1), nullable=False)
+    image_hash = db.Column(db.String(64), nullable=False, index=True)
+    image_size = db.Column(db.Integer, nullable=False)
+    image_type = db.Column(db.String(100), nullable=False)
     description = db.Column(db.Text, nullable=True)
 
     created_at = db.Column(db.DateTime, default=db.func.now())
     updated_at = db.Column(db.DateTime, default=db.func.now(), onupdate=db.func.now())
 
+    # Defined before the relationship below, which shadows the property builtin in this class body
+    @property
+    def image(self):
+        return load_blob(self.image_hash)
+
+    @image.setter
+    def image(self, data):
+        self.image_hash, self.image_size, self.image_type = store_blob(data) if data is not None else (None, None, None)
+
     # Optional relationship (one image belongs to one property)
     property = relationship("Property", back_populates="images")
 
-    def to_dict(self):
+    def to_dict(self, include_image=True):
+        image = self.image if include_image else None
         return {
             "id": self.id,
             "propertyId": self.property_id,
             "label": self.label,
-            "image": base64.b64encode(self.image).decode("utf-8") if self.image else None,
+            "image": base64.b64encode(image).decode("utf-8") if image else None,
             "description": self.description,
-            "createdAt": self.created_at.isoformat() if self.created_at else None,
-            "updatedAt": self.updated_at.isoformat() if self.updated_at else None
+            "createdAt": self.created_at,
+            "updatedAt": self.updated_at
         }
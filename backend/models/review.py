@@ -9,6 +9,9 @@ class ReviewType(enum.Enum):
 
 class Review(db.Model):
     __tablename__ = "reviews"
+    __table_args__ = (
+        db.Index("ix_reviews_review_type_reviewed_item_id", "review_type", "reviewed_item_id"),
+    )
 
     review_id = db.Column(db.Integer, primary_key=True, autoincrement=True, nullable=False)
     review_type = db.Column(Enum(ReviewType), nullable=False)
@@ -20,7 +23,7 @@ class Review(db.Model):
     def to_dict(self):
         return {
             "reviewId": self.review_id,
-            "reviewType": self.review_type.value,
+            "reviewType": self.review_type,
             "reviewedItemId": self.reviewed_item_id,
             "reviewerId": self.reviewer_id,
             "score": self.score,
@@ -31,10 +31,10 @@ class User(db.Model):
             "lastName": self.lastName,
             "username": self.username,
             "email": self.email,
-            "role": self.role.value,
+            "role": self.role,
             "verified": self.verified,
-            "createdAt": self.createdAt.isoformat() if self.createdAt else None,
-            "updatedAt": self.updatedAt.isoformat() if self.updatedAt else None
+            "createdAt": self.createdAt,
+            "updatedAt": self.updatedAt
         }
     
     def to_safe_dict(self):
@@ -44,6 +44,6 @@ class User(db.Model):
             "lastName": self.lastName,
             "username": self.username,
             "email": self.email,
-            "role": self.role.value,
+            "role": self.role,
             "verified": self.verified
         }
@@ -0,0 +1,68 @@
+from sqlalchemy import and_, or_
+import base64
+import json
+import os
+
+# Keyset (cursor) pagination: a page ends with the sort key of its last row, and the next page
+# starts strictly after it, so every page is an index range scan however deep the client goes.
+DEFAULT_PAGE_SIZE = int(os.getenv("DEFAULT_PAGE_SIZE") or 20)
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE") or 100)
+
+
+class InvalidPage(ValueError):
+    """A limit or cursor the client sent that can't be used"""
+
+
+def page_limit(args, default=None):
+    """?limit= as a page size, capped at MAX_PAGE_SIZE"""
+    limit = args.get("limit")
+    if limit is None or limit == "":
+        return default or DEFAULT_PAGE_SIZE
+    if not str(limit).isdigit() or int(limit) < 1:
+        raise InvalidPage("limit must be a positive number")
+    return min(int(limit), MAX_PAGE_SIZE)
+
+
+def encode_cursor(values):
+    """Opaque cursor for a list of JSON values (the sort name and the last row's keys)"""
+    payload = json.dumps(values, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(payload).rstrip(b"=").decode("ascii")
+
+
+def decode_cursor(cursor):
+    try:
+        payload = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(payload)
+    except (ValueError, TypeError):
+        raise InvalidPage("cursor is not valid")
+    if not isinstance(values, list):
+        raise InvalidPage("cursor is not valid")
+    return values
+
+
+def after_keys(keys, values):
+    """Filter for rows after values in the order of keys, a list of (column, descending)
+
+    (a, b) after (x, y) is written a >= x AND (a > x OR (a = x AND b > y)) rather than as a row
+    comparison, which MySQL won't use a range for. MySQL turns it into an exact range on an index
+    on (a, b); databases that only seek on a (SQLite) still start at the cursor's value of a.
+    """
+    clauses = []
+    for i, ((column, descending), value) in enumerate(zip(keys, values)):
+        equal = [keys[j][0] == values[j] for j in range(i)]
+        clauses.append(and_(*equal, column < value if descending else column > value))
+
+    (first, descending), start = keys[0], values[0]
+    return and_(first <= start if descending else first >= start, or_(*clauses))
+
+
+def order_by_keys(keys):
+    return [column.desc() if descending else column.asc() for column, descending in keys]
+
+
+def page_of(rows, limit, cursor_for):
+    """Split limit + 1 fetched rows into (page, next cursor or None)"""
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, cursor_for(rows[-1])
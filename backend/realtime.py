@@ -0,0 +1,547 @@
+from flask import current_app
+from sqlalchemy import event, select, delete, func, and_, or_
+from sqlalchemy.exc import SQLAlchemyError
+from models import ChatEvent, Participant, Group, GroupParticipant
+from middleware.authenticate_user import verify_token
+from metrics import Counter, Gauge
+from db import RoutingSession
+from contextlib import contextmanager
+import db as database
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+
+# Real-time chat: writes that change a conversation publish a ChatEvent in their own transaction
+# (an outbox), and the WebSocket gateway in the ASGI app tails the table by id and pushes each
+# event to the sockets subscribed to its channel. Commits in the same process wake the gateway
+# at once; commits from other processes (gunicorn workers, other pods) are picked up within
+# GATEWAY_POLL_SECONDS. One tail query per tick serves every open socket, and none runs
+# while no socket is open.
+GATEWAY_POLL_SECONDS = float(os.getenv("GATEWAY_POLL_SECONDS") or 1)
+GATEWAY_BATCH_SIZE = int(os.getenv("GATEWAY_BATCH_SIZE") or 500)
+
+# Frames buffered per socket, a client that falls this far behind is disconnected and resumes with "since"
+GATEWAY_QUEUE_SIZE = int(os.getenv("GATEWAY_QUEUE_SIZE") or 256)
+
+# Events kept for clients resuming after a reconnect, pruned every PRUNE_EVERY events
+CHAT_EVENT_RETENTION = int(os.getenv("CHAT_EVENT_RETENTION") or 10000)
+PRUNE_EVERY = 100
+
+# An id the tail skipped may belong to a transaction that hasn't committed yet, look for it this long
+GAP_SECONDS = 10
+MAX_GAPS = 1000
+
+# Threads a WSGI worker lets sit in a long poll, past this the long poll answers at once like a normal poll
+LONG_POLL_MAX_THREADS = int(os.getenv("LONG_POLL_MAX_THREADS") or 2)
+
+# Close codes: 4401 once the token expires, 4008 for a client too slow to keep up
+# (a bad Authorization header closes before accepting, which rejects the handshake with HTTP 403;
+# a bad or late auth message closes with 4000 + the REST status, e.g. 4401)
+CLOSE_TOO_SLOW = 4008
+
+# Seconds a socket without an Authorization header (browsers can't set one) has to send its auth message
+AUTH_TIMEOUT_SECONDS = 10
+
+CHAT_SOCKETS = Gauge("chat_gateway_sockets", "Open chat WebSocket connections")
+CHAT_FRAMES = Counter("chat_gateway_frames_total", "Event frames pushed to chat sockets", ["event"])
+
+# Callbacks run after a commit in this process that published chat events
+local_listeners = []
+
+
+def conversation_channel(conversation_id):
+    return f"conversation:{conversation_id}"
+
+
+def group_channel(group_id):
+    return f"group:{group_id}"
+
+
+def publish(session, channel, event_type, payload):
+    """Add a chat event to the session's transaction, subscribers get it once the transaction commits"""
+    chat_event = ChatEvent(channel=channel, type=event_type, payload=current_app.json.dumps(payload))
+    session.add(chat_event)
+    session.flush()
+    session.info["chat_events"] = True
+
+    if chat_event.id % PRUNE_EVERY == 0:
+        session.execute(delete(ChatEvent).where(ChatEvent.id <= chat_event.id - CHAT_EVENT_RETENTION))
+    return chat_event
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def wake_listeners(session):
+    if session.info.pop("chat_events", False):
+        for listener in list(local_listeners):
+            listener()
+
+
+@event.listens_for(RoutingSession, "after_rollback")
+def forget_events(session):
+    session.info.pop("chat_events", None)
+
+
+class Watch:
+    """One long poll's interest in a conversation, fired at most once from any thread"""
+
+    def __init__(self, loop=None):
+        self.event = threading.Event()
+        self.loop = loop
+        self.future = loop.create_future() if loop is not None else None
+
+    def fire(self):
+        self.event.set()
+        if self.future is not None:
+            try:
+                self.loop.call_soon_threadsafe(self.resolve)
+            except RuntimeError:
+                pass  # the event loop has shut down
+
+    def resolve(self):
+        if not self.future.done():
+            self.future.set_result(True)
+
+    def wait(self, timeout):
+        """Block the calling thread until fired, returning False on timeout"""
+        return self.event.wait(timeout)
+
+    async def wait_async(self, timeout):
+        """Wait on the event loop until fired, returning False on timeout"""
+        try:
+            return await asyncio.wait_for(asyncio.shield(self.future), timeout)
+        except asyncio.TimeoutError:
+            return False
+
+
+class OutboxCursor:
+    """Position of a reader tailing the chat event outbox by id
+
+    Ids are handed out at insert but become visible at commit, so a later transaction can commit
+    first; the ids skipped that way are remembered for GAP_SECONDS and read again until they show up.
+    """
+
+    def __init__(self, last_id=None):
+        self.last_id = last_id
+        self.gaps = {}
+
+    def reset(self):
+        self.last_id = None
+        self.gaps.clear()
+
+    def condition(self):
+        """Where clause for the events this reader hasn't seen yet"""
+        condition = ChatEvent.id > self.last_id
+        if self.gaps:
+            condition = or_(condition, ChatEvent.id.in_(list(self.gaps)))
+        return condition
+
+    def advance(self, rows):
+        """Move past rows read with condition() (in id order), then forget gaps that never showed up"""
+        now = time.monotonic()
+        for row in rows:
+            if row.id in self.gaps:
+                del self.gaps[row.id]
+            elif row.id > self.last_id:
+                for missing in range(self.last_id + 1, min(row.id, self.last_id + 1 + MAX_GAPS)):
+                    self.gaps[missing] = now + GAP_SECONDS
+                self.last_id = row.id
+
+        for missing, deadline in list(self.gaps.items()):
+            if deadline < now:
+                del self.gaps[missing]
+        while len(self.gaps) > MAX_GAPS:
+            del self.gaps[min(self.gaps)]
+
+
+class MessageNotifier:
+    """Wakes long polls waiting for new messages in a conversation
+
+    send_message notifies after its commit, so a waiter in the same process wakes without a
+    query. Messages committed by other processes reach the waiters through one shared read of
+    the chat event outbox per GATEWAY_POLL_SECONDS: the gateway's tail under the ASGI server,
+    a background thread under the threaded one. Either runs only while someone is waiting.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.watches = {}
+        self.thread_slots = threading.BoundedSemaphore(LONG_POLL_MAX_THREADS)
+        self.following = False
+
+    @contextmanager
+    def watching(self, conversation_id, loop=None):
+        """Register interest before reading the conversation, so a message committed after the read still wakes the wait"""
+        watch = Watch(loop)
+        with self.lock:
+            self.watches.setdefault(conversation_id, set()).add(watch)
+        try:
+            yield watch
+        finally:
+            with self.lock:
+                watches = self.watches.get(conversation_id)
+                if watches is not None:
+                    watches.discard(watch)
+                    if not watches:
+                        del self.watches[conversation_id]
+
+    def notify(self, conversation_id):
+        with self.lock:
+            watches = self.watches.pop(conversation_id, ())
+        for watch in watches:
+            watch.fire()
+
+    def hold_thread(self):
+        """Take one of the worker's long poll thread slots, False when they're all taken"""
+        return self.thread_slots.acquire(blocking=False)
+
+    def release_thread(self):
+        self.thread_slots.release()
+
+    def follow(self, engine):
+        """Start the thread that notifies for messages committed by other processes, unless it's running"""
+        with self.lock:
+            if self.following:
+                return
+            self.following = True
+        try:
+            # Read the starting point before the caller's own read, so nothing falls in between
+            with engine.connect() as conn:
+                last_id = conn.scalar(select(func.coalesce(func.max(ChatEvent.id), 0)))
+        except SQLAlchemyError as err:
+            logging.warning(f"Message notifier failed to read events: {err}")
+            with self.lock:
+                self.following = False
+            return
+        threading.Thread(target=self.tail, args=(engine, OutboxCursor(last_id)), name="message-notifier", daemon=True).start()
+
+    def tail(self, engine, cursor):
+        while True:
+            time.sleep(GATEWAY_POLL_SECONDS)
+            with self.lock:
+                if not self.watches:
+                    self.following = False
+                    return
+            try:
+                with engine.connect() as conn:
+                    # Every event type, so only ids that aren't committed yet are left as gaps
+                    rows = conn.execute(
+                        select(ChatEvent.id, ChatEvent.channel, ChatEvent.type)
+                        .where(cursor.condition()).order_by(ChatEvent.id).limit(GATEWAY_BATCH_SIZE)
+                    ).all()
+            except SQLAlchemyError as err:
+                logging.warning(f"Message notifier failed to read events: {err}")
+                continue
+            cursor.advance(rows)
+            for row in rows:
+                if row.type == "message.created":
+                    self.notify(channel_conversation_id(row.channel))
+
+
+notifier = MessageNotifier()
+
+
+def channel_conversation_id(channel):
+    return int(channel.partition(":")[2])
+
+
+def event_frame(event_id, channel, event_type, payload):
+    """The JSON text sent for an event, embedding the stored payload without decoding it"""
+    return f'{{"type":"event","id":{event_id},"channel":"{channel}","event":"{event_type}","data":{payload}}}'
+
+
+class Subscriber:
+    """One open socket: its user, channels and queue of outgoing frames"""
+
+    def __init__(self, user, send):
+        self.user = user
+        self.send = send
+        self.channels = set()
+        self.queue = asyncio.Queue(GATEWAY_QUEUE_SIZE)
+
+    def push(self, frame):
+        try:
+            self.queue.put_nowait(frame)
+        except asyncio.QueueFull:
+            # Drop the backlog and close, the client reconnects and replays what it missed
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(None)
+
+    def push_json(self, body):
+        self.push(json.dumps(body))
+
+    async def write(self):
+        """Send queued frames until the queue says close or the token expires"""
+        expires = self.user.get("exp")
+        try:
+            while True:
+                timeout = expires - time.time() if expires else None
+                try:
+                    frame = await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    await self.send({"type": "websocket.close", "code": 4401})
+                    return
+                if frame is None:
+                    await self.send({"type": "websocket.close", "code": CLOSE_TOO_SLOW})
+                    return
+                await self.send({"type": "websocket.send", "text": frame})
+        except (OSError, RuntimeError):
+            return  # the client went away, the reader sees the disconnect
+
+
+class ChatGateway:
+    """Fans chat events out from the outbox table to the sockets open in this process"""
+
+    def __init__(self):
+        self.channels = {}
+        self.cursor = OutboxCursor()
+        self.loop = None
+        self.wakeup = None
+        self.task = None
+
+    def start(self):
+        self.loop = asyncio.get_running_loop()
+        self.wakeup = asyncio.Event()
+        local_listeners.append(self.wake)
+        self.task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self.wake in local_listeners:
+            local_listeners.remove(self.wake)
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+
+    def wake(self):
+        # Runs on whichever thread committed, e.g. a Flask view behind the WSGI bridge
+        try:
+            self.loop.call_soon_threadsafe(self.wakeup.set)
+        except RuntimeError:
+            pass  # the event loop has shut down
+
+    def subscribe(self, subscriber, channels):
+        for channel in channels:
+            self.channels.setdefault(channel, set()).add(subscriber)
+            subscriber.channels.add(channel)
+
+    def unsubscribe(self, subscriber, channels=None):
+        for channel in list(subscriber.channels if channels is None else channels):
+            subscribers = self.channels.get(channel)
+            if subscribers is not None:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self.channels[channel]
+            subscriber.channels.discard(channel)
+
+    async def ensure_cursor(self, session):
+        """Start tailing from the newest event when the first socket subscribes"""
+        if self.cursor.last_id is None:
+            last_id = await session.scalar(select(func.coalesce(func.max(ChatEvent.id), 0)))
+            if self.cursor.last_id is None:
+                self.cursor.last_id = last_id
+
+    async def run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), GATEWAY_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            self.wakeup.clear()
+
+            if not self.channels and not notifier.watches:
+                # Nobody to deliver to, the next subscriber starts from the newest event
+                self.cursor.reset()
+                continue
+            try:
+                while await self.deliver_new():
+                    pass
+            except SQLAlchemyError as err:
+                logging.warning(f"Chat gateway failed to read events: {err}")
+
+    async def deliver_new(self):
+        """Push events committed since the last tick, returning whether a full batch was read"""
+        async with database.AsyncSession() as session:
+            await self.ensure_cursor(session)
+            rows = (await session.execute(
+                select(ChatEvent.id, ChatEvent.channel, ChatEvent.type, ChatEvent.payload)
+                .where(self.cursor.condition()).order_by(ChatEvent.id).limit(GATEWAY_BATCH_SIZE)
+            )).all()
+
+        self.cursor.advance(rows)
+        for row in rows:
+            self.dispatch(row.id, row.channel, row.type, row.payload)
+        return len(rows) == GATEWAY_BATCH_SIZE
+
+    def dispatch(self, event_id, channel, event_type, payload):
+        if event_type == "message.created":
+            notifier.notify(channel_conversation_id(channel))
+
+        subscribers = self.channels.get(channel)
+        if not subscribers:
+            return
+        frame = event_frame(event_id, channel, event_type, payload)
+        for subscriber in list(subscribers):
+            subscriber.push(frame)
+        CHAT_FRAMES.inc(len(subscribers), event=event_type)
+
+        if event_type == "participant.removed":
+            # The removed user stops receiving the conversation on every socket they have open
+            user_id = json.loads(payload).get("userId")
+            for subscriber in list(subscribers):
+                if str(subscriber.user.get("userId")) == str(user_id):
+                    self.unsubscribe(subscriber, [channel])
+
+    async def allowed_channels(self, session, user, conversation_ids, group_ids):
+        """The requested channels the user may follow: conversations they take part in, groups they belong to"""
+        user_id = user.get("userId")
+        if user.get("role") == "admin":
+            conversations, groups = conversation_ids, group_ids
+        else:
+            conversations = []
+            if conversation_ids:
+                conversations = (await session.scalars(select(Participant.conversation_id).where(
+                    Participant.user_id == user_id, Participant.conversation_id.in_(conversation_ids)
+                ))).all()
+            groups = []
+            if group_ids:
+                member_of = select(GroupParticipant.group_id).where(GroupParticipant.tenant_id == user_id)
+                groups = (await session.scalars(select(Group.id).where(
+                    Group.id.in_(group_ids), or_(Group.landlord_id == user_id, Group.id.in_(member_of))
+                ))).all()
+        return sorted(set(conversations)), sorted(set(groups))
+
+    async def replay(self, session, subscriber, channels, since, cursor, pending):
+        """Queue the events on channels after id since, or ask the client to refetch if they were pruned
+
+        Stops at the tail's cursor when the socket subscribed and skips the ids the tail was still
+        waiting on then (pending), since the live tail delivers those to the new subscription itself.
+        """
+        oldest = await session.scalar(select(func.min(ChatEvent.id)))
+        condition = and_(ChatEvent.id > since, ChatEvent.id <= cursor, ChatEvent.channel.in_(channels))
+        if pending:
+            condition = and_(condition, ChatEvent.id.notin_(pending))
+        rows = (await session.execute(
+            select(ChatEvent.id, ChatEvent.channel, ChatEvent.type, ChatEvent.payload)
+            .where(condition).order_by(ChatEvent.id).limit(GATEWAY_BATCH_SIZE + 1)
+        )).all()
+        if (oldest is not None and oldest > since + 1) or len(rows) > GATEWAY_BATCH_SIZE:
+            subscriber.push_json({"type": "resync"})
+            return
+        for row in rows:
+            subscriber.push(event_frame(row.id, row.channel, row.type, row.payload))
+
+    async def handle(self, subscriber, text):
+        """Act on one client message: subscribe, unsubscribe or ping"""
+        try:
+            message = json.loads(text)
+            message_type = message.get("type")
+            conversation_ids = [int(value) for value in message.get("conversations") or []]
+            group_ids = [int(value) for value in message.get("groups") or []]
+            since = message.get("since")
+            since = int(since) if since is not None else None
+        except (ValueError, TypeError, AttributeError):
+            subscriber.push_json({"type": "error", "message": "Invalid message"})
+            return
+
+        if message_type == "ping":
+            subscriber.push_json({"type": "pong"})
+        elif message_type == "unsubscribe":
+            self.unsubscribe(subscriber, [conversation_channel(conversation_id) for conversation_id in conversation_ids]
+                             + [group_channel(group_id) for group_id in group_ids])
+            subscriber.push_json({"type": "unsubscribed", "conversations": conversation_ids, "groups": group_ids})
+        elif message_type == "subscribe":
+            try:
+                async with database.AsyncSession() as session:
+                    conversations, groups = await self.allowed_channels(session, subscriber.user, conversation_ids, group_ids)
+                    channels = [conversation_channel(conversation_id) for conversation_id in conversations] \
+                        + [group_channel(group_id) for group_id in groups]
+                    self.subscribe(subscriber, channels)
+                    await self.ensure_cursor(session)
+                    cursor = self.cursor.last_id
+                    pending = list(self.cursor.gaps)
+                    subscriber.push_json({
+                        "type": "subscribed",
+                        "conversations": conversations,
+                        "groups": groups,
+                        "denied": {
+                            "conversations": sorted(set(conversation_ids) - set(conversations)),
+                            "groups": sorted(set(group_ids) - set(groups)),
+                        },
+                        "cursor": cursor,
+                    })
+                    if since is not None and channels:
+                        await self.replay(session, subscriber, channels, since, cursor, pending)
+            except SQLAlchemyError as err:
+                subscriber.push_json({"type": "error", "message": "Failed to subscribe", "errors": [str(err)]})
+        else:
+            subscriber.push_json({"type": "error", "message": f"Unknown message type {message_type}"})
+
+
+gateway = ChatGateway()
+
+
+async def authenticate_socket(receive, send):
+    """Read the {"type": "auth", "token": ...} message a socket without an Authorization header sends first"""
+    try:
+        message = await asyncio.wait_for(receive(), AUTH_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        await send({"type": "websocket.close", "code": 4401})
+        return None
+    if message["type"] == "websocket.disconnect":
+        return None
+
+    try:
+        token = json.loads(message.get("text") or (message.get("bytes") or b"").decode("utf-8")).get("token")
+    except (ValueError, AttributeError):
+        token = None
+    user, error, status = verify_token(f"Bearer {token}" if isinstance(token, str) else "", ["tenant", "landlord"])
+    if error:
+        await send({"type": "websocket.close", "code": 4000 + status})
+        return None
+    return user
+
+
+async def chat_socket(scope, receive, send):
+    """ASGI WebSocket endpoint, authenticated with the same bearer token as the REST API
+
+    Native clients send it in the Authorization header, browsers in an auth message right after
+    connecting. Never in the URL, which servers and proxies write to their access logs.
+    """
+    message = await receive()
+    if message["type"] != "websocket.connect":
+        return
+
+    headers = dict(scope["headers"])
+    auth_header = headers.get(b"authorization", b"").decode("latin-1")
+    if auth_header:
+        user, error, status = verify_token(auth_header, ["tenant", "landlord"])
+        if error:
+            await send({"type": "websocket.close", "code": 4000 + status})
+            return
+        await send({"type": "websocket.accept"})
+    else:
+        await send({"type": "websocket.accept"})
+        user = await authenticate_socket(receive, send)
+        if user is None:
+            return
+        await send({"type": "websocket.send", "text": json.dumps({"type": "authenticated"})})
+
+    subscriber = Subscriber(user, send)
+    writer = asyncio.create_task(subscriber.write())
+    CHAT_SOCKETS.inc()
+    try:
+        while True:
+            message = await receive()
+            if message["type"] == "websocket.disconnect":
+                return
+            await gateway.handle(subscriber, message.get("text") or (message.get("bytes") or b"").decode("utf-8"))
+    finally:
+        CHAT_SOCKETS.dec()
+        gateway.unsubscribe(subscriber)
+        writer.cancel()
@@ -0,0 +1,11 @@
+from flask import Blueprint
+from controllers.admin_controller import (
+    get_slow_queries
+)
+from middleware.authenticate_user import authenticate_user
+from middleware.conditional import cache_policy
+
+admin_routes = Blueprint("admin_routes", __name__)
+
+# GET /api/admin/slow-queries
+admin_routes.route("/slow-queries", methods=["GET"])(authenticate_user(["admin"])(cache_policy("no-store")(get_slow_queries)))
@@ -5,14 +5,21 @@ from controllers.conversation_controller import (
     create_dm,
     create_group_chat,
     add_participant,
-    remove_participant
+    remove_participant,
+    conversations_version,
+    get_inbox,
+    inbox_version
 )
 from middleware.authenticate_user import authenticate_user
+from middleware.conditional import cache_policy
 
 conversation_routes = Blueprint("conversation_routes", __name__)
 
+# GET /api/conversations/inbox?groupId=
+conversation_routes.route("/inbox", methods=["GET"])(authenticate_user(["tenant", "landlord"])(cache_policy("private, no-cache", version=inbox_version)(get_inbox)))
+
 # GET /api/conversations/<groupId>
-conversation_routes.route("/<int:group_id>", methods=["GET"])(authenticate_user(["tenant", "landlord"])(get_conversations))
+conversation_routes.route("/<int:group_id>", methods=["GET"])(authenticate_user(["tenant", "landlord"])(cache_policy("private, no-cache", version=conversations_version)(get_conversations)))
 
 # GET /api/conversations/<conversationId>
 conversation_routes.route("/<int:conversation_id>", methods=["GET"])(authenticate_user(["tenant", "landlord"])(get_conversation_by_id))
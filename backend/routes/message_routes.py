@@ -2,9 +2,13 @@ from flask import Blueprint
 from controllers.message_controller import (
     send_message,
     get_messages,
-    mark_message_as_read
+    mark_message_as_read,
+    messages_version,
+    wait_for_messages
 )
 from middleware.authenticate_user import authenticate_user
+from middleware.conditional import cache_policy
+from db import use_primary
 
 message_routes = Blueprint("message_routes", __name__)
 
@@ -12,7 +16,11 @@ message_routes = Blueprint("message_routes", __name__)
 message_routes.route("/send", methods=["POST"])(authenticate_user(["tenant", "landlord"])(send_message))
 
 # GET /api/messages/conversation/<conversationId>
-message_routes.route("/conversation/<int:conversation_id>", methods=["GET"])(authenticate_user(["tenant", "landlord"])(get_messages))
+message_routes.route("/conversation/<int:conversation_id>", methods=["GET"])(authenticate_user(["tenant", "landlord"])(cache_policy("private, no-cache", version=messages_version)(get_messages)))
+
+# GET /api/messages/conversation/<conversationId>/wait?after=<messageId>
+# Long poll, read from the primary so a message that woke it is visible
+message_routes.route("/conversation/<int:conversation_id>/wait", methods=["GET"])(authenticate_user(["tenant", "landlord"])(cache_policy("no-store")(use_primary(wait_for_messages))))
 
 # PATCH /api/messages/read
 message_routes.route("/read", methods=["PATCH"])(authenticate_user(["tenant", "landlord"])(mark_message_as_read)) 
\ No newline at end of file
@@ -3,6 +3,7 @@ from controllers.property_controller import (
     get_properties,
     get_property_by_id,
     get_properties_for_tenants,
+    get_search_facets,
     create_property,
     update_property,
     delete_property
@@ -11,9 +12,12 @@ from controllers.property_image_controller import (
     upload_property_image,
     update_property_image,
     delete_property_image,
-    get_property_images
+    get_property_images,
+    get_property_image_raw,
+    get_exterior_image_raw
 )
 from middleware.authenticate_user import authenticate_user
+from middleware.conditional import cache_policy
 
 property_routes = Blueprint("property_routes", __name__)
 
@@ -21,7 +25,10 @@ property_routes = Blueprint("property_routes", __name__)
 property_routes.route("/", methods=["GET"])(authenticate_user(["landlord"])(get_properties))
 
 # GET /api/properties/search
-property_routes.route("/search", methods=["GET"])(authenticate_user(["tenant", "landlord"])(get_properties_for_tenants))
+property_routes.route("/search", methods=["GET"])(authenticate_user(["tenant", "landlord"])(cache_policy("private, max-age=30")(get_properties_for_tenants)))
+
+# GET /api/properties/search/facets
+property_routes.route("/search/facets", methods=["GET"])(authenticate_user(["tenant", "landlord"])(cache_policy("private, max-age=30")(get_search_facets)))
 
 # GET /api/properties/<id>
 property_routes.route("/<int:id>", methods=["GET"])(authenticate_user(["landlord"])(get_property_by_id))
@@ -36,7 +43,13 @@ property_routes.route("/<int:id>", methods=["PUT"])(authenticate_user(["landlord
 property_routes.route("/<int:id>", methods=["DELETE"])(authenticate_user(["landlord"])(delete_property))
 
 # GET /api/properties/<id>/images
-property_routes.route("/<int:id>/images", methods=["GET"])(authenticate_user(["tenant", "landlord"])(get_property_images))
+property_routes.route("/<int:id>/images", methods=["GET"])(authenticate_user(["tenant", "landlord"])(cache_policy("private, max-age=300")(get_property_images)))
+
+# GET /api/properties/<id>/images/<imageId>/raw
+property_routes.route("/<int:id>/images/<int:image_id>/raw", methods=["GET"])(authenticate_user(["tenant", "landlord"])(get_property_image_raw))
+
+# GET /api/properties/<id>/exterior-image/raw
+property_routes.route("/<int:id>/exterior-image/raw", methods=["GET"])(authenticate_user(["tenant", "landlord"])(get_exterior_image_raw))
 
 # POST /api/properties/<id>/images
 property_routes.route("/<int:id>/images", methods=["POST"])(authenticate_user(["landlord"])(upload_property_image))
@@ -4,11 +4,12 @@ from controllers.review_controller import (
     create_review
 )
 from middleware.authenticate_user import authenticate_user
+from middleware.conditional import cache_policy
 
 review_routes = Blueprint("review_routes", __name__)
 
 # GET /api/reviews/<propertyId>
-review_routes.route("/", methods=["GET"])(authenticate_user(["tenant", "landlord"])(get_reviews))
+review_routes.route("/", methods=["GET"])(authenticate_user(["tenant", "landlord"])(cache_policy("private, max-age=60")(get_reviews)))
 
 # POST /api/reviews
 review_routes.route("/", methods=["POST"])(authenticate_user(["tenant"])(create_review)) 
\ No newline at end of file
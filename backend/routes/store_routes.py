@@ -4,11 +4,12 @@ from controllers.store_controller import (
     create_store_entry
 )
 from middleware.authenticate_user import authenticate_user
+from middleware.conditional import cache_policy
 
 store_routes = Blueprint("store_routes", __name__)
 
 # GET /api/stores/getEntries
-store_routes.route("/getEntries", methods=["GET"])(get_store_entries)
+store_routes.route("/getEntries", methods=["GET"])(cache_policy("public, max-age=300")(get_store_entries))
 
 # POST /api/stores/createEntries
 store_routes.route("/createEntries", methods=["POST"])(create_store_entry) 
\ No newline at end of file
@@ -8,6 +8,8 @@ from controllers.user_controller import (
     verify
 )
 from middleware.authenticate_user import authenticate_user
+from middleware.conditional import cache_policy
+from db import use_primary
 
 user_routes = Blueprint("user_routes", __name__)
 
@@ -21,7 +23,7 @@ user_routes.route("/user/<int:id>", methods=["GET"])(authenticate_user(["tenant"
 user_routes.route("/me", methods=["GET"])(authenticate_user(["tenant", "landlord"])(get_confidential_user_info))
 
 # GET /api/users/verify
-user_routes.route("/verify", methods=["GET"])(verify)
+user_routes.route("/verify", methods=["GET"])(cache_policy("no-store")(use_primary(verify)))
 
 # POST /api/users
 user_routes.route("/", methods=["POST"])(create_user)
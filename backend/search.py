@@ -0,0 +1,47 @@
+from sqlalchemy import select, or_, literal_column, table
+from sqlalchemy.dialects.mysql import match
+from models import Property
+import os
+import re
+
+# ?q= free-text property search over name, description and city, ranked by relevance.
+# MySQL answers it from the FULLTEXT index on those columns, SQLite from the FTS5 table that
+# mirrors them (models/property.py). Either way the work follows the number of matching
+# listings, not the size of the table.
+MAX_SEARCH_TERMS = int(os.getenv("MAX_SEARCH_TERMS") or 10)
+
+WORD = re.compile(r"\w+")
+
+
+def search_terms(q):
+    """The words of a ?q= value, with any query syntax stripped"""
+    return WORD.findall(q or "")[:MAX_SEARCH_TERMS]
+
+
+def sqlite_matches(terms):
+    """(rowid, rank) of the FTS5 rows matching any term, rank lower for better matches"""
+    fts = table("properties_fts")
+    expression = " OR ".join(f'"{term}"' for term in terms)
+    return select(
+        literal_column("properties_fts.rowid").label("id"),
+        literal_column("bm25(properties_fts)").label("rank"),
+    ).select_from(fts).where(literal_column("properties_fts").op("MATCH")(expression)).subquery("text_matches")
+
+
+def apply_text_search(query, terms, dialect):
+    """Keep the properties that match terms, returning (query, ORDER BY clause with the best match first)"""
+    if dialect == "mysql":
+        relevance = match(
+            Property.name, Property.property_description, Property.city, against=" ".join(terms)
+        ).in_natural_language_mode()
+        # A bare MATCH in WHERE is what lets MySQL read the matches from the FULLTEXT index
+        return query.filter(relevance), relevance.desc()
+
+    if dialect == "sqlite":
+        matches = sqlite_matches(terms)
+        return query.join(matches, matches.c.id == Property.id), matches.c.rank.asc()
+
+    # No full-text index to use: substring matches, newest first
+    columns = (Property.name, Property.property_description, Property.city)
+    query = query.filter(or_(*[column.ilike(f"%{term}%") for term in terms for column in columns]))
+    return query, Property.id.desc()
@@ -0,0 +1,97 @@
+from flask import Request, request
+from werkzeug.exceptions import RequestEntityTooLarge
+import base64
+import os
+import tempfile
+
+# multipart/form-data uploads stream each file part to a temp file on disk in chunks, so an
+# upload costs a bounded buffer however large the image is (base64 JSON holds ~3 copies in memory)
+MAX_IMAGE_SIZE = int(os.getenv("MAX_IMAGE_SIZE") or 20 * 1024 * 1024)
+UPLOAD_TMP_DIR = os.getenv("UPLOAD_TMP_DIR") or None
+
+
+def format_size(size):
+    """A byte count for messages: 20 MB, 1.5 MB, 500 KB or 300 bytes"""
+    for unit, scale in (("MB", 1024 * 1024), ("KB", 1024)):
+        if size >= scale:
+            return f"{round(size / scale, 1):g} {unit}"
+    return f"{size} bytes"
+
+
+class SizeLimitedFile:
+    """Temp file for one uploaded part that rejects the request as soon as the part passes the limit"""
+
+    def __init__(self, limit):
+        self.file = tempfile.TemporaryFile(dir=UPLOAD_TMP_DIR)
+        self.limit = limit
+        self.size = 0
+
+    def write(self, data):
+        self.size += len(data)
+        if self.size > self.limit:
+            self.file.close()
+            raise RequestEntityTooLarge(f"Each image must be at most {format_size(self.limit)}")
+        return self.file.write(data)
+
+    def __iter__(self):
+        return iter(self.file)
+
+    def __getattr__(self, name):
+        return getattr(self.file, name)
+
+
+class UploadRequest(Request):
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return SizeLimitedFile(MAX_IMAGE_SIZE)
+
+
+def is_multipart():
+    return request.mimetype == "multipart/form-data"
+
+
+def form_bool(value, default=None):
+    """Form fields are strings, read "true"/"false" (and 1/0) as booleans"""
+    if value is None or value == "":
+        return default
+    return str(value).lower() in ("true", "1", "yes", "on")
+
+
+def uploaded_file(name):
+    """The uploaded part named name as a readable stream, or None if it is missing or empty"""
+    upload = request.files.get(name)
+    if upload is None or upload.stream.seek(0, os.SEEK_END) == 0:
+        return None
+    upload.stream.seek(0)
+    return upload.stream
+
+
+def uploaded_files(name):
+    """Every part named name, in order, as readable streams (None for empty parts)"""
+    streams = []
+    for upload in request.files.getlist(name):
+        empty = upload.stream.seek(0, os.SEEK_END) == 0
+        upload.stream.seek(0)
+        streams.append(None if empty else upload.stream)
+    return streams
+
+
+def image_source(value):
+    """Image bytes from a base64 JSON field, or an uploaded part's stream as is (both store_blob inputs)"""
+    if hasattr(value, "read"):
+        return value
+    return base64.b64decode(value)
+
+
+def request_fields(image_fields=()):
+    """The request's fields from a JSON body or a multipart form, with image fields as streams"""
+    if not is_multipart():
+        return request.get_json()
+
+    fields = request.form.to_dict()
+    if "availability" in fields:
+        fields["availability"] = form_bool(fields["availability"])
+    for name in image_fields:
+        stream = uploaded_file(name)
+        if stream is not None:
+            fields[name] = stream
+    return fields
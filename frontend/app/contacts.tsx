@@ -9,6 +9,7 @@ import {
 } from "react-native";
 import Contact from "./components/contact";
 import useAxios from "./hooks/useAxios";
+import useChatSocket from "./hooks/useChatSocket";
 import { useAuth } from "./context/AuthContext";
 import { useNavigation, useIsFocused } from "@react-navigation/native";
 import { Ionicons } from "@expo/vector-icons";
@@ -43,40 +44,29 @@ export default function ContactsScreen({ groupId, role }: ContactScreenProps) {
   const fetchConversations = async () => {
     try {
       setLoading(true);
-      const response = await get<any>(`/api/conversations/${groupId}`);
+      // One call for the whole list: last message, its time and the unread count per conversation
+      const response = await get<any>("/api/conversations/inbox", { groupId });
       if (response) {
         const formattedConversations = response.data.map(
           (conversation: any) => {
-            const latestMessage = conversation.messages[0] || null;
-            const hasNewMessage =
-              latestMessage &&
-              latestMessage.senderId !== userId &&
-              !latestMessage.readBy?.includes(userId);
+            const latestMessage = conversation.lastMessage;
+            const others = conversation.participants.filter((p: any) => p.userId != userId);
+
+            let name = "";
+            if (conversation.type == "group") {
+              name =
+                conversation.participants.some((p: any) => p.role === "landlord") &&
+                conversation.participants.length > 2
+                  ? "Tenants and Landlord Groupchat"
+                  : "Tenants Groupchat";
+            } else if (others.length > 0) {
+              name = `${others[0].user.firstName} ${others[0].user.lastName}`;
+            }
 
             return {
               id: conversation.id,
-              name: conversation.participants
-                .filter((p: any) => p.userId !== userId)
-                .map((p: any) => {
-                  if (conversation.type == "group") {
-                    if (
-                      conversation.participants.some(
-                        (participant: any) =>
-                          participant.role === "landlord"
-                      ) &&
-                      conversation.participants.length > 2
-                    ) {
-                      return "Tenants and Landlord Groupchat";
-                    } else {
-                      return "Tenants Groupchat";
-                    }
-                  } else {
-                    return `${p.users.firstName} ${p.users.lastName}`;
-                  }
-                })
-                .slice(0, 1)
-                .join(", "),
-              latestMessage: latestMessage?.content || "No messages yet",
+              name,
+              latestMessage: latestMessage?.preview || "No messages yet",
               date: new Date(
                 latestMessage?.createdAt || Date.now()
               ).toLocaleTimeString([], {
@@ -87,7 +77,7 @@ export default function ContactsScreen({ groupId, role }: ContactScreenProps) {
               imageUri:
                 conversation.participants[0]?.user?.profilePicture ||
                 "https://www.gravatar.com/avatar/00000000000000000000000000000000?s=200&d=mp",
-              hasNewMessage,
+              hasNewMessage: conversation.unreadCount > 0,
             };
           }
         );
@@ -103,16 +93,26 @@ export default function ContactsScreen({ groupId, role }: ContactScreenProps) {
     }
   };
 
+  // New conversations and messages are pushed while the screen is focused and the socket is up
+  const connected = useChatSocket({
+    groups: [Number(groupId)],
+    conversations: (conversations || []).map((conversation: any) => conversation.id),
+    onEvent: fetchConversations,
+    onSync: fetchConversations,
+    enabled: isFocused,
+  });
+
+  // Poll only while the socket is down
   useEffect(() => {
     let intervalId: NodeJS.Timeout | null = null;
-    if (isFocused) {
+    if (isFocused && !connected) {
       fetchConversations();
       intervalId = setInterval(fetchConversations, 5000);
     }
     return () => {
       if (intervalId) clearInterval(intervalId);
     };
-  }, [isFocused]);
+  }, [isFocused, connected]);
 
   const handlePress = (id: any, name: any, type: any) => {
     navigation.navigate("conversation", { id, name, type });
@@ -126,6 +126,7 @@ export default function ContactsScreen({ groupId, role }: ContactScreenProps) {
     try {
       const response = await post<any>("/api/conversations/dm", {
         userId: newUserId,
+        groupId,
       });
       if (response) {
         Alert.alert(
@@ -1,4 +1,4 @@
-import React, { useEffect, useState, useLayoutEffect } from "react";
+import React, { useEffect, useState, useLayoutEffect, useRef } from "react";
 import {
     View,
     StyleSheet,
@@ -13,6 +13,7 @@ import {
 import { Ionicons } from "@expo/vector-icons";
 import { useNavigation, useRoute, RouteProp } from "@react-navigation/native";
 import useAxios from "./hooks/useAxios";
+import useChatSocket, { ChatEvent } from "./hooks/useChatSocket";
 import { useAuth } from "./context/AuthContext";
 import MessageBox from "./components/messageBox";
 import { MessageStackParamList } from "./stacks/messagesStack";
@@ -42,56 +43,142 @@ export default function ConversationScreen() {
         }
     }, [error]);
 
-    useEffect(() => {
-        const fetchMessages = async () => {
-            try {
-                const response = await get<any>(`/api/messages/conversation/${route.params.id}`);
-                if (response) {
-                    let lastSentMessage: any = null;
-                    let lastReceivedMessage: any = null;
+    // Messages fetched so far, oldest first; polls only ask for the ones after the newest
+    const history = useRef<any[]>([]);
+    const pending = useRef<any[]>([]);
+    const hasOlder = useRef(false);
+    const loadingOlder = useRef(false);
+
+    const mergeMessages = (incoming: any[]) => {
+        const known = new Set(history.current.map((message) => message.id));
+        history.current = [...history.current, ...incoming.filter((message) => !known.has(message.id))]
+            .sort((a, b) => a.id - b.id);
+    };
+
+    const showMessages = () => {
+        let lastSentMessage: any = null;
+        for (const message of history.current) {
+            lastSentMessage = message.senderId == userId ? message : lastSentMessage;
+        }
+
+        const formattedMessages = history.current.map((message: any) => ({
+            id: message.id,
+            sender: message.senderId !== userId ? "other" : "self",
+            content: message.content,
+            timestamp: new Date(message.createdAt).toLocaleTimeString([], {
+                hour: "2-digit",
+                minute: "2-digit",
+            }),
+            status: lastSentMessage && message.id == lastSentMessage.id ? (message.readBy?.length ? "read" : "delivered") : null,
+            name: message.sender ? `${message.sender.firstName} ${message.sender.lastName}` : ""
+        }));
+
+        setMessages([...pending.current, ...formattedMessages.reverse()]);
+    };
+
+    const markLastReceivedAsRead = async (incoming: any[]) => {
+        const received = incoming.filter((message) => message.senderId != userId);
+        if (received.length > 0) {
+            await patch(`/api/messages/read`, {
+                conversationId: route.params.id,
+                messageId: received[received.length - 1].id,
+            });
+        }
+    };
 
-                    const formattedMessages = response.data.map((message: any) => {
-                        lastSentMessage = message.senderId == userId ? message : lastSentMessage;
-                        lastReceivedMessage = message.senderId != userId ? message : lastReceivedMessage;
+    const fetchMessages = async () => {
+        try {
+            const newest = history.current[history.current.length - 1];
+            const response = await get<any>(
+                `/api/messages/conversation/${route.params.id}`,
+                newest ? { after: newest.id } : undefined
+            );
+            if (response) {
+                if (!newest) {
+                    hasOlder.current = response.hasMore;
+                }
+                mergeMessages(response.data);
+                await markLastReceivedAsRead(response.data);
+                showMessages();
+            }
+        } catch (err) {
+            Alert.alert("Error", `Failed to fetch messages in conversation:\n${err}`);
+        }
+    };
 
-                        return {
-                            id: message.id,
-                            sender: message.senderId !== userId ? "other" : "self",
-                            content: message.content,
-                            timestamp: new Date(message.createdAt).toLocaleTimeString([], {
-                                hour: "2-digit",
-                                minute: "2-digit",
-                            }),
-                            status: null,
-                            name: `${message.users.firstName} ${message.users.lastName}`
-                        };
-                    });
+    const handleChatEvent = async (event: ChatEvent) => {
+        if (event.event === "message.created") {
+            mergeMessages([event.data]);
+            showMessages();
+            await markLastReceivedAsRead([event.data]);
+        } else if (event.event === "message.read" && event.data.userId != userId) {
+            // The reader's watermark moved: every message up to it is now read by them
+            history.current = history.current.map((message) =>
+                message.id <= event.data.messageId &&
+                message.senderId != event.data.userId &&
+                !message.readBy?.includes(event.data.userId)
+                    ? { ...message, readBy: [...(message.readBy || []), event.data.userId] }
+                    : message
+            );
+            showMessages();
+        }
+    };
 
-                    if (lastSentMessage) {
-                        formattedMessages[
-                            formattedMessages.findIndex((message: any) => message.id == lastSentMessage.id)
-                        ].status = lastSentMessage.readBy ? "read" : "delivered";
-                    }
+    // New messages and read receipts are pushed while the socket is up, catching up over REST when it (re)connects
+    const connected = useChatSocket({
+        conversations: [Number(route.params.id)],
+        onEvent: handleChatEvent,
+        onSync: fetchMessages,
+    });
 
-                    if (lastReceivedMessage) {
-                        await patch(`/api/messages/read`, { messageId: lastReceivedMessage.id });
-                    }
+    // Long poll while the socket is down: each request is answered as soon as a message arrives
+    useEffect(() => {
+        if (connected) return;
 
-                    setMessages(formattedMessages.reverse());
+        let stopped = false;
+        const longPoll = async () => {
+            await fetchMessages();
+            while (!stopped) {
+                const newest = history.current[history.current.length - 1];
+                const response = await get<any>(`/api/messages/conversation/${route.params.id}/wait`, {
+                    after: newest ? newest.id : 0,
+                });
+                if (stopped) break;
+                if (response?.status === "success") {
+                    mergeMessages(response.data);
+                    await markLastReceivedAsRead(response.data);
+                    showMessages();
+                } else {
+                    // Back off before retrying when the server is unreachable
+                    await new Promise((resolve) => setTimeout(resolve, 5000));
                 }
-            } catch (err) {
-                Alert.alert("Error", `Failed to fetch messages in conversation:\n${err}`);
             }
         };
 
-        const interval = setInterval(() => {
-            fetchMessages();
-        }, 5000);
+        longPoll();
 
-        fetchMessages();
+        return () => {
+            stopped = true;
+        };
+    }, [connected]);
 
-        return () => clearInterval(interval);
-    }, []);
+    const fetchOlderMessages = async () => {
+        if (!hasOlder.current || loadingOlder.current || history.current.length === 0) return;
+
+        loadingOlder.current = true;
+        try {
+            const response = await get<any>(`/api/messages/conversation/${route.params.id}`, {
+                before: history.current[0].id,
+            });
+            if (response) {
+                hasOlder.current = response.hasMore;
+                mergeMessages(response.data);
+                showMessages();
+            }
+        } finally {
+            loadingOlder.current = false;
+        }
+    };
 
     const handleSendMessage = async () => {
         if (!newMessage.trim()) return;
@@ -107,29 +194,20 @@ export default function ConversationScreen() {
             status: "sending"
         };
 
+        pending.current = [tempMessage, ...pending.current];
         setMessages((prev) => [tempMessage, ...prev]);
         setNewMessage("");
 
         try {
             const response = await post<any>(`/api/messages/send`, { conversationId: route.params.id, content: tempMessage.content });
             if (response) {
-                const sentMessage = {
-                    id: response.data[0].id,
-                    sender: "self",
-                    content: response.data[0].content,
-                    timestamp: new Date(response.data[0].createdAt).toLocaleTimeString([], {
-                        hour: "2-digit",
-                        minute: "2-digit",
-                    }),
-                    status: "delivered"
-                };
-                setMessages((prev) =>
-                    prev.map((msg) => (msg.id === tempMessage.id ? sentMessage : msg))
-                );
+                mergeMessages([response.data]);
             }
         } catch (err) {
             Alert.alert("Error", `Failed to send message:\n${err}`);
-            setMessages((prev) => prev.filter((msg) => msg.id !== tempMessage.id));
+        } finally {
+            pending.current = pending.current.filter((msg) => msg.id !== tempMessage.id);
+            showMessages();
         }
     };
 
@@ -165,6 +243,8 @@ export default function ConversationScreen() {
                     keyExtractor={(item) => item.id.toString()}
                     renderItem={renderMessage}
                     inverted
+                    // The list is inverted, so its end is the top of the chat
+                    onEndReached={fetchOlderMessages}
                     // Adding extra bottom padding so last messages aren't hidden by the input area
                     contentContainerStyle={[styles.messageList, { paddingBottom: 60 }]}
                     style={{ flex: 1 }}
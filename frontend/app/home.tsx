@@ -271,18 +271,12 @@ export default function HomeScreen({ groupId, role }: HomeScreenProps) {
 
       let unreadMessages = 0;
       try {
-        const response = await get<any>(`/api/conversations/${groupId}`);
+        const response = await get<any>("/api/conversations/inbox", { groupId });
         if (response) {
-          unreadMessages = response.data.reduce((count: any, conversation: any) => {
-            const lastMessage = conversation.messages[0]; // only one message per your backend limit
-            if (!lastMessage || lastMessage.senderId == userId) {
-              return count;
-            }
-            if (!lastMessage.readBy) {
-              return count + 1;
-            }
-            return count;
-          }, 0);
+          unreadMessages = response.data.reduce(
+            (count: number, conversation: any) => count + conversation.unreadCount,
+            0
+          );
         }
       } catch (error) {
         // If some other error occurred (>= 500), you still catch it here
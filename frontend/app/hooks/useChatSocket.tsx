@@ -0,0 +1,116 @@
+import { useEffect, useRef, useState } from "react";
+import { Platform } from "react-native";
+import * as SecureStore from "expo-secure-store";
+
+export type ChatEvent = {
+    id: number;
+    channel: string;
+    event: string;
+    data: any;
+};
+
+type ChatSocketOptions = {
+    conversations?: number[];
+    groups?: number[];
+    onEvent: (event: ChatEvent) => void;
+    // Called whenever the subscription (re)starts or the server says events were missed, refetch over REST here
+    onSync?: () => void;
+    enabled?: boolean;
+};
+
+const SOCKET_URL = `${(process.env.EXPO_PUBLIC_API_URL || "").replace(/^http/, "ws")}/ws/chat`;
+const MAX_RETRY_DELAY = 30000;
+const PING_INTERVAL = 25000;
+
+// Chat events pushed by the backend's WebSocket gateway. Returns whether the socket is up,
+// callers keep polling while it isn't (older servers, networks that block sockets).
+const useChatSocket = ({ conversations = [], groups = [], onEvent, onSync, enabled = true }: ChatSocketOptions) => {
+    const [connected, setConnected] = useState(false);
+    const socket = useRef<WebSocket | null>(null);
+    const lastEventId = useRef<number | null>(null);
+    const handlers = useRef({ onEvent, onSync });
+    const channels = useRef({ conversations, groups });
+    handlers.current = { onEvent, onSync };
+    channels.current = { conversations, groups };
+
+    const subscribe = () => {
+        if (socket.current?.readyState === WebSocket.OPEN) {
+            socket.current.send(JSON.stringify({
+                type: "subscribe",
+                ...channels.current,
+                // Replays what was missed while reconnecting
+                since: lastEventId.current ?? undefined,
+            }));
+        }
+    };
+
+    useEffect(() => {
+        if (!enabled) return;
+
+        let closed = false;
+        let retries = 0;
+        let retryTimer: ReturnType<typeof setTimeout> | undefined;
+        let pingTimer: ReturnType<typeof setInterval> | undefined;
+
+        const connect = async () => {
+            const token = await SecureStore.getItemAsync("jwt");
+            if (closed || !token) return;
+
+            // The token goes in a header, or for browsers (which can't set one) in the first message,
+            // never in the URL where server logs would keep it
+            const ws = Platform.OS === "web"
+                ? new WebSocket(SOCKET_URL)
+                : new (WebSocket as any)(SOCKET_URL, undefined, { headers: { Authorization: `Bearer ${token}` } }) as WebSocket;
+            socket.current = ws;
+
+            ws.onopen = () => {
+                retries = 0;
+                setConnected(true);
+                if (Platform.OS === "web") {
+                    ws.send(JSON.stringify({ type: "auth", token }));
+                }
+                subscribe();
+                pingTimer = setInterval(() => ws.send(JSON.stringify({ type: "ping" })), PING_INTERVAL);
+            };
+
+            ws.onmessage = (message) => {
+                const frame = JSON.parse(message.data);
+                if (frame.type === "event") {
+                    lastEventId.current = Math.max(lastEventId.current ?? 0, frame.id);
+                    handlers.current.onEvent(frame);
+                } else if (frame.type === "subscribed") {
+                    lastEventId.current = lastEventId.current ?? frame.cursor;
+                    handlers.current.onSync?.();
+                } else if (frame.type === "resync") {
+                    handlers.current.onSync?.();
+                }
+            };
+
+            ws.onclose = () => {
+                clearInterval(pingTimer);
+                setConnected(false);
+                if (socket.current === ws) socket.current = null;
+                if (!closed) {
+                    retryTimer = setTimeout(connect, Math.min(MAX_RETRY_DELAY, 1000 * 2 ** retries++));
+                }
+            };
+        };
+
+        connect();
+
+        return () => {
+            closed = true;
+            clearTimeout(retryTimer);
+            socket.current?.close();
+        };
+    }, [enabled]);
+
+    // Follow changes to the conversation and group lists without reconnecting
+    useEffect(() => {
+        subscribe();
+    }, [JSON.stringify([conversations, groups])]);
+
+    return connected;
+};
+
+export default useChatSocket;
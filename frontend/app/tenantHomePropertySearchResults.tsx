@@ -29,12 +29,16 @@ export default function TenantHomePropertySearchResultsScreen() {
   const navigation = useNavigation<TenantHomePropertySearchResultsNavigationProp>();
   const { get, error } = useAxios();
 
+  const [keywords, setKeywords] = useState("");
   const [city, setCity] = useState("");
   const [maxPrice, setMaxPrice] = useState("");
   const [propertyType, setPropertyType] = useState("");
   const [bedrooms, setBedrooms] = useState("");
   const [properties, setProperties] = useState<any[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
   const [loading, setLoading] = useState(false);
+  // Result counts for each filter option under the current filters
+  const [facets, setFacets] = useState<any>(null);
   // Mapping landlord id to average rating as a string (or "N/A")
   const [landlordRatings, setLandlordRatings] = useState<{ [key: number]: string }>({});
 
@@ -46,28 +50,54 @@ export default function TenantHomePropertySearchResultsScreen() {
     }
   }, [error]);
 
-  const fetchProperties = async () => {
+  // Refresh the counts shortly after the user stops editing the filters
+  useEffect(() => {
+    const timer = setTimeout(fetchFacets, 300);
+    return () => clearTimeout(timer);
+  }, [keywords, city, maxPrice, propertyType, bedrooms]);
+
+  const searchFilters = () => ({
+    q: keywords || undefined,
+    city: city || undefined,
+    maxPrice: maxPrice ? parseInt(maxPrice, 10) : undefined,
+    propertyType: propertyType !== "Any" ? propertyType : undefined,
+    bedrooms: bedrooms ? parseInt(bedrooms, 10) : undefined,
+  });
+
+  const fetchFacets = async () => {
+    const response = await get<any>("/api/properties/search/facets", searchFilters());
+    setFacets(response ? response.data : null);
+  };
+
+  const typeLabel = (type: string) => {
+    const facet = facets?.propertyTypes.find((item: any) => item.value === type);
+    if (type === "Any" && facets) {
+      const total = facets.propertyTypes.reduce((sum: number, item: any) => sum + item.count, 0);
+      return `${type} (${total})`;
+    }
+    return facet ? `${type} (${facet.count})` : type;
+  };
+
+  // Without a cursor this starts a new search, with one it appends the next page of results
+  const fetchProperties = async (cursor?: string) => {
     setLoading(true);
     try {
-      const response = await get<any>("/api/properties/search", {
-        city: city || undefined,
-        maxPrice: maxPrice ? parseInt(maxPrice, 10) : undefined,
-        propertyType: propertyType !== "Any" ? propertyType : undefined,
-        bedrooms: bedrooms ? parseInt(bedrooms, 10) : undefined,
-      });
+      const response = await get<any>("/api/properties/search", { ...searchFilters(), cursor });
 
-      if (!response || response.data.length === 0) {
+      if (!response || (response.data.length === 0 && !cursor)) {
         Alert.alert("No results", "No properties match your search.");
         setProperties([]);
+        setNextCursor(null);
         setLandlordRatings({});
       } else {
-        setProperties(response.data);
+        setProperties(cursor ? [...properties, ...response.data] : response.data);
+        setNextCursor(response.nextCursor || null);
         // Extract all unique landlord IDs from the fetched properties
         const uniquePropertyIds = Array.from(
           new Set(response.data.map((prop: any) => prop.id))
         ) as number[];
         // Fetch all landlord reviews in one backend call
-        fetchPropertyRatings(uniquePropertyIds);
+        fetchPropertyRatings(uniquePropertyIds, !!cursor);
       }
     } catch (error) {
       Alert.alert("Error", "Failed to fetch properties.");
@@ -76,7 +106,7 @@ export default function TenantHomePropertySearchResultsScreen() {
     }
   };
 
-  const fetchPropertyRatings = async (propertyIds: number[]) => {
+  const fetchPropertyRatings = async (propertyIds: number[], append = false) => {
     try {
       // Assuming the backend supports an array for reviewedItemId:
       const response = await get<any>("/api/reviews/", { reviewType: "property", reviewedItemId: propertyIds });
@@ -105,12 +135,12 @@ export default function TenantHomePropertySearchResultsScreen() {
           ratingsMap[id] = "N/A";
         });
       }
-      setLandlordRatings(ratingsMap);
+      setLandlordRatings((previous) => (append ? { ...previous, ...ratingsMap } : ratingsMap));
     } catch (err) {
       // On error, set all ratings to "N/A"
       const ratingsMap: { [key: number]: string } = {};
       propertyIds.forEach((id) => (ratingsMap[id] = "No ratings"));
-      setLandlordRatings(ratingsMap);
+      setLandlordRatings((previous) => (append ? { ...previous, ...ratingsMap } : ratingsMap));
     }
   };
 
@@ -132,6 +162,8 @@ export default function TenantHomePropertySearchResultsScreen() {
       <KeyboardAvoidingView behavior={Platform.OS === "ios" ? "padding" : "height"} style={{ flex: 1 }}>
         <ScrollView contentContainerStyle={styles.container}>
           <View style={styles.inputContainer}>
+            <TextField placeholder="Keywords" value={keywords} onChangeText={setKeywords} />
+            <View style={styles.inputSpacing} />
             <TextField placeholder="City" value={city} onChangeText={setCity} />
             <View style={styles.inputSpacing} />
             <TextField placeholder="Max Price ($)" keyboardType="numeric" value={maxPrice} onChangeText={setMaxPrice} />
@@ -142,12 +174,17 @@ export default function TenantHomePropertySearchResultsScreen() {
             <Text style={styles.label}>Property Type</Text>
             <Picker selectedValue={propertyType} onValueChange={setPropertyType} style={styles.picker}>
               {propertyTypes.map((type) => (
-                <Picker.Item key={type} label={type} value={type} />
+                <Picker.Item key={type} label={typeLabel(type)} value={type} />
               ))}
             </Picker>
           </View>
 
-          <Button text="Search" onClick={fetchProperties} />
+          {facets && (
+            <Text style={styles.label}>
+              {facets.total} matching {facets.total === 1 ? "property" : "properties"}
+            </Text>
+          )}
+          <Button text="Search" onClick={() => fetchProperties()} />
 
           {/* Loading Indicator */}
           {loading && (
@@ -200,6 +237,7 @@ export default function TenantHomePropertySearchResultsScreen() {
                   {row.length === 1 && <View style={[styles.propertyCard, { backgroundColor: "transparent" }]} />}
                 </View>
               ))}
+              {nextCursor && !loading && <Button text="Load more" onClick={() => fetchProperties(nextCursor)} />}
             </View>
           )}
         </ScrollView>